@@ -0,0 +1,87 @@
+"""
+Benchmark conversion of Hattrick timestamps to HTDatetime, over the xml files
+stored in tests/test_resources
+
+For each stored file, the text of all elements and attributes holding a
+timestamp is converted with HTXml.opt_ht_datetime_from_text, memoized
+(the memo being cleared before each round, then reused by the following
+timestamps of the file) and without memo (strptime and HTDatetime, as done
+before memoization).
+
+Usage : python benchmarks/bench_datetime.py [--repeat N]
+"""
+import argparse
+import datetime
+import pathlib
+import re
+import sys
+import xml.etree.ElementTree as ElementTree
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_parse import RESOURCES, timeit  # noqa: E402
+from pychpp.fixtures.ht_datetime import HTDatetime  # noqa: E402
+from pychpp.models import ht_xml  # noqa: E402
+from pychpp.models.ht_xml import HTXml  # noqa: E402
+
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2})?")
+
+
+def timestamps(root):
+    """
+    Return elements holding a timestamp, as (element, attribute) tuples
+    """
+    found = list()
+    for element in root.iter():
+        if element.text is not None and TIMESTAMP_RE.fullmatch(element.text.strip()):
+            found.append((element, None))
+        for name, value in element.attrib.items():
+            if TIMESTAMP_RE.fullmatch(value):
+                found.append((element, name))
+    return found
+
+
+def convert_memoized(found):
+    ht_xml._ht_datetime_snapshot.cache_clear()
+    for element, attrib in found:
+        HTXml.opt_ht_datetime_from_text(element, attrib)
+
+
+def convert_strptime(found):
+    for element, attrib in found:
+        text = element.attrib.get(attrib) if attrib is not None else element.text
+        fmt = "%Y-%m-%d %H:%M:%S" if ':' in text else "%Y-%m-%d"
+        try:
+            HTDatetime(datetime=datetime.datetime.strptime(text, fmt))
+        except (ValueError, OverflowError):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    total_strptime, total_memoized = 0, 0
+    print(f"{'file':<60} {'count':>6} {'unique':>6} {'ms/strptime':>12} {'ms/memo':>9}")
+    for path in sorted(RESOURCES.glob('*.xml')):
+        found = timestamps(ElementTree.parse(path).getroot())
+        if not found:
+            continue
+
+        unique = len({e.attrib.get(a) if a is not None else e.text for e, a in found})
+        elapsed_strptime = timeit(lambda: convert_strptime(found), args.repeat)
+        elapsed_memoized = timeit(lambda: convert_memoized(found), args.repeat)
+        total_strptime += elapsed_strptime
+        total_memoized += elapsed_memoized
+
+        print(f"{path.stem[:60]:<60} {len(found):>6} {unique:>6} "
+              f"{elapsed_strptime * 1000:>12.3f} {elapsed_memoized * 1000:>9.3f}")
+
+    print(f"{'total':<74} {total_strptime * 1000:>12.3f} {total_memoized * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark HTModel parsing over the xml files stored in tests/test_resources
+
+For each stored file, the xml data is parsed once, then the matching
+pychpp.models.xml class is instantiated repeatedly from this data, so that
+only HTModel field transformation is measured (no request is sent).
+
+With --interleave, all files are parsed in turn at each round, as a service
+handling requests on various endpoints does, so that ElementTree's path
+cache cannot be reused from one parse of a file to the next.
+
+Usage : python benchmarks/bench_parse.py [--repeat N] [--interleave]
+"""
+import argparse
+import importlib
+import inspect
+import pathlib
+import pkgutil
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+from urllib.parse import parse_qsl
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from pychpp import CHPP  # noqa: E402
+from pychpp.models import xml as xml_models  # noqa: E402
+from pychpp.models.ht_model import HTModel  # noqa: E402
+
+RESOURCES = ROOT / 'tests' / 'test_resources'
+
+
+def xml_classes():
+    """
+    Return xml model classes indexed by source file
+    """
+    classes = dict()
+    for module_info in pkgutil.iter_modules(xml_models.__path__):
+        module = importlib.import_module(f"{xml_models.__name__}.{module_info.name}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if (issubclass(cls, HTModel)
+                    and cls.__module__ == module.__name__
+                    and getattr(cls, 'SOURCE_FILE', None) is not None
+                    and cls._ht_fields):
+                classes.setdefault(cls.SOURCE_FILE, list()).append(cls)
+    return classes
+
+
+def find_model(chpp, classes, source_file, version, data):
+    """
+    Return the first model class able to parse data
+    """
+    for cls in classes.get(source_file, ()):
+        try:
+            cls(chpp=chpp, data=data, version=version)
+        except Exception:  # noqa
+            continue
+        else:
+            return cls
+    return None
+
+
+def timeit(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--interleave', action='store_true')
+    args = parser.parse_args()
+
+    chpp = CHPP(consumer_key='', consumer_secret='')
+    classes = xml_classes()
+
+    models = list()
+    for path in sorted(RESOURCES.glob('*.xml')):
+        params = dict(parse_qsl(path.stem))
+        source_file, version = params['file'], params['version']
+        data = ElementTree.parse(path).getroot()
+
+        cls = find_model(chpp, classes, source_file, version, data)
+        if cls is not None:
+            models.append((path, cls, data, version))
+
+    if args.interleave:
+        def parse_all():
+            for _, cls_, data_, version_ in models:
+                cls_(chpp=chpp, data=data_, version=version_)
+
+        elapsed = timeit(parse_all, args.repeat)
+        print(f"{'total (interleaved)':<78} {elapsed * 1000:>10.3f}")
+        return
+
+    total = 0
+    print(f"{'file':<45} {'model':<32} {'ms/parse':>10}")
+    for path, cls, data, version in models:
+        elapsed = timeit(lambda: cls(chpp=chpp, data=data, version=version), args.repeat)
+        total += elapsed
+        print(f"{path.stem[:45]:<45} {cls.__name__:<32} {elapsed * 1000:>10.3f}")
+
+    print(f"{'total':<78} {total * 1000:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark HTModel snapshot loading against xml parsing, over the xml files
+stored in tests/test_resources
+
+For each stored file, the matching pychpp.models.xml class is instantiated
+from the raw xml text (xml parsing and field transformation), and restored
+from a snapshot of this instance with HTModel.from_snapshot.
+
+Usage : python benchmarks/bench_snapshot.py [--repeat N]
+"""
+import argparse
+import pathlib
+import sys
+import xml.etree.ElementTree as ElementTree
+from urllib.parse import parse_qsl
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bench_parse import RESOURCES, find_model, timeit, xml_classes  # noqa: E402
+from pychpp import CHPP  # noqa: E402
+from pychpp.models.ht_model import HTModel  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    chpp = CHPP(consumer_key='', consumer_secret='')
+    classes = xml_classes()
+
+    total_xml, total_snapshot = 0, 0
+    print(f"{'file':<45} {'model':<28} {'ms/xml':>9} {'ms/snap':>9} {'kB/snap':>8}")
+    for path in sorted(RESOURCES.glob('*.xml')):
+        params = dict(parse_qsl(path.stem))
+        source_file, version = params['file'], params['version']
+        text = path.read_text()
+
+        cls = find_model(chpp, classes, source_file, version, ElementTree.fromstring(text))
+        if cls is None:
+            continue
+
+        snapshot = cls(chpp=chpp, data=ElementTree.fromstring(text), version=version).to_snapshot()
+
+        elapsed_xml = timeit(
+            lambda: cls(chpp=chpp, data=ElementTree.fromstring(text), version=version),
+            args.repeat,
+        )
+        elapsed_snapshot = timeit(lambda: HTModel.from_snapshot(snapshot), args.repeat)
+        total_xml += elapsed_xml
+        total_snapshot += elapsed_snapshot
+
+        print(f"{path.stem[:45]:<45} {cls.__name__[:28]:<28} {elapsed_xml * 1000:>9.3f} "
+              f"{elapsed_snapshot * 1000:>9.3f} {len(snapshot) / 1024:>8.1f}")
+
+    print(f"{'total':<74} {total_xml * 1000:>9.3f} {total_snapshot * 1000:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
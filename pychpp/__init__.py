@@ -1,6 +1,8 @@
 import importlib.metadata
 
 from pychpp.chpp import CHPP  # noqa: F401
+from pychpp.async_chpp import AsyncCHPP  # noqa: F401
+from pychpp.chpp_router import CHPPRouter  # noqa: F401
 
 
 __version__ = importlib.metadata.version("pychpp")
@@ -0,0 +1,511 @@
+import asyncio
+import functools
+import inspect
+import pathlib
+import time
+import xml.etree.ElementTree
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Sequence, Union
+from urllib.parse import urlencode
+
+from oauthlib.oauth1 import Client
+
+from pychpp.chpp import CHPP, CHPPXml, _HTItemParser
+from pychpp.fixtures import (ht_cache, ht_error, ht_metrics, ht_rate_limit, ht_retry,
+                             ht_single_flight, ht_trace)
+
+try:
+    import aiohttp
+    import yarl
+except ImportError:  # aiohttp is an optional dependency
+    aiohttp = None
+    yarl = None
+
+
+# responses fetched on the event loop for the model being built, by request key
+_responses: ContextVar[Optional[Dict[str, xml.etree.ElementTree.Element]]] = ContextVar(
+    'pychpp_async_responses', default=None)
+
+
+class HTPendingRequest(Exception):
+    """
+    Raised by models built through AsyncCHPP when a request has to be sent
+    from the event loop itself, as the loop cannot wait for its response
+    """
+
+    def __init__(self, key: str, params: Dict[str, Any]):
+        super().__init__(f"request '{key}' of a model built through AsyncCHPP has to be "
+                         f"sent through 'await chpp.run(...)'")
+        self.key = key
+        self.params = params
+
+
+class CaptureCHPP(CHPP):
+    """
+    CHPP instance given to models built through AsyncCHPP
+
+    Instead of sending requests itself, it returns responses already fetched
+    on the event loop by the awaitable methods of AsyncCHPP. Within AsyncCHPP.run,
+    it hands missing requests to the event loop, and waits for their responses
+    from the thread running the synchronous function. Otherwise, it raises
+    HTPendingRequest, as the event loop cannot be blocked by a request.
+    """
+
+    def __init__(self, async_chpp: 'AsyncCHPP', **kwargs):
+        super().__init__(**kwargs)
+        self.async_chpp = async_chpp
+
+        # event loop of the last AsyncCHPP.run call
+        self.loop = None
+
+    @staticmethod
+    def request_key(**kwargs) -> str:
+        return ht_cache.HTCache.make_key(**kwargs)
+
+    def _run_on_loop(self, key: str, params: Dict[str, Any], coro_func: Callable[[], Awaitable]):
+        """
+        Run a coroutine on the event loop of AsyncCHPP.run, and wait for its result
+
+        Current span is kept as parent of the spans opened by the coroutine.
+        """
+        loop = self.loop
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            on_event_loop = False
+        else:
+            on_event_loop = True
+
+        if on_event_loop or loop is None or loop.is_closed() or not loop.is_running():
+            raise HTPendingRequest(key, params)
+
+        parent = ht_trace._current_span.get()
+
+        async def run_in_span():
+            ht_trace._current_span.set(parent)
+            return await coro_func()
+
+        return asyncio.run_coroutine_threadsafe(run_in_span(), loop).result()
+
+    def request(self, **kwargs):
+        key = self.request_key(**kwargs)
+
+        responses = _responses.get()
+        if responses is not None and key in responses:
+            return responses[key]
+
+        return self._run_on_loop(key, kwargs, lambda: self.async_chpp.request(**kwargs))
+
+    def stream_request(
+            self, item_path: Sequence[str], method='GET', chunk_size=64 * 1024, **kwargs,
+    ):
+        key = self.request_key(**kwargs)
+        items = self.async_chpp.stream_request(item_path, method=method,
+                                               chunk_size=chunk_size, **kwargs)
+
+        try:
+            while True:
+                try:
+                    yield self._run_on_loop(key, kwargs, items.__anext__)
+                except StopAsyncIteration:
+                    return
+
+        finally:
+            try:
+                self._run_on_loop(key, kwargs, items.aclose)
+            except HTPendingRequest:
+                pass
+
+
+class AsyncCHPP:
+    """
+    Manage connection and requests with Hattrick API, from an asyncio event loop
+
+    Requests are signed with oauthlib and sent with aiohttp (pip install pychpp[async]).
+    AsyncCHPP exposes awaitable versions of CHPP xml_* methods and custom accessors,
+    returning the same models:
+
+    >>> async with AsyncCHPP(consumer_key, consumer_secret, key, secret) as chpp:
+    ...     team = await chpp.team(1165592)
+    ...     players = await chpp.run(team.players)
+    """
+
+    def __init__(self,
+                 consumer_key: str,
+                 consumer_secret: str,
+                 access_token_key: str = None,
+                 access_token_secret: str = None,
+                 cache: ht_cache.HTCache = None,
+                 cache_ttls: Dict[str, float] = None,
+                 default_cache_ttl: float = None,
+                 rate_limiter: ht_rate_limit.HTRateLimiter = None,
+                 single_flight: ht_single_flight.HTAsyncSingleFlight = None,
+                 archive_path: Union[str, pathlib.Path] = None,
+                 metrics: ht_metrics.HTMetrics = None,
+                 tracer: ht_trace.HTTracer = None,
+                 retry_policy: ht_retry.HTRetryPolicy = None,
+                 session: 'aiohttp.ClientSession' = None,
+                 ):
+        """
+        Initialization of an AsyncCHPP instance
+
+        :param consumer_key: Consumer Key of the application
+        :param consumer_secret: Consumer Secret of the application
+        :param access_token_key: Access Token Key for the current user
+        :param access_token_secret: Access Token Secret for the current user
+        :param cache: cache used to store responses of GET requests (no cache if None)
+        :param cache_ttls: time to live (in seconds) of cached responses by CHPP file
+        :param default_cache_ttl: time to live (in seconds) of cached responses for
+                                  files missing from cache_ttls
+        :param rate_limiter: rate limiter applied to requests sent to Hattrick
+        :param single_flight: group of GET requests in flight, shared by tasks sending
+                              the same request at the same time (created if None)
+        :param archive_path: directory where raw xml data of fetched GET requests
+                             are saved, named after request parameters (not saved if None)
+        :param metrics: registry where timings, sizes, cache and retry counts
+                        of requests are recorded (not recorded if None)
+        :param tracer: tracer opening spans for requests and model constructions
+                       (no tracing if None)
+        :param retry_policy: retry policy and circuit breakers of requests, which can be
+                             shared by several instances (created if None)
+        :param session: aiohttp session used to send requests (if None, a session is
+                        opened on first request, and closed by close method)
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp is required to use AsyncCHPP, "
+                              "install it with 'pip install pychpp[async]'")
+
+        # synchronous counterpart, given to models as their chpp instance
+        self.chpp = CaptureCHPP(async_chpp=self,
+                                consumer_key=consumer_key,
+                                consumer_secret=consumer_secret,
+                                access_token_key=access_token_key,
+                                access_token_secret=access_token_secret,
+                                cache=cache,
+                                cache_ttls=cache_ttls,
+                                default_cache_ttl=default_cache_ttl,
+                                rate_limiter=rate_limiter,
+                                archive_path=archive_path,
+                                metrics=metrics,
+                                tracer=tracer,
+                                retry_policy=retry_policy,
+                                )
+
+        self._client = Client(client_key=consumer_key,
+                              client_secret=consumer_secret,
+                              resource_owner_key=access_token_key,
+                              resource_owner_secret=access_token_secret,
+                              )
+
+        self.single_flight = (single_flight if single_flight is not None
+                              else ht_single_flight.HTAsyncSingleFlight())
+
+        self.session = session
+        self._own_session = session is None
+        self.last_url = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        """
+        Close aiohttp session, if it was opened by this instance
+        """
+        if self._own_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _sign(self, url: str, method: str = 'GET', **params):
+        """
+        Sign a request with OAuth1
+
+        :return: signed url, headers and body
+        """
+        # parameters are encoded as requests does
+        params = urlencode({k: str(v) for k, v in params.items() if v is not None})
+
+        if method == 'GET':
+            return self._client.sign(f"{url}?{params}" if params else url, http_method='GET')
+
+        elif method == 'POST':
+            return self._client.sign(
+                url, http_method='POST', body=params,
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+            )
+
+        else:
+            raise ValueError(f"Unknown method '{method}'")
+
+    async def _send_request(self, url: str, method: str = 'GET', stream: bool = False,
+                            **params) -> 'aiohttp.ClientResponse':
+        """
+        Send a signed request and return the response
+
+        Each attempt takes a token from the rate limiter (if any), so that
+        retries are rate limited as any other request.
+
+        :param stream: if True, response content is not downloaded immediately,
+                       and the response has to be closed by the caller
+        :return: response returned by Hattrick
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+        async def proceed_request():
+            uri, headers, body = self._sign(url, method=method, **params)
+            response = await self.session.request(method, yarl.URL(uri, encoded=True),
+                                                  headers=headers, data=body)
+            self.last_url = str(response.url)
+            if not stream:
+                # content is kept by the response once read
+                try:
+                    await response.read()
+                finally:
+                    response.release()
+            return response
+
+        file = params.get('file')
+        policy = self.chpp.retry_policy
+        rate_limiter = self.chpp.rate_limiter
+
+        # requests which are not only reading data are never sent twice
+        max_attempts = policy.max_attempts if self.chpp._is_read_only(method, **params) else 1
+
+        attempt = 0
+        while True:
+            policy.before_attempt(file, attempt)
+
+            if rate_limiter is not None:
+                await rate_limiter.acquire_async(self.chpp.consumer_key,
+                                                 self.chpp.access_token_key)
+
+            try:
+                response = await proceed_request()
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                delay = policy.record_failure(file, attempt, retry=attempt + 1 < max_attempts)
+                if delay is None:
+                    raise
+
+            except BaseException:
+                # any other error (or a cancellation) is recorded too, so that
+                # a half open circuit is not left waiting for its trial request
+                policy.record_failure(file, attempt, retry=False)
+                raise
+
+            else:
+                if response.status not in policy.retry_statuses:
+                    policy.record_success(file)
+                    break
+
+                delay = policy.record_failure(
+                    file, attempt, retry=attempt + 1 < max_attempts,
+                    retry_after=policy.parse_retry_after(response.headers.get('Retry-After')),
+                )
+                if delay is None:
+                    # last failed response is processed as any other one
+                    break
+                response.close()
+
+            if self.chpp.metrics is not None:
+                self.chpp.metrics.observe(file, 'retry')
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        if response.status == 401:
+            response.close()
+            raise ht_error.HTUnauthorizedAction(
+                "The requested action seems to be unauthorized "
+                "(401 error code). Please check your credentials scope.")
+
+        return response
+
+    async def _fetch_content(self, url: str, method: str = 'GET', **params) -> bytes:
+        """
+        Send a signed request and return the raw response content
+        """
+        start = time.perf_counter()
+        response = await self._send_request(url, method=method, **params)
+        content = await response.read()
+
+        metrics = self.chpp.metrics
+        if metrics is not None:
+            metrics.observe(params.get('file'), 'network', time.perf_counter() - start)
+            metrics.observe(params.get('file'), 'size', len(content))
+
+        return content
+
+    async def request(self, **kwargs) -> xml.etree.ElementTree.Element:
+        """
+        Send a request via the CHPP API
+
+        If a cache is set, responses to GET requests are stored in it,
+        and served from it until their time to live is reached.
+
+        Identical GET requests sent at the same time by several tasks
+        are only sent once, and share the same parsed data.
+
+        :return: xml data fetched on Hattrick
+        """
+        if self.chpp.tracer is not None:
+            with self.chpp.tracer.span(f"request {kwargs.get('file')}", kind='request',
+                                       **{k: v for k, v in kwargs.items() if k != 'file'}):
+                return await self._request(**kwargs)
+
+        return await self._request(**kwargs)
+
+    async def _request(self, **kwargs) -> xml.etree.ElementTree.Element:
+        chpp = self.chpp
+
+        if not chpp._is_read_only(**kwargs):
+            return chpp._parse_data(await self._fetch_content(chpp.base_url, **kwargs))
+
+        key = chpp._request_key(**kwargs)
+
+        return await self.single_flight.do(key, self._read_request, key, **kwargs)
+
+    async def _read_request(self, key: str, **kwargs) -> xml.etree.ElementTree.Element:
+        """
+        Send a GET request via the CHPP API, or serve it from cache
+
+        :param key: key of the request
+        :return: xml data fetched on Hattrick
+        """
+        chpp = self.chpp
+
+        ttl = chpp._get_cache_ttl(**kwargs)
+        if ttl > 0:
+            content = await asyncio.to_thread(chpp.cache.get, key)
+            if chpp.metrics is not None:
+                chpp.metrics.observe(kwargs.get('file'),
+                                     'cache_miss' if content is None else 'cache_hit')
+            if content is not None:
+                return chpp._parse_data(content)
+
+        content = await self._fetch_content(chpp.base_url, **kwargs)
+
+        # errors are raised before caching and archiving, so that they are not stored
+        data = chpp._parse_data(content)
+
+        # cache and archive may write to disk, out of the event loop
+        if ttl > 0:
+            await asyncio.to_thread(chpp.cache.set, key, content, ttl)
+        if chpp.archive_path is not None:
+            await asyncio.to_thread(chpp._archive_response, content, **kwargs)
+
+        return data
+
+    async def stream_request(
+            self, item_path: Sequence[str], method='GET', chunk_size=64 * 1024, **kwargs,
+    ) -> AsyncIterator[xml.etree.ElementTree.Element]:
+        """
+        Send a request via the CHPP API and parse returned data incrementally
+
+        As with CHPP.stream_request, each element found at item_path is yielded
+        as soon as it is completely parsed, and cleared when the next one is requested.
+
+        >>> async for match in chpp.stream_request(('Team', 'MatchList', 'Match'),
+        ...                                        file='matchesarchive', version='1.5'):
+        ...     print(match.find('MatchID').text)
+
+        :param item_path: tags leading from the root element to items,
+                          e.g. ('Team', 'MatchList', 'Match')
+        :param method: http method to use ('GET' or 'POST')
+        :param chunk_size: size of response chunks fed to the parser
+        :return: asynchronous iterator on xml items fetched on Hattrick
+        """
+        response = await self._send_request(self.chpp.base_url, method=method,
+                                            stream=True, **kwargs)
+        parser = _HTItemParser(item_path)
+
+        try:
+            async for chunk in response.content.iter_chunked(chunk_size):
+                for item in parser.feed(chunk):
+                    yield item
+            parser.close()
+
+        finally:
+            response.close()
+
+        # If Hattrick returns an error, an exception is raised
+        if parser.is_error:
+            self.chpp._analyze_error(parser.root)
+
+    async def _build(self, func: Callable, *args, **kwargs):
+        """
+        Call a synchronous CHPP method building a model, from the event loop
+
+        The method is called on the event loop, without any thread. When its model
+        needs a request, HTPendingRequest is raised before any data is parsed: the
+        request is then awaited, and the method is called again, the model being
+        built from the fetched xml data. Awaiting a request does not hold a thread,
+        so that many models can be built concurrently from a single event loop.
+
+        :param func: method of the CaptureCHPP instance
+        :return: value returned by func
+        """
+        responses = dict()
+
+        while True:
+            token = _responses.set(responses)
+            try:
+                return func(*args, **kwargs)
+
+            except HTPendingRequest as pending:
+                if pending.key in responses:
+                    raise
+                key, params = pending.key, pending.params
+
+            finally:
+                _responses.reset(token)
+
+            responses[key] = await self.request(**params)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        Run a synchronous function using models built through this instance
+        (for example, a method of a model sending its own requests), sending
+        its requests asynchronously
+
+        The function is run once, in a separate thread, so that it can wait for
+        responses without blocking the event loop. Each request it needs is sent
+        from the event loop, while the thread waits for its response. Requests are
+        thus sent one after the other, unless the function sends them from several
+        threads (for example, with fetch_many).
+
+        >>> team = await chpp.team(1165592)
+        >>> players = await chpp.run(team.players)
+
+        Streamed items (e.g. from HTModel.stream_items) have to be consumed
+        within the function, as the thread is left once the function returns:
+
+        >>> matches = await chpp.run(lambda: list(Matches.stream_items(chpp.chpp, 'team.matches')))
+
+        :param func: function to run
+        :return: value returned by func
+        """
+        self.chpp.loop = asyncio.get_running_loop()
+
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+
+def _make_async_method(name: str):
+
+    sync_method = getattr(CHPP, name)
+
+    @functools.wraps(sync_method)
+    async def method(self, *args, **kwargs):
+        return await self._build(getattr(self.chpp, name), *args, **kwargs)
+
+    return method
+
+
+# awaitable versions of CHPP xml_* methods and custom accessors
+for _name, _member in [*vars(CHPPXml).items(), *vars(CHPP).items()]:
+    if inspect.isfunction(_member) and not _name.startswith('_'):
+        setattr(AsyncCHPP, _name, _make_async_method(_name))
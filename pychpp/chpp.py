@@ -1,12 +1,15 @@
+import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from http.client import RemoteDisconnected
-from typing import Union, Optional
+from typing import Union, Optional, Iterator, Sequence, Dict, Any, Iterable, List, Tuple
 
 import xml.etree.ElementTree
 
-from requests.adapters import HTTPAdapter
+import requests
 from requests_oauthlib import OAuth1Session
-from urllib3 import Retry
 
 from pychpp.models.xml import (manager_compendium, team_details, achievements, arena_details,
                                challenges, region_details, league_details, league_fixtures,
@@ -25,10 +28,76 @@ from pychpp.models.xml import (manager_compendium, team_details, achievements, a
 from pychpp.models.custom import (ht_team, ht_arena, ht_user, ht_region, ht_youth_team, ht_player,
                                   ht_league_unit, ht_youth_player, ht_league, ht_matches_archive,
                                   ht_match, ht_challenge, ht_match_lineup, ht_transfer_history)
-from pychpp.fixtures import ht_error
+from pychpp.fixtures import (ht_error, ht_cache, ht_rate_limit, ht_single_flight, ht_transport,
+                             ht_metrics, ht_trace, ht_retry)
 from pychpp.models.ht_xml import HTXml
 
 
+@dataclass
+class HTBatchResult:
+    """
+    Result of a request sent by CHPPBase.fetch_many
+    """
+    method: str
+    kwargs: Dict[str, Any]
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _HTItemParser:
+    """
+    Incremental parser of CHPP responses, used to stream their items
+
+    Each element found at item_path is yielded as soon as it is completely
+    parsed, then cleared and removed from the tree when the next one is requested.
+    """
+
+    def __init__(self, item_path: Sequence[str]):
+        self.item_path = list(item_path)
+        self.parser = xml.etree.ElementTree.XMLPullParser(events=('start', 'end'))
+
+        # currently open elements, and their tags, from the root element
+        self.elements = list()
+        self.tags = list()
+        self.root = None
+        self.is_error = False
+
+    def feed(self, chunk: bytes) -> Iterator[xml.etree.ElementTree.Element]:
+        """
+        Feed a chunk of the response, and yield items completed by it
+        """
+        elements, tags = self.elements, self.tags
+        self.parser.feed(chunk)
+
+        for event, elem in self.parser.read_events():
+
+            if event == 'start':
+                if self.root is None:
+                    self.root = elem
+                elements.append(elem)
+                tags.append(elem.tag)
+                continue
+
+            if len(elements) == 2 and elem.tag == "FileName":
+                self.is_error = elem.text == "chpperror.xml"
+
+            elif len(tags) == len(self.item_path) + 1 and tags[1:] == self.item_path:
+                yield elem
+                elem.clear()
+                elements[-2].remove(elem)
+
+            elements.pop()
+            tags.pop()
+
+    def close(self):
+        # XMLPullParser.close does not return the root element
+        self.parser.close()
+
+
 class CHPPBase:
     """
     Manage connection and requests with Hattrick API
@@ -39,6 +108,16 @@ class CHPPBase:
                  consumer_secret: str,
                  access_token_key: str = None,
                  access_token_secret: str = None,
+                 cache: ht_cache.HTCache = None,
+                 cache_ttls: Dict[str, float] = None,
+                 default_cache_ttl: float = None,
+                 rate_limiter: ht_rate_limit.HTRateLimiter = None,
+                 single_flight: ht_single_flight.HTSingleFlight = None,
+                 transport: ht_transport.HTTransport = None,
+                 archive_path: Union[str, pathlib.Path] = None,
+                 metrics: ht_metrics.HTMetrics = None,
+                 tracer: ht_trace.HTTracer = None,
+                 retry_policy: ht_retry.HTRetryPolicy = None,
                  ):
         """
         Initialization of a CHPP instance
@@ -52,6 +131,27 @@ class CHPPBase:
         :param consumer_secret: Consumer Secret of the application
         :param access_token_key: Access Token Key for the current user
         :param access_token_secret: Access Token Secret for the current user
+        :param cache: cache used to store responses of GET requests (no cache if None)
+        :param cache_ttls: time to live (in seconds) of cached responses by CHPP file,
+                           overriding ht_cache.DEFAULT_TTLS (0 to never cache a file)
+        :param default_cache_ttl: time to live (in seconds) of cached responses for
+                                  files missing from cache_ttls, defaults to
+                                  ht_cache.DEFAULT_TTL
+        :param rate_limiter: rate limiter applied to requests sent to Hattrick
+                             (which can be shared by several CHPP instances)
+        :param single_flight: group of GET requests in flight, shared by threads sending
+                              the same request at the same time (created if None, it can
+                              be shared by several CHPP instances using the same token)
+        :param transport: pool of connections shared by several CHPP instances
+                          (if None, this instance opens its own session)
+        :param archive_path: directory where raw xml data of fetched GET requests
+                             are saved, named after request parameters (not saved if None)
+        :param metrics: registry where timings, sizes, cache and retry counts
+                        of requests are recorded (not recorded if None)
+        :param tracer: tracer opening spans for requests and model constructions
+                       (no tracing if None)
+        :param retry_policy: retry policy and circuit breakers of requests, which can be
+                             shared by several CHPP instances (created if None)
         :type consumer_key: str
         :type consumer_secret: str
         :type access_token_key: str
@@ -76,7 +176,67 @@ class CHPPBase:
         self.invalidate_token_url = (
             "https://chpp.hattrick.org/oauth/invalidate_token.ashx")
 
+        self.transport = transport
         self.session = None
+        self.last_url = None
+        self._auth = None
+        self._session_lock = threading.Lock()
+
+        self.cache = cache
+        self.cache_ttls = dict(ht_cache.DEFAULT_TTLS)
+        self.cache_ttls.update(cache_ttls if cache_ttls is not None else dict())
+        self.default_cache_ttl = (default_cache_ttl if default_cache_ttl is not None
+                                  else ht_cache.DEFAULT_TTL)
+
+        self.rate_limiter = rate_limiter
+
+        self.single_flight = (single_flight if single_flight is not None
+                              else ht_single_flight.HTSingleFlight())
+
+        self.archive_path = pathlib.Path(archive_path) if archive_path is not None else None
+
+        self.metrics = metrics
+        self.tracer = tracer
+
+        self.retry_policy = retry_policy if retry_policy is not None else ht_retry.HTRetryPolicy()
+
+    @classmethod
+    def from_credentials(cls, credentials: ht_transport.HTCredentials, **kwargs):
+        """
+        Build a CHPP instance from stored credentials
+
+        With a shared transport, no connection is opened to build the instance:
+
+        >>> transport = HTTransport(pool_maxsize=32)
+        >>> chpp = CHPP.from_credentials(credentials, transport=transport)
+
+        :param credentials: credentials of the application and of the user
+        :param kwargs: other arguments of the CHPP instance
+        """
+        return cls(consumer_key=credentials.consumer_key,
+                   consumer_secret=credentials.consumer_secret,
+                   access_token_key=credentials.access_token_key,
+                   access_token_secret=credentials.access_token_secret,
+                   **kwargs)
+
+    @property
+    def credentials(self) -> ht_transport.HTCredentials:
+        return ht_transport.HTCredentials(consumer_key=self.consumer_key,
+                                          consumer_secret=self.consumer_secret,
+                                          access_token_key=self.access_token_key,
+                                          access_token_secret=self.access_token_secret,
+                                          )
+
+    @property
+    def circuit_states(self) -> Dict[Optional[str], str]:
+        """
+        Circuit breaker states ('closed', 'open' or 'half_open'), by CHPP file
+        """
+        return self.retry_policy.states()
+
+    def __deepcopy__(self, memo):
+        # a CHPP instance is a connection shared by models, copying a model does not copy it
+        return self
 
     @staticmethod
     def _analyze_error(xml_data):
@@ -258,71 +418,226 @@ class CHPPBase:
     def open_session(self):
         """
         Open OAuth session
+
+        With a shared transport, requests are sent through its session,
+        and signed with the credentials of this instance.
         """
+        if self.transport is not None:
+            self._auth = self.credentials.auth()
+            self.session = self.transport.session
+            return
+
+        # requests are retried according to retry_policy, not by urllib3
         self.session = OAuth1Session(client_key=self.consumer_key,
                                      client_secret=self.consumer_secret,
                                      resource_owner_key=self.access_token_key,
                                      resource_owner_secret=self.access_token_secret,
                                      )
 
-        # retry strategy
-        retry_strategy = Retry(
-            total=5,
-            redirect=5,
-            backoff_factor=0.5,
-        )
-
-        self.session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
-
-    def _base_request(
-            self, url, parse_data=True, method='GET', **kwargs,
-    ) -> xml.etree.ElementTree:
+    def _send_request(self, url, method='GET', stream=False, token_taken=False, **kwargs):
         """
-        Base method for sending a request via the CHPP API
+        Send a request via the CHPP API and return the response
+
+        Each attempt takes a token from the rate limiter (if any), so that
+        retries are rate limited as any other request.
 
         :param url: url to fetch
-        :param parse_data: parse or not returned data as xml
-        :return: xml data fetched on Hattrick
+        :param method: http method to use ('GET' or 'POST')
+        :param stream: if True, response content is not downloaded immediately
+        :param token_taken: if True, the token of the first attempt was already
+                            taken from the rate limiter by the caller
+        :return: response returned by Hattrick
+        :rtype: requests.Response
         """
 
         def proceed_request():
+            # without a shared transport, requests are signed by the session itself
             if method == 'GET':
-                return self.session.get(url, params=kwargs)
+                return self.session.get(url, params=kwargs, stream=stream, auth=self._auth)
             elif method == 'POST':
-                return self.session.post(url, data=kwargs)
+                return self.session.post(url, data=kwargs, stream=stream, auth=self._auth)
             else:
                 raise ValueError(f"Unknown method '{method}'")
 
+        # session is opened once, even if requests are sent from several threads
         if self.session is None:
-            self.open_session()
+            with self._session_lock:
+                if self.session is None:
+                    self.open_session()
 
-        try:
-            query = proceed_request()
+        file = kwargs.get('file')
+        policy = self.retry_policy
+
+        # requests which are not only reading data are never sent twice
+        max_attempts = policy.max_attempts if self._is_read_only(method, **kwargs) else 1
+
+        attempt = 0
+        while True:
+            policy.before_attempt(file, attempt)
+
+            if self.rate_limiter is not None and (attempt > 0 or not token_taken):
+                self.rate_limiter.acquire(self.consumer_key, self.access_token_key)
+
+            try:
+                query = proceed_request()
+
+            except (requests.ConnectionError, requests.Timeout):
+                delay = policy.record_failure(file, attempt, retry=attempt + 1 < max_attempts)
+                if delay is None:
+                    raise
 
-        except RemoteDisconnected:
-            self.open_session()
-            query = proceed_request()
+            except BaseException:
+                # any other error (or an interruption) is recorded too, so that
+                # a half open circuit is not left waiting for its trial request
+                policy.record_failure(file, attempt, retry=False)
+                raise
+
+            else:
+                if query.status_code not in policy.retry_statuses:
+                    policy.record_success(file)
+                    break
+
+                delay = policy.record_failure(
+                    file, attempt, retry=attempt + 1 < max_attempts,
+                    retry_after=policy.parse_retry_after(query.headers.get('Retry-After')),
+                )
+                if delay is None:
+                    # last failed response is processed as any other one
+                    break
+                query.close()
+
+            if self.metrics is not None:
+                self.metrics.observe(file, 'retry')
+
+            time.sleep(delay)
+            attempt += 1
 
-        query.encoding = "UTF-8"
         self.last_url = query.url
 
         if query.status_code == 401:
+            query.close()
             raise ht_error.HTUnauthorizedAction(
                 "The requested action seems to be unauthorized "
                 "(401 error code). Please check your credentials scope.")
 
+        return query
+
+    def _base_request(
+            self, url, parse_data=True, method='GET', token_taken=False, **kwargs,
+    ) -> Union[xml.etree.ElementTree.Element, bytes]:
+        """
+        Base method for sending a request via the CHPP API
+
+        Response content is parsed as bytes, without being decoded first
+        (xml parser reads its encoding from data itself).
+
+        :param url: url to fetch
+        :param parse_data: parse or not returned data as xml
+        :param token_taken: if True, the token of the first attempt was already
+                            taken from the rate limiter by the caller
+        :return: xml data fetched on Hattrick, or raw response content
+                 if parse_data is False
+        """
+        start = time.perf_counter()
+        query = self._send_request(url, method=method, token_taken=token_taken, **kwargs)
+        content = query.content
+
+        if self.metrics is not None:
+            self.metrics.observe(kwargs.get('file'), 'network', time.perf_counter() - start)
+            self.metrics.observe(kwargs.get('file'), 'size', len(content))
+
         if not parse_data:
-            return query.text
+            return content
 
         else:
-            data = xml.etree.ElementTree.fromstring(query.text)
-            file_name = data.find("FileName").text
+            return self._parse_data(content)
+
+    def _parse_data(self, content: Union[str, bytes]) -> xml.etree.ElementTree.Element:
+        """
+        Parse xml data returned by Hattrick, and raise relevant exception
+        if it is an error
+
+        :param content: xml data to parse
+        :return: parsed xml data
+        """
+        start = time.perf_counter()
+        data = xml.etree.ElementTree.fromstring(content)
+        file_name = data.find("FileName").text
+
+        if self.metrics is not None:
+            self.metrics.observe(file_name.rsplit('.', 1)[0] if file_name else None,
+                                 'parse', time.perf_counter() - start)
+
+        # If Hattrick returns an error, an exception is raised
+        if file_name == "chpperror.xml":
+            self._analyze_error(data)
+
+        return data
+
+    @staticmethod
+    def _is_read_only(method='GET', **kwargs) -> bool:
+        """
+        Return True if a request is only reading data, so that its response
+        can be cached or shared
+        """
+        return method == 'GET' and kwargs.get('actionType') not in ht_cache.NON_CACHED_ACTIONS
+
+    def _request_key(self, **kwargs) -> str:
+        """
+        Return the key of a request, for cache and requests in flight
+        """
+        params = {k: v for k, v in kwargs.items() if k != 'method'}
+        return ht_cache.HTCache.make_key(scope=self.access_token_key, **params)
+
+    def _archive_response(self, content: bytes, method='GET', **kwargs):
+        """
+        Save raw xml data of a response to archive_path, in a file named
+        after request parameters (as test resources are)
+        """
+        filename = ht_cache.HTCache.make_key(**kwargs).replace('/', '%2F') + '.xml'
+        (self.archive_path / filename).write_bytes(content)
+
+    def _get_cache_ttl(self, method='GET', **kwargs) -> float:
+        """
+        Return the time to live of the response to a request in cache
+        (0 if it must not be cached)
+        """
+        if self.cache is None or not self._is_read_only(method=method, **kwargs):
+            return 0
 
-            # If Hattrick returns an error, an exception is raised
-            if file_name == "chpperror.xml":
-                self._analyze_error(data)
+        return self.cache_ttls.get(kwargs.get('file'), self.default_cache_ttl) or 0
 
-            return data
+    def stream_request(
+            self, item_path: Sequence[str], method='GET', chunk_size=64 * 1024, **kwargs,
+    ) -> Iterator[xml.etree.ElementTree.Element]:
+        """
+        Send a request via the CHPP API and parse returned data incrementally
+
+        Response is read and parsed by chunks. Each element found at item_path
+        is yielded as soon as it is completely parsed. When the next item is
+        requested, the previous one is cleared and removed from the tree, so that
+        memory stays bounded by one item instead of by the whole document.
+
+        :param item_path: tags leading from the root element to items,
+                          e.g. ('Team', 'MatchList', 'Match')
+        :param method: http method to use ('GET' or 'POST')
+        :param chunk_size: size of response chunks fed to the parser
+        :return: iterator on xml items fetched on Hattrick
+        """
+        query = self._send_request(url=self.base_url, method=method, stream=True, **kwargs)
+        parser = _HTItemParser(item_path)
+
+        try:
+            for chunk in query.iter_content(chunk_size=chunk_size):
+                yield from parser.feed(chunk)
+            parser.close()
+
+        finally:
+            query.close()
+
+        # If Hattrick returns an error, an exception is raised
+        if parser.is_error:
+            self._analyze_error(parser.root)
 
     def check_token(self):
         """
@@ -373,7 +688,7 @@ class CHPPBase:
         """
         try:
             return self._base_request(url=self.invalidate_token_url,
-                                      parse_data=False)
+                                      parse_data=False).decode('UTF-8')
         except ht_error.HTUnauthorizedAction:
             return "token is already invalid"
 
@@ -381,10 +696,102 @@ class CHPPBase:
         """
         Send a request via the CHPP API
 
+        If a cache is set, responses to GET requests are stored in it,
+        and served from it until their time to live is reached.
+
+        Identical GET requests sent at the same time by several threads
+        are only sent once, and share the same parsed data.
+
         :return: xml data fetched on Hattrick
         :rtype: xml.etree.ElementTree
         """
-        return self._base_request(url=self.base_url, parse_data=True, **kwargs)
+        if self.tracer is not None:
+            with self.tracer.span(f"request {kwargs.get('file')}", kind='request',
+                                  **{k: v for k, v in kwargs.items() if k != 'file'}):
+                return self._request(**kwargs)
+
+        return self._request(**kwargs)
+
+    def _request(self, **kwargs) -> xml.etree.ElementTree.Element:
+        if not self._is_read_only(**kwargs):
+            return self._base_request(url=self.base_url, parse_data=True, **kwargs)
+
+        key = self._request_key(**kwargs)
+
+        return self.single_flight.do(key, self._read_request, key, **kwargs)
+
+    def _read_request(self, key: str, **kwargs) -> xml.etree.ElementTree.Element:
+        """
+        Send a GET request via the CHPP API, or serve it from cache
+
+        Raw response content is stored in cache and archive, so that
+        it is never decoded nor serialized again.
+
+        :param key: key of the request
+        :return: xml data fetched on Hattrick
+        """
+        ttl = self._get_cache_ttl(**kwargs)
+        if ttl > 0:
+            content = self.cache.get(key)
+            if self.metrics is not None:
+                self.metrics.observe(kwargs.get('file'),
+                                     'cache_miss' if content is None else 'cache_hit')
+            if content is not None:
+                return self._parse_data(content)
+
+        content = self._base_request(url=self.base_url, parse_data=False, **kwargs)
+
+        # errors are raised before caching and archiving, so that they are not stored
+        data = self._parse_data(content)
+
+        if ttl > 0:
+            self.cache.set(key, content, ttl)
+        if self.archive_path is not None:
+            self._archive_response(content, **kwargs)
+
+        return data
+
+    def fetch_many(
+            self,
+            specs: Iterable[Union[Tuple[str], Tuple[str, Dict[str, Any]]]],
+            max_workers: int = 4,
+    ) -> List[HTBatchResult]:
+        """
+        Call several methods of this instance concurrently, with a bounded pool of threads
+
+        >>> results = chpp.fetch_many([('player', {'id_': 6993859}),
+        ...                            ('xml_match_details', {'match_id': 68599186}),
+        ...                            ])
+        >>> [r.value if r.ok else r.error for r in results]
+
+        :param specs: requests to send, as (method name, kwargs) tuples
+        :param max_workers: maximum number of requests sent concurrently
+        :return: results, in the order of specs (errors raised by a request are
+                 stored in its result instead of being raised)
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be greater than 0")
+
+        results = list()
+        for spec in specs:
+            if not 1 <= len(spec) <= 2:
+                raise ValueError(f"request spec {spec!r} must be a (method name, kwargs) tuple")
+            method = spec[0]
+            kwargs = dict(spec[1]) if len(spec) == 2 and spec[1] is not None else dict()
+            if method.startswith('_') or not callable(getattr(self, method, None)):
+                raise ValueError(f"unknown method '{method}'")
+            results.append(HTBatchResult(method=method, kwargs=kwargs))
+
+        def fetch(result: HTBatchResult):
+            try:
+                result.value = getattr(self, result.method)(**result.kwargs)
+            except Exception as e:  # noqa
+                result.error = e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(fetch, results))
+
+        return results
 
 
 class CHPPXml(CHPPBase):
@@ -0,0 +1,162 @@
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+from pychpp.chpp import CHPP
+from pychpp.fixtures import ht_error
+
+
+# CHPP files whose data does not depend on the user sending the request,
+# with their parameters identifying the requested data (one of them must be set)
+ROUTED_FILES: Dict[str, Tuple[str, ...]] = {
+    'cupmatches': ('CupID',),
+    'leaguedetails': ('leagueLevelUnitID',),
+    'leaguefixtures': ('leagueLevelUnitID',),
+    'leaguelevels': ('LeagueID',),
+    'matchdetails': ('matchID',),
+    'matchesarchive': ('teamID',),
+    'matchlineup': ('matchID',),
+    'nationalteamdetails': ('teamID',),
+    'playerdetails': ('playerID',),
+    'regiondetails': ('regionID',),
+    'teamdetails': ('teamID', 'userID'),
+    'transfersplayer': ('playerID',),
+    'worlddetails': (),
+    'worldlanguages': (),
+}
+
+
+class CHPPRouter(CHPP):
+    """
+    CHPP instance spreading requests for public data over a pool of access tokens
+
+    Requests for files of ROUTED_FILES are sent with the tokens of the pool,
+    in turn, skipping tokens whose rate limit is reached (if a rate limiter is set)
+    and removing tokens rejected by Hattrick. Other requests (user-scoped files such
+    as challenges or matchorders, and requests without explicit ids) are always sent
+    with the token of the instance.
+
+    >>> router = CHPPRouter(consumer_key, consumer_secret, tokens=[(key_1, secret_1),
+    ...                                                            (key_2, secret_2)],
+    ...                     rate_limiter=HTRateLimiter(token_rate=1),
+    ...                     transport=HTTransport(pool_maxsize=16))
+    >>> results = router.fetch_many([('player', {'id_': i}) for i in player_ids])
+    """
+
+    def __init__(self,
+                 consumer_key: str,
+                 consumer_secret: str,
+                 tokens: Iterable[Tuple[str, str]],
+                 access_token_key: str = None,
+                 access_token_secret: str = None,
+                 **kwargs,
+                 ):
+        """
+        :param consumer_key: Consumer Key of the application
+        :param consumer_secret: Consumer Secret of the application
+        :param tokens: pool of access tokens, as (key, secret) tuples
+        :param access_token_key: Access Token Key used for user-scoped requests,
+                                 defaults to the first token of the pool
+        :param access_token_secret: Access Token Secret used for user-scoped requests
+        :param kwargs: other arguments of CHPP (cache, rate_limiter, transport...),
+                       the rate limiter being applied to each token of the pool
+        """
+        tokens = dict(tokens)
+        if not tokens:
+            raise ValueError("tokens must not be empty")
+
+        if access_token_key is None:
+            access_token_key, access_token_secret = next(iter(tokens.items()))
+
+        super().__init__(consumer_key=consumer_key,
+                         consumer_secret=consumer_secret,
+                         access_token_key=access_token_key,
+                         access_token_secret=access_token_secret,
+                         **kwargs)
+
+        # requests of a token are sent by its own instance, which shares the transport,
+        # rate limiter, metrics and retry policy of the router
+        self._members: Dict[str, CHPP] = {
+            key: CHPP(consumer_key=consumer_key,
+                      consumer_secret=consumer_secret,
+                      access_token_key=key,
+                      access_token_secret=secret,
+                      transport=self.transport,
+                      rate_limiter=self.rate_limiter,
+                      metrics=self.metrics,
+                      retry_policy=self.retry_policy,
+                      )
+            for key, secret in tokens.items()
+        }
+        self._members_lock = threading.Lock()
+        self._next_member = 0
+        self.revoked_tokens: List[str] = list()
+
+    @property
+    def tokens(self) -> List[str]:
+        """
+        Access token keys of the pool which were not rejected by Hattrick
+        """
+        return list(self._members)
+
+    @classmethod
+    def _is_routed(cls, method='GET', **kwargs) -> bool:
+        """
+        Return True if a request can be sent with any token of the pool
+        """
+        if (not cls._is_read_only(method=method, **kwargs)
+                or kwargs.get('actionType') not in (None, 'view')):
+            return False
+
+        id_params = ROUTED_FILES.get(kwargs.get('file'))
+        if id_params is None:
+            return False
+
+        return not id_params or any(kwargs.get(p) is not None for p in id_params)
+
+    def _next_token(self) -> Tuple[str, CHPP]:
+        """
+        Return the next token of the pool which can send a request, and its instance
+        """
+        with self._members_lock:
+            if not self._members:
+                raise ht_error.HTUnauthorizedAction(
+                    "All access tokens of the pool were rejected by Hattrick")
+
+            tokens = list(self._members)
+            start = self._next_member % len(tokens)
+            self._next_member = start + 1
+            tokens = tokens[start:] + tokens[:start]
+
+        token_key = (tokens[0] if self.rate_limiter is None
+                     else self.rate_limiter.acquire_any(self.consumer_key, tokens))
+
+        with self._members_lock:
+            return token_key, self._members.get(token_key)
+
+    def _revoke_token(self, token_key: str):
+        with self._members_lock:
+            if self._members.pop(token_key, None) is not None:
+                self.revoked_tokens.append(token_key)
+
+    def _base_request(self, url, parse_data=True, method='GET', **kwargs):
+        if url != self.base_url or not self._is_routed(method=method, **kwargs):
+            return super()._base_request(url, parse_data=parse_data, method=method, **kwargs)
+
+        while True:
+            token_key, member = self._next_token()
+            if member is None:
+                # token was revoked by another thread in the meantime
+                continue
+
+            try:
+                # token of the first attempt was taken when choosing the token,
+                # the member takes the tokens of its retries
+                data = member._base_request(url, parse_data=parse_data, method=method,
+                                            token_taken=True, **kwargs)
+
+            except ht_error.HTUnauthorizedAction:
+                self._revoke_token(token_key)
+                continue
+
+            self.last_url = member.last_url
+            return data
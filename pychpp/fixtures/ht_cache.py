@@ -0,0 +1,193 @@
+import abc
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+
+class HTCache(abc.ABC):
+    """
+    Base class for caches of CHPP responses
+
+    Responses are stored as raw bytes (or as text for entries stored by
+    previous versions), which are parsed as they are.
+
+    Subclasses have to implement get, set, delete and clear methods.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Union[str, bytes]]:
+        """
+        Return the cached value for key, or None if it is missing or expired
+        """
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Union[str, bytes], ttl: float):
+        """
+        Store value for key during ttl seconds
+        """
+
+    @abc.abstractmethod
+    def delete(self, key: str):
+        """
+        Remove key from cache
+        """
+
+    @abc.abstractmethod
+    def clear(self):
+        """
+        Remove all keys from cache
+        """
+
+    @staticmethod
+    def make_key(scope: Optional[str] = None, **params) -> str:
+        """
+        Build the cache key of a request
+
+        The key follows the filename scheme of stored xml files (file, version,
+        then other params sorted by name), prefixed by a hash of scope (usually
+        the access token key), so that users do not share their cached data.
+        """
+        args = dict()
+        for name in ('file', 'version'):
+            if name in params:
+                args[name] = params.pop(name)
+        args.update(sorted(params.items()))
+
+        key = '&'.join(f"{k}={v}" for k, v in args.items())
+
+        if scope:
+            key = f"{hashlib.sha256(scope.encode()).hexdigest()[:16]}:{key}"
+
+        return key
+
+
+class HTMemoryCache(HTCache):
+    """
+    In-memory LRU cache
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """
+        :param max_size: maximum number of cached responses
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be greater than 0")
+
+        self.max_size = max_size
+        self._data: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            value, expires = item
+            if expires <= time.time():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class HTSQLiteCache(HTCache):
+    """
+    On-disk cache stored in a SQLite database, which can be shared
+    between processes and kept between runs
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the SQLite database file (created if needed)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS responses "
+                                     "(key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute("SELECT value, expires FROM responses WHERE key = ?",
+                                           (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, expires = row
+            if expires <= time.time():
+                with self._connection:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                                     (key, value, time.time() + ttl))
+
+    def delete(self, key):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def purge(self):
+        """
+        Remove expired responses from database
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+
+    def close(self):
+        self._connection.close()
+
+
+# Default time to live (in seconds) of cached responses, by CHPP file
+# (files mapped to 0 are never cached)
+DEFAULT_TTLS: Dict[str, float] = {
+    'live': 0,
+    'matchorders': 0,
+    'challenges': 0,
+    'currentbids': 0,
+    'worlddetails': 3 * 3600,
+    'worldlanguages': 24 * 3600,
+    'translations': 24 * 3600,
+    'leaguelevels': 3 * 3600,
+}
+
+# Default time to live (in seconds) of cached responses for other files
+DEFAULT_TTL: float = 300
+
+# Request actions which are never cached (nor shared between requests in flight),
+# as they are not only reading data
+NON_CACHED_ACTIONS = frozenset(('challenge', 'accept', 'decline', 'withdraw',
+                                'setTraining', 'unlockSkills', 'unlockskills',
+                                'setmatchorder'))
@@ -1,6 +1,13 @@
 import datetime as dt
+import functools
+
 import pytz
 
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
 
 class HTDatetime:
     """
@@ -11,6 +18,9 @@ class HTDatetime:
 
     _ORIGIN_DATE = dt.datetime(1997, 9, 22, 0, 0)
 
+    # Origin date localized in each used timezone
+    _ORIGINS = dict()
+
     _LEAGUES_MAP = {
         'Sweden': {'id': 1, 'season_offset': 0},
         'England': {'id': 2, 'season_offset': 0},
@@ -155,6 +165,10 @@ class HTDatetime:
         'Hattrick International': {'id': 1000, 'season_offset': -63}
     }
 
+    # Reverse indexes of _LEAGUES_MAP, built once
+    _LEAGUE_NAMES_BY_ID = {v['id']: k for k, v in _LEAGUES_MAP.items()}
+    _SEASON_OFFSETS = {k: v['season_offset'] for k, v in _LEAGUES_MAP.items()}
+
     def __init__(self,
                  season=None, week=None, weekday=None,
                  year=None, month=None, day=None,
@@ -191,109 +205,41 @@ class HTDatetime:
         :type league: Union[int, str]
         :type timezone: str
         """
-        # Get season offset according to league, defaults to 0
-        season_offset = self._get_season_offset(self._to_league_name(league))
-
         # Define self._league according to league, defaults to ""
         self._league = self._to_league_name(league)
 
+        # Get season offset according to league, defaults to 0
+        season_offset = self._get_season_offset(self._league)
+
         # Define timezone
         # if timezone is defined, get from it
         # elif datetime is defined and aware, get timezone from it
         # else set timezone to "CET"
         if timezone is not None:
-            self._timezone = pytz.timezone(timezone)
+            self._timezone = self._get_timezone(timezone)
         elif datetime is not None and datetime.tzinfo is not None:
             self._timezone = datetime.tzinfo
         else:
-            self._timezone = pytz.timezone("CET")
+            self._timezone = self._get_timezone("CET")
 
         self.timezone_name = self._timezone.zone
 
         # If no argument is set, HTDate initialized with current date and time
         if all(i is None for i in (season, week, weekday,
                                    year, month, day, datetime)):
-            self._datetime = dt.datetime.now(tz=self._timezone)
-            self._year = self._datetime.year
-            self._month = self._datetime.month
-            self._day = self._datetime.day
-            self._hour = self._datetime.hour
-            self._minute = self._datetime.minute
-            self._second = self._datetime.second
-            self._season, self._week, self._weekday = (
-                self._to_ht_calendar(self._year, self._month,
-                                     self._day, self._timezone))
-            self._season += season_offset
+            self._set_datetime(dt.datetime.now(tz=self._timezone), season_offset)
 
         # If season, week and weekday are set,
         # calculate year, month and day
         elif any((season, week, weekday)):
-
-            if not all(isinstance(i, int) for i in (season, week, weekday)):
-                raise ValueError(
-                    "ht_season, ht_week and ht_weekday must be integers")
-            elif (season < 1
-                  or not (1 <= week <= 16)
-                  or not (1 <= weekday <= 7)):
-                raise ValueError(
-                    "wrong value for ht_season, ht_week or ht_weekday")
-
-            self._season = season
-            self._week = week
-            self._weekday = weekday
-            self._year, self._month, self._day = (
-                self._to_calendar(season - season_offset,
-                                  week, weekday, self._timezone))
-            self._hour = hour
-            self._minute = minute
-            self._second = second
-            self._datetime = self._timezone.localize(
-                dt.datetime(year=self._year,
-                            month=self._month,
-                            day=self._day,
-                            hour=self._hour,
-                            minute=self._minute,
-                            second=self._second,
-                            )
-            )
+            self._set_ht_calendar(season, week, weekday,
+                                  hour, minute, second, season_offset)
 
         # If year, month and day are set,
         # calculate season, week and weekday
         elif any((year, month, day)):
-
-            if not all(isinstance(i, int) for i in (year, month, day)):
-                raise ValueError(
-                    f"year, month and day must be integers :\n"
-                    f"year : {year.__class__.__name__} was given\n"
-                    f"month : {month.__class__.__name__} was given\n"
-                    f"day : {day.__class__.__name__} was given"
-                )
-            elif not (1 <= month <= 12) or not (1 <= day <= 31):
-                raise ValueError(f"wrong value for month or day : "
-                                 f"month : {month} "
-                                 f"(must be between 1 and 12), "
-                                 f"day : {day} "
-                                 f"(must be between 1 and 31)."
-                                 )
-
-            self._season, self._week, self._weekday = (
-                self._to_ht_calendar(year, month, day, self._timezone))
-            self._season += season_offset
-            self._year = year
-            self._month = month
-            self._day = day
-            self._hour = hour
-            self._minute = minute
-            self._second = second
-            self._datetime = self._timezone.localize(
-                dt.datetime(self._year,
-                            self._month,
-                            self._day,
-                            self._hour,
-                            self._minute,
-                            self._second,
-                            ),
-            )
+            self._set_calendar(year, month, day,
+                               hour, minute, second, season_offset)
 
         elif datetime is not None:
 
@@ -306,32 +252,119 @@ class HTDatetime:
             # if the given datetime is aware, set it directly or convert it to
             #   the given timezone
             # else, if it is naive, localize it according to the given timezone
-            if datetime.tzinfo is not None:
-                self._datetime = (datetime
-                                  if timezone is None
-                                  else datetime.astimezone(self._timezone))
-            else:
-                self._datetime = self._timezone.localize(datetime)
-
-            self._season, self._week, self._weekday = (
-                self._to_ht_calendar(datetime.year,
-                                     datetime.month,
-                                     datetime.day,
-                                     self._timezone,
-                                     )
+            self._set_datetime(datetime, season_offset,
+                               convert=timezone is not None)
+
+    # Setters below do not resolve league and timezone again, and only convert
+    # between calendars in the direction required by the changed value
+
+    def _set_ht_calendar(self, season, week, weekday,
+                         hour, minute, second, season_offset):
+        """
+        Set Hattrick calendar, then calculate year, month and day
+        """
+        if not all(isinstance(i, int) for i in (season, week, weekday)):
+            raise ValueError(
+                "ht_season, ht_week and ht_weekday must be integers")
+        elif (season < 1
+              or not (1 <= week <= 16)
+              or not (1 <= weekday <= 7)):
+            raise ValueError(
+                "wrong value for ht_season, ht_week or ht_weekday")
+
+        year, month, day = self._to_calendar(season - season_offset,
+                                             week, weekday, self._timezone)
+        self._localize(year, month, day, hour, minute, second)
+        self._season = season
+        self._week = week
+        self._weekday = weekday
+
+    def _set_calendar(self, year, month, day,
+                      hour, minute, second, season_offset):
+        """
+        Set calendar date and time, then calculate Hattrick calendar
+        """
+        if not all(isinstance(i, int) for i in (year, month, day)):
+            raise ValueError(
+                f"year, month and day must be integers :\n"
+                f"year : {year.__class__.__name__} was given\n"
+                f"month : {month.__class__.__name__} was given\n"
+                f"day : {day.__class__.__name__} was given"
             )
-            self._season += season_offset
-            self._year = self._datetime.year
-            self._month = self._datetime.month
-            self._day = self._datetime.day
-            self._hour = self._datetime.hour
-            self._minute = self._datetime.minute
-            self._second = self._datetime.second
+        elif not (1 <= month <= 12) or not (1 <= day <= 31):
+            raise ValueError(f"wrong value for month or day : "
+                             f"month : {month} "
+                             f"(must be between 1 and 12), "
+                             f"day : {day} "
+                             f"(must be between 1 and 31)."
+                             )
+
+        self._localize(year, month, day, hour, minute, second)
+        self._season, self._week, self._weekday = (
+            self._to_ht_calendar(year, month, day, self._timezone))
+        self._season += season_offset
+
+    def _set_datetime(self, datetime, season_offset, convert=False):
+        """
+        Set datetime (converted to the timezone of the instance if convert
+        is True and datetime is aware), then calculate Hattrick calendar
+        """
+        if datetime.tzinfo is not None:
+            self._datetime = (datetime.astimezone(self._timezone)
+                              if convert else datetime)
+        else:
+            self._datetime = self._timezone.localize(datetime)
+
+        self._season, self._week, self._weekday = (
+            self._to_ht_calendar(datetime.year,
+                                 datetime.month,
+                                 datetime.day,
+                                 self._timezone,
+                                 )
+        )
+        self._season += season_offset
+        self._year = self._datetime.year
+        self._month = self._datetime.month
+        self._day = self._datetime.day
+        self._hour = self._datetime.hour
+        self._minute = self._datetime.minute
+        self._second = self._datetime.second
+
+    def _localize(self, year, month, day, hour, minute, second):
+        """
+        Set calendar date and time, and the localized datetime
+        """
+        self._datetime = self._timezone.localize(
+            dt.datetime(year, month, day, hour, minute, second))
+        self._year = year
+        self._month = month
+        self._day = day
+        self._hour = hour
+        self._minute = minute
+        self._second = second
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _get_timezone(name):
+        """
+        Return the pytz timezone of a name, looked up once
+        """
+        return pytz.timezone(name)
+
+    @classmethod
+    def _get_origin(cls, timezone):
+        """
+        Return Hattrick origin date localized in a timezone, computed once
+        """
+        origin = cls._ORIGINS.get(timezone)
+        if origin is None:
+            origin = cls._ORIGINS[timezone] = timezone.localize(cls._ORIGIN_DATE)
+        return origin
 
     def _to_calendar(self, season, week, weekday, timezone):
         delta_days = weekday - 1
         delta_weeks = ((season - 1) * 16) + (week - 1)
-        date = (timezone.localize(self._ORIGIN_DATE)
+        date = (self._get_origin(timezone)
                 + dt.timedelta(days=delta_days, weeks=delta_weeks))
         year = date.year
         month = date.month
@@ -341,7 +374,7 @@ class HTDatetime:
     def _to_ht_calendar(self, year, month, day, timezone):
         datetime = timezone.localize(dt.datetime(year=year, month=month,
                                                  day=day))
-        delta = datetime - timezone.localize(self._ORIGIN_DATE)
+        delta = datetime - self._get_origin(timezone)
         ht_season = ((delta.days // 7) // 16) + 1
         ht_week = ((delta.days // 7) % 16) + 1
         ht_weekday = datetime.isoweekday()
@@ -351,8 +384,7 @@ class HTDatetime:
         if not isinstance(league_name, str):
             raise ValueError("league_name must be an string")
         else:
-            return self._LEAGUES_MAP.get(league_name, {}) \
-                .get("season_offset", 0)
+            return self._SEASON_OFFSETS.get(league_name, 0)
 
     def _to_league_name(self, league):
 
@@ -362,13 +394,10 @@ class HTDatetime:
             raise ValueError("league must be an integer, a string or None")
 
         if isinstance(league, int):
-            t_list = [k for k, v in self._LEAGUES_MAP.items()
-                      if v.get("id", None) == league
-                      ]
-            return t_list[0] if len(t_list) else ""
+            return self._LEAGUE_NAMES_BY_ID.get(league, "")
 
         elif isinstance(league, str):
-            return league if league in self._LEAGUES_MAP else ""
+            return league if league in self._SEASON_OFFSETS else ""
 
         elif league is None:
             return ""
@@ -394,15 +423,50 @@ class HTDatetime:
     def from_datetime(cls, datetime, **kwargs):
         return cls(datetime=datetime, **kwargs)
 
+    _EPOCH = dt.datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+    def to_snapshot(self):
+        """
+        Return a tuple of plain values from which the instance can be restored
+        (as microseconds since epoch, timezone, league and Hattrick calendar)
+        """
+        return ((self._datetime - self._EPOCH) // dt.timedelta(microseconds=1),
+                self.timezone_name, self._league,
+                self._season, self._week, self._weekday)
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Restore an instance from a tuple returned by to_snapshot,
+        without computing Hattrick calendar nor localizing datetime again
+        """
+        epoch_us, timezone_name, league, season, week, weekday = snapshot
+
+        self = cls.__new__(cls)
+        self._league = league
+        self._timezone = cls._get_timezone(timezone_name)
+        self.timezone_name = timezone_name
+        self._datetime = (cls._EPOCH + dt.timedelta(microseconds=epoch_us)).astimezone(
+            self._timezone)
+        self._year = self._datetime.year
+        self._month = self._datetime.month
+        self._day = self._datetime.day
+        self._hour = self._datetime.hour
+        self._minute = self._datetime.minute
+        self._second = self._datetime.second
+        self._season, self._week, self._weekday = season, week, weekday
+
+        return self
+
     @property
     def season(self):
         return self._season
 
     @season.setter
     def season(self, value):
-        self.__init__(season=value, week=self.week, weekday=self.weekday,
-                      hour=self.hour, minute=self.minute, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_ht_calendar(value, self._week, self._weekday,
+                              self._hour, self._minute, self._second,
+                              self._get_season_offset(self._league))
 
     @property
     def week(self):
@@ -410,9 +474,9 @@ class HTDatetime:
 
     @week.setter
     def week(self, value):
-        self.__init__(season=self.season, week=value, weekday=self.weekday,
-                      hour=self.hour, minute=self.minute, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_ht_calendar(self._season, value, self._weekday,
+                              self._hour, self._minute, self._second,
+                              self._get_season_offset(self._league))
 
     @property
     def weekday(self):
@@ -420,9 +484,9 @@ class HTDatetime:
 
     @weekday.setter
     def weekday(self, value):
-        self.__init__(season=self.season, week=self.week, weekday=value,
-                      hour=self.hour, minute=self.minute, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_ht_calendar(self._season, self._week, value,
+                              self._hour, self._minute, self._second,
+                              self._get_season_offset(self._league))
 
     @property
     def year(self):
@@ -430,9 +494,9 @@ class HTDatetime:
 
     @year.setter
     def year(self, value):
-        self.__init__(year=value, month=self.month, day=self.day,
-                      hour=self.hour, minute=self.minute, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_calendar(value, self._month, self._day,
+                           self._hour, self._minute, self._second,
+                           self._get_season_offset(self._league))
 
     @property
     def month(self):
@@ -440,9 +504,9 @@ class HTDatetime:
 
     @month.setter
     def month(self, value):
-        self.__init__(year=self.year, month=value, day=self.day,
-                      hour=self.hour, minute=self.minute, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_calendar(self._year, value, self._day,
+                           self._hour, self._minute, self._second,
+                           self._get_season_offset(self._league))
 
     @property
     def day(self):
@@ -450,9 +514,12 @@ class HTDatetime:
 
     @day.setter
     def day(self, value):
-        self.__init__(year=self.year, month=self.month, day=value,
-                      hour=self.hour, minute=self.minute, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_calendar(self._year, self._month, value,
+                           self._hour, self._minute, self._second,
+                           self._get_season_offset(self._league))
+
+    # as in __init__, Hattrick calendar is computed again from the date
+    # (it can differ from the stored one, in timezones far from CET)
 
     @property
     def hour(self):
@@ -460,9 +527,9 @@ class HTDatetime:
 
     @hour.setter
     def hour(self, value):
-        self.__init__(year=self.year, month=self.month, day=self.day,
-                      hour=value, minute=self.minute, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_calendar(self._year, self._month, self._day,
+                           value, self._minute, self._second,
+                           self._get_season_offset(self._league))
 
     @property
     def minute(self):
@@ -470,9 +537,9 @@ class HTDatetime:
 
     @minute.setter
     def minute(self, value):
-        self.__init__(year=self.year, month=self.month, day=self.day,
-                      hour=self.hour, minute=value, second=self.second,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_calendar(self._year, self._month, self._day,
+                           self._hour, value, self._second,
+                           self._get_season_offset(self._league))
 
     @property
     def second(self):
@@ -480,9 +547,9 @@ class HTDatetime:
 
     @second.setter
     def second(self, value):
-        self.__init__(year=self.year, month=self.month, day=self.day,
-                      hour=self.hour, minute=self.minute, second=value,
-                      league=self.league, timezone=self.timezone_name)
+        self._set_calendar(self._year, self._month, self._day,
+                           self._hour, self._minute, value,
+                           self._get_season_offset(self._league))
 
     @property
     def datetime(self):
@@ -490,8 +557,13 @@ class HTDatetime:
 
     @datetime.setter
     def datetime(self, value):
-        self.__init__(datetime=value,
-                      league=self.league, timezone=self.timezone_name)
+        if not isinstance(value, dt.datetime):
+            raise ValueError("datetime must be a datetime instance")
+        elif value.replace(tzinfo=None) < self._ORIGIN_DATE:
+            raise ValueError("datetime must be after the 1997-09-22")
+
+        self._set_datetime(value, self._get_season_offset(self._league),
+                           convert=True)
 
     @property
     def league(self):
@@ -517,9 +589,10 @@ class HTDatetime:
 
     @timezone.setter
     def timezone(self, value):
-        tz = pytz.timezone(value)
-        self.__init__(datetime=self.datetime.astimezone(tz),
-                      league=self.league)
+        datetime = self._datetime.astimezone(self._get_timezone(value))
+        self._timezone = datetime.tzinfo
+        self.timezone_name = self._timezone.zone
+        self._set_datetime(datetime, self._get_season_offset(self._league))
 
     def __add__(self, other):
 
@@ -589,3 +662,288 @@ class HTDatetime:
         return f'<HTDatetime object - ' \
                f'{self._datetime.strftime("%Y-%m-%d %H:%M:%S %Z%z")} ' \
                f'(S{self._season}, W{self._week}, D{self._weekday})>'
+
+
+class HTTimestamp:
+    """
+    Immutable Hattrick timestamp
+
+    Lightweight alternative to HTDatetime for large collections (match or
+    transfer histories): a timestamp only holds epoch seconds and a league id,
+    and computes its datetime (in Hattrick time, CET/CEST) and its Hattrick
+    season, week and weekday on first access. Timestamps are hashable, and
+    can be used as dict keys. As HTDatetime instances, they are compared by
+    instant only: timestamps of different leagues at the same instant are equal.
+
+    >>> ts = HTTimestamp.from_datetime(dt.datetime(2023, 3, 26, 12), league=16)
+    >>> ts.season, ts.week, ts.weekday
+    (72, 3, 7)
+    """
+
+    __slots__ = ('_epoch', '_league_id', '_calendar')
+
+    _TIMEZONE = pytz.timezone("CET")
+    _ORIGIN_EPOCH = int(_TIMEZONE.localize(HTDatetime._ORIGIN_DATE).timestamp())
+    _ORIGIN_DATE = HTDatetime._ORIGIN_DATE.date()
+    _LEAGUE_IDS = {k: v['id'] for k, v in HTDatetime._LEAGUES_MAP.items()}
+
+    def __init__(self, epoch: int, league_id: int = None):
+        """
+        :param epoch: seconds since 1970-01-01 00:00 UTC (from 1997-09-22 00:00 CEST)
+        :param league_id: id of the league for which Hattrick season is given
+        """
+        if epoch < self._ORIGIN_EPOCH:
+            raise ValueError("timestamp must be after the 1997-09-22")
+
+        object.__setattr__(self, '_epoch', int(epoch))
+        object.__setattr__(self, '_league_id', league_id)
+        object.__setattr__(self, '_calendar', None)
+
+    @classmethod
+    def from_datetime(cls, datetime, league=None) -> 'HTTimestamp':
+        """
+        :param datetime: aware datetime, or naive datetime in Hattrick time (CET/CEST)
+        :param league: league id or name
+        :type datetime: datetime.datetime
+        :type league: Union[int, str]
+        """
+        if datetime.tzinfo is None:
+            datetime = cls._TIMEZONE.localize(datetime)
+        return cls(int(datetime.timestamp()), cls._to_league_id(league))
+
+    @classmethod
+    def from_ht_datetime(cls, ht_datetime: HTDatetime) -> 'HTTimestamp':
+        return cls.from_datetime(ht_datetime.datetime, ht_datetime.league or None)
+
+    @classmethod
+    def _to_league_id(cls, league):
+        if isinstance(league, str):
+            return cls._LEAGUE_IDS.get(league)
+        elif isinstance(league, int) or league is None:
+            return league
+        else:
+            raise ValueError("league must be an integer, a string or None")
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{self.__class__.__name__}' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{self.__class__.__name__}' object is immutable")
+
+    def __reduce__(self):
+        return self.__class__, (self._epoch, self._league_id)
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    @property
+    def league_id(self) -> int:
+        return self._league_id
+
+    @property
+    def league(self) -> str:
+        return HTDatetime._LEAGUE_NAMES_BY_ID.get(self._league_id, "")
+
+    @property
+    def datetime(self) -> dt.datetime:
+        """
+        Datetime in Hattrick time (CET/CEST)
+        """
+        return dt.datetime.fromtimestamp(self._epoch, tz=self._TIMEZONE)
+
+    def _get_calendar(self):
+        calendar = self._calendar
+        if calendar is None:
+            date = self.datetime.date()
+            weeks = (date - self._ORIGIN_DATE).days // 7
+            calendar = (weeks // 16 + 1 + HTDatetime._SEASON_OFFSETS.get(self.league, 0),
+                        weeks % 16 + 1,
+                        date.isoweekday())
+            object.__setattr__(self, '_calendar', calendar)
+        return calendar
+
+    @property
+    def season(self) -> int:
+        return self._get_calendar()[0]
+
+    @property
+    def week(self) -> int:
+        return self._get_calendar()[1]
+
+    @property
+    def weekday(self) -> int:
+        return self._get_calendar()[2]
+
+    def with_league(self, league) -> 'HTTimestamp':
+        """
+        Return the same timestamp, for another league
+        """
+        return self.__class__(self._epoch, self._to_league_id(league))
+
+    def to_ht_datetime(self) -> HTDatetime:
+        return HTDatetime(datetime=self.datetime, league=self.league)
+
+    def __hash__(self):
+        return hash(self._epoch)
+
+    def __eq__(self, other):
+        if isinstance(other, HTTimestamp):
+            return self._epoch == other._epoch
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, HTTimestamp):
+            return self._epoch < other._epoch
+        return NotImplemented
+
+    def __le__(self, other):
+        if isinstance(other, HTTimestamp):
+            return self._epoch <= other._epoch
+        return NotImplemented
+
+    def __gt__(self, other):
+        if isinstance(other, HTTimestamp):
+            return self._epoch > other._epoch
+        return NotImplemented
+
+    def __ge__(self, other):
+        if isinstance(other, HTTimestamp):
+            return self._epoch >= other._epoch
+        return NotImplemented
+
+    def __repr__(self):
+        return f'<HTTimestamp object - ' \
+               f'{self.datetime.strftime("%Y-%m-%d %H:%M:%S %Z%z")} ' \
+               f'(S{self.season}, W{self.week}, D{self.weekday})>'
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required to convert arrays of datetimes, "
+                          "install it with 'pip install pychpp[numpy]'")
+
+
+_SEASON_OFFSETS_TABLE = None
+
+
+def _season_offsets(leagues) -> 'np.ndarray':
+    """
+    Return season offsets of an array of league ids (0 for unknown leagues)
+    """
+    global _SEASON_OFFSETS_TABLE
+
+    if _SEASON_OFFSETS_TABLE is None:
+        table = np.zeros(max(HTDatetime._LEAGUE_NAMES_BY_ID) + 1, dtype=np.int64)
+        for league_id, name in HTDatetime._LEAGUE_NAMES_BY_ID.items():
+            table[league_id] = HTDatetime._SEASON_OFFSETS[name]
+        _SEASON_OFFSETS_TABLE = table
+
+    if leagues is None:
+        return np.int64(0)
+
+    leagues = np.asarray(leagues, dtype=np.int64)
+    known = (leagues >= 0) & (leagues < len(_SEASON_OFFSETS_TABLE))
+    return np.where(known, _SEASON_OFFSETS_TABLE[np.where(known, leagues, 0)], 0)
+
+
+def _last_sunday(years: 'np.ndarray', month: int) -> 'np.ndarray':
+    """
+    Return the last sunday of a month, for an array of datetime64[Y] years
+    """
+    last_day = (years.astype('datetime64[M]') + month).astype('datetime64[D]') - 1
+    # 1970-01-01 was a thursday, weekdays are counted from monday (0) to sunday (6)
+    weekday = (last_day.astype(np.int64) + 3) % 7
+    return last_day - (weekday + 1) % 7
+
+
+def _to_hattrick_dates(epochs: 'np.ndarray') -> 'np.ndarray':
+    """
+    Convert epoch seconds to dates in Hattrick time (CET/CEST)
+
+    Summer time starts on the last sunday of March and ends on the last sunday
+    of October, at 01:00 UTC (rule followed by CET since 1996).
+    """
+    utc = epochs.astype('datetime64[s]')
+    years = utc.astype('datetime64[Y]')
+    summer_start = _last_sunday(years, 3).astype('datetime64[s]') + np.timedelta64(3600, 's')
+    summer_end = _last_sunday(years, 10).astype('datetime64[s]') + np.timedelta64(3600, 's')
+    offsets = np.where((summer_start <= utc) & (utc < summer_end), 7200, 3600)
+    return (utc + offsets.astype('timedelta64[s]')).astype('datetime64[D]')
+
+
+def to_ht_calendar_array(datetimes, leagues=None):
+    """
+    Convert an array of datetimes to Hattrick seasons, weeks and weekdays
+
+    Vectorized counterpart of HTDatetime, for large numbers of datetimes:
+
+    >>> columns = chpp.xml_matches_archive(team_id=1165592).to_columns('matches')
+    >>> seasons, weeks, weekdays = to_ht_calendar_array(columns['date'], leagues=5)
+
+    Missing datetimes (NaT, as given by HTModel.to_columns for empty values)
+    are masked in returned arrays.
+
+    :param datetimes: datetime64 array in Hattrick time (CET/CEST, as given by
+                      HTModel.to_columns), or integer array of epoch seconds
+    :param leagues: league id, or array of league ids, for which seasons are given
+    :return: seasons, weeks and weekdays, as int64 masked arrays
+    :rtype: Tuple[numpy.ma.MaskedArray, numpy.ma.MaskedArray, numpy.ma.MaskedArray]
+    """
+    _require_numpy()
+
+    datetimes = np.asarray(datetimes)
+    if np.issubdtype(datetimes.dtype, np.datetime64):
+        dates = datetimes.astype('datetime64[D]')
+    elif np.issubdtype(datetimes.dtype, np.integer):
+        dates = _to_hattrick_dates(datetimes)
+    else:
+        raise ValueError("datetimes must be a datetime64 array or an integer array")
+
+    missing = np.isnat(dates)
+    days = (dates - np.datetime64(HTDatetime._ORIGIN_DATE.date())).astype(np.int64)
+    days = np.where(missing, 0, days)
+    if np.any(days < 0):
+        raise ValueError("datetimes must be after the 1997-09-22")
+
+    weeks = days // 7
+    seasons = weeks // 16 + 1 + _season_offsets(leagues)
+    return (np.ma.masked_array(seasons, mask=np.broadcast_to(missing, seasons.shape)),
+            np.ma.masked_array(weeks % 16 + 1, mask=missing),
+            np.ma.masked_array(days % 7 + 1, mask=missing))
+
+
+def from_ht_calendar_array(seasons, weeks, weekdays, leagues=None):
+    """
+    Convert arrays of Hattrick seasons, weeks and weekdays to dates
+
+    Masked values (as returned by to_ht_calendar_array for missing datetimes)
+    are converted to NaT.
+
+    :param seasons: Hattrick seasons (of the given leagues)
+    :param weeks: weeks in seasons (from 1 to 16)
+    :param weekdays: weekdays in weeks (from 1 to 7)
+    :param leagues: league id, or array of league ids, for which seasons are given
+    :return: dates in Hattrick time (CET/CEST)
+    :rtype: numpy.ndarray
+    """
+    _require_numpy()
+
+    missing = (np.ma.getmaskarray(seasons)
+               | np.ma.getmaskarray(weeks)
+               | np.ma.getmaskarray(weekdays))
+    seasons = np.ma.filled(np.ma.asarray(seasons, dtype=np.int64), 1)
+    weeks = np.ma.filled(np.ma.asarray(weeks, dtype=np.int64), 1)
+    weekdays = np.ma.filled(np.ma.asarray(weekdays, dtype=np.int64), 1)
+
+    # seasons are checked as given, before converting them to global seasons
+    if (np.any(seasons < 1)
+            or np.any((weeks < 1) | (weeks > 16))
+            or np.any((weekdays < 1) | (weekdays > 7))):
+        raise ValueError("wrong value for ht_season, ht_week or ht_weekday")
+
+    seasons = seasons - _season_offsets(leagues)
+
+    days = ((seasons - 1) * 16 + weeks - 1) * 7 + weekdays - 1
+    dates = np.datetime64(HTDatetime._ORIGIN_DATE.date()) + days.astype('timedelta64[D]')
+    return np.where(missing, np.datetime64('NaT'), dates)
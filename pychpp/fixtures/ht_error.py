@@ -81,3 +81,11 @@ class HTAgeError(HTError):
 
 class UnknownLeagueError(HTError):
     """Raise when world league doesn't exist in the list"""
+
+
+class HTRateLimitError(HTError):
+    """Raise when a request would exceed the client-side rate limit"""
+
+
+class HTCircuitOpenError(HTError):
+    """Raise when requests to a CHPP file are rejected, as it keeps failing"""
@@ -0,0 +1,169 @@
+import bisect
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Default bucket upper bounds of timing histograms (in seconds)
+TIME_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                                   0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+
+# Default bucket upper bounds of size histograms (in bytes)
+SIZE_BUCKETS: Tuple[float, ...] = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Observed timings (in seconds), by request phase
+TIMINGS = ('network', 'parse', 'transform')
+
+# Observed sizes (in bytes)
+SIZES = ('size',)
+
+# Observed counts
+COUNTERS = ('cache_hit', 'cache_miss', 'retry')
+
+
+@dataclass(frozen=True)
+class HTMetricEvent:
+    """
+    Value observed while sending a request, or building its model
+
+    - network, parse and transform are durations (in seconds),
+    - size is the size of a response (in bytes),
+    - cache_hit, cache_miss and retry are counts.
+    """
+    file: Optional[str]
+    name: str
+    value: float
+
+
+class HTHistogram:
+    """
+    Histogram of observed values, with fixed buckets
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        """
+        :param buckets: sorted upper bounds of buckets (an infinite bucket is added)
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> dict:
+        """
+        Return histogram data, with cumulative counts by bucket upper bound
+        (as exported to Prometheus)
+        """
+        cumulative = list()
+        total = 0
+        for bound, count in zip((*self.buckets, float('inf')), self.counts):
+            total += count
+            cumulative.append((bound, total))
+
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+
+class HTMetrics:
+    """
+    In-process registry of request metrics, by CHPP file
+
+    Timings and sizes are stored in histograms, and counts in counters.
+    Callbacks are called with each observed HTMetricEvent, so that they
+    can be exported to a monitoring system.
+
+    >>> metrics = HTMetrics()
+    >>> chpp = CHPP(consumer_key, consumer_secret, key, secret, metrics=metrics)
+    >>> metrics.add_callback(lambda event: statsd.timing(f'chpp.{event.file}.{event.name}',
+    ...                                                  event.value))
+    """
+
+    def __init__(self,
+                 time_buckets: Tuple[float, ...] = TIME_BUCKETS,
+                 size_buckets: Tuple[float, ...] = SIZE_BUCKETS,
+                 ):
+        """
+        :param time_buckets: bucket upper bounds of timing histograms (in seconds)
+        :param size_buckets: bucket upper bounds of size histograms (in bytes)
+        """
+        self.time_buckets = tuple(sorted(time_buckets))
+        self.size_buckets = tuple(sorted(size_buckets))
+
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[Optional[str], str], HTHistogram] = dict()
+        self._counters: Dict[Tuple[Optional[str], str], int] = dict()
+        self._callbacks: List[Callable[[HTMetricEvent], None]] = list()
+
+    def add_callback(self, callback: Callable[[HTMetricEvent], None]):
+        """
+        Add a function called with each observed event
+        """
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: Callable[[HTMetricEvent], None]):
+        self._callbacks.remove(callback)
+
+    def observe(self, file: Optional[str], name: str, value: float = 1):
+        """
+        Record a value observed for a CHPP file
+
+        :param file: CHPP file (e.g. 'matchdetails')
+        :param name: metric name, from TIMINGS, SIZES or COUNTERS
+        :param value: observed value (duration, size or count)
+        """
+        key = (file, name)
+
+        with self._lock:
+            if name in COUNTERS:
+                self._counters[key] = self._counters.get(key, 0) + value
+
+            elif name in TIMINGS or name in SIZES:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = HTHistogram(
+                        self.time_buckets if name in TIMINGS else self.size_buckets)
+                histogram.observe(value)
+
+            else:
+                raise ValueError(f"unknown metric '{name}'")
+
+        if self._callbacks:
+            event = HTMetricEvent(file=file, name=name, value=value)
+            for callback in self._callbacks:
+                callback(event)
+
+    def histogram(self, file: Optional[str], name: str) -> Optional[dict]:
+        """
+        Return data of a histogram (None if no value was observed)
+        """
+        with self._lock:
+            histogram = self._histograms.get((file, name))
+            return histogram.as_dict() if histogram is not None else None
+
+    def counter(self, file: Optional[str], name: str) -> int:
+        with self._lock:
+            return self._counters.get((file, name), 0)
+
+    def snapshot(self) -> Dict[Optional[str], dict]:
+        """
+        Return all metrics, by CHPP file then by metric name
+        """
+        with self._lock:
+            snapshot: Dict[Optional[str], dict] = dict()
+            for (file, name), histogram in self._histograms.items():
+                snapshot.setdefault(file, dict())[name] = histogram.as_dict()
+            for (file, name), count in self._counters.items():
+                snapshot.setdefault(file, dict())[name] = count
+            return snapshot
+
+    def reset(self):
+        """
+        Remove all observed values
+        """
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
@@ -0,0 +1,272 @@
+import abc
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pychpp.fixtures import ht_error
+
+
+@dataclass(frozen=True)
+class HTBucket:
+    """
+    Token bucket: up to capacity requests can be sent at once,
+    then rate requests per second
+    """
+    key: str
+    rate: float
+    capacity: float
+
+
+class HTBucketStore(abc.ABC):
+    """
+    Base class for token bucket states
+
+    Subclasses have to implement take method.
+    """
+
+    @abc.abstractmethod
+    def take(self, buckets: List[HTBucket], now: float) -> float:
+        """
+        Take a token from each bucket, only if all buckets have one
+
+        :return: 0 if tokens were taken, else the time to wait (in seconds)
+                 before all buckets have a token
+        """
+
+    @staticmethod
+    def _take(states: Dict[str, Tuple[float, float]], buckets: List[HTBucket], now: float,
+              ) -> float:
+        """
+        Take tokens from bucket states (tokens and last update time, by bucket key),
+        which are updated in place
+        """
+        wait = 0
+        levels = dict()
+
+        for bucket in buckets:
+            tokens, updated = states.get(bucket.key, (bucket.capacity, now))
+            tokens = min(bucket.capacity, tokens + (now - updated) * bucket.rate)
+            levels[bucket.key] = tokens
+            if tokens < 1:
+                wait = max(wait, (1 - tokens) / bucket.rate)
+
+        for bucket in buckets:
+            states[bucket.key] = (levels[bucket.key] - (1 if wait == 0 else 0), now)
+
+        return wait
+
+
+class HTMemoryBucketStore(HTBucketStore):
+    """
+    Token bucket states shared by threads of a process
+    """
+
+    def __init__(self):
+        self._states: Dict[str, Tuple[float, float]] = dict()
+        self._lock = threading.Lock()
+
+    def take(self, buckets, now):
+        with self._lock:
+            return self._take(self._states, buckets, now)
+
+
+class HTSQLiteBucketStore(HTBucketStore):
+    """
+    Token bucket states stored in a SQLite database, shared by processes of a host
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the SQLite database file (created if needed)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30,
+                                           isolation_level=None)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS buckets "
+                                 "(key TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def take(self, buckets, now):
+        keys = [b.key for b in buckets]
+
+        with self._lock:
+            # buckets are locked against other processes until the transaction ends
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute(
+                    f"SELECT key, tokens, updated FROM buckets "
+                    f"WHERE key IN ({','.join('?' * len(keys))})", keys,
+                ).fetchall()
+                states = {key: (tokens, updated) for key, tokens, updated in rows}
+
+                wait = self._take(states, buckets, now)
+
+                self._connection.executemany("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                                             [(k, *states[k]) for k in keys])
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            else:
+                self._connection.execute("COMMIT")
+
+        return wait
+
+    def close(self):
+        self._connection.close()
+
+
+class HTRateLimiter:
+    """
+    Client-side rate limiter for CHPP requests, based on token buckets
+
+    Limits can be set by consumer key (shared by all users of an application)
+    and by access token (for each user). A same limiter can be shared by several
+    CHPP instances, and its state can be shared by several processes with a
+    HTSQLiteBucketStore.
+    """
+
+    def __init__(self,
+                 consumer_rate: Optional[float] = None,
+                 consumer_burst: Optional[float] = None,
+                 token_rate: Optional[float] = None,
+                 token_burst: Optional[float] = None,
+                 store: Optional[HTBucketStore] = None,
+                 blocking: bool = True,
+                 max_wait: Optional[float] = None,
+                 ):
+        """
+        :param consumer_rate: maximum requests per second by consumer key (no limit if None)
+        :param consumer_burst: maximum requests sent at once by consumer key,
+                               defaults to consumer_rate (and at least 1)
+        :param token_rate: maximum requests per second by access token (no limit if None)
+        :param token_burst: maximum requests sent at once by access token,
+                            defaults to token_rate (and at least 1)
+        :param store: bucket states store, defaults to a HTMemoryBucketStore
+        :param blocking: if True, wait until a request can be sent,
+                         else raise HTRateLimitError at once
+        :param max_wait: maximum time (in seconds) to wait for a request,
+                         after which HTRateLimitError is raised (no maximum if None)
+        """
+        for rate in (consumer_rate, token_rate):
+            if rate is not None and rate <= 0:
+                raise ValueError("rates must be greater than 0")
+
+        self.consumer_rate = consumer_rate
+        self.consumer_burst = max(1., consumer_burst or consumer_rate or 1.)
+        self.token_rate = token_rate
+        self.token_burst = max(1., token_burst or token_rate or 1.)
+        self.store = store if store is not None else HTMemoryBucketStore()
+        self.blocking = blocking
+        self.max_wait = max_wait
+
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'waits': 0, 'wait_time': 0., 'throttles': 0}
+
+    @staticmethod
+    def _hash(key: Optional[str]) -> str:
+        return hashlib.sha256((key or '').encode()).hexdigest()[:16]
+
+    def _buckets(self, consumer_key: Optional[str], token_key: Optional[str]) -> List[HTBucket]:
+        buckets = list()
+        if self.consumer_rate is not None:
+            buckets.append(HTBucket(f"consumer:{self._hash(consumer_key)}",
+                                    self.consumer_rate, self.consumer_burst))
+        if self.token_rate is not None:
+            buckets.append(HTBucket(f"token:{self._hash(token_key)}",
+                                    self.token_rate, self.token_burst))
+        return buckets
+
+    def _count(self, **counters):
+        with self._stats_lock:
+            for name, value in counters.items():
+                self.stats[name] += value
+
+    def _next_wait(self, buckets: List[HTBucket], waited: float) -> float:
+        """
+        Try to take tokens, and return the time to wait before trying again (0 if taken)
+        """
+        return self._check_wait(self.store.take(buckets, time.time()), waited)
+
+    def _check_wait(self, wait: float, waited: float) -> float:
+        """
+        Raise HTRateLimitError if the limiter can not wait for wait more seconds
+        """
+        if wait > 0 and (not self.blocking
+                         or (self.max_wait is not None and waited + wait > self.max_wait)):
+            self._count(throttles=1)
+            raise ht_error.HTRateLimitError(
+                f"request rate limit reached (next request in {wait:.2f}s)")
+
+        return wait
+
+    def acquire(self, consumer_key: Optional[str] = None, token_key: Optional[str] = None):
+        """
+        Wait until a request can be sent for a consumer key and an access token
+        """
+        buckets = self._buckets(consumer_key, token_key)
+        waited = 0.
+
+        if buckets:
+            while True:
+                wait = self._next_wait(buckets, waited)
+                if wait == 0:
+                    break
+                time.sleep(wait)
+                waited += wait
+
+        self._count(requests=1, waits=int(waited > 0), wait_time=waited)
+
+    async def acquire_async(self,
+                            consumer_key: Optional[str] = None,
+                            token_key: Optional[str] = None,
+                            ):
+        """
+        Wait until a request can be sent, without blocking the event loop
+
+        Tokens of stores other than HTMemoryBucketStore are taken in a separate
+        thread, as they may wait for a lock held by another process.
+        """
+        buckets = self._buckets(consumer_key, token_key)
+        waited = 0.
+        in_memory = isinstance(self.store, HTMemoryBucketStore)
+
+        if buckets:
+            while True:
+                wait = (self._next_wait(buckets, waited) if in_memory
+                        else await asyncio.to_thread(self._next_wait, buckets, waited))
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+                waited += wait
+
+        self._count(requests=1, waits=int(waited > 0), wait_time=waited)
+
+    def acquire_any(self, consumer_key: Optional[str], token_keys: Sequence[str]) -> str:
+        """
+        Wait until a request can be sent for a consumer key and one of several
+        access tokens, which are tried in the given order
+
+        :return: access token for which the request can be sent
+        """
+        if not token_keys:
+            raise ValueError("token_keys must not be empty")
+
+        waited = 0.
+
+        while True:
+            waits = list()
+            for token_key in token_keys:
+                buckets = self._buckets(consumer_key, token_key)
+                wait = self.store.take(buckets, time.time()) if buckets else 0
+                if wait == 0:
+                    self._count(requests=1, waits=int(waited > 0), wait_time=waited)
+                    return token_key
+                waits.append(wait)
+
+            wait = self._check_wait(min(waits), waited)
+            time.sleep(wait)
+            waited += wait
@@ -0,0 +1,215 @@
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from pychpp.fixtures import ht_error
+
+
+class HTCircuitBreaker:
+    """
+    Circuit breaker of a CHPP file
+
+    After failure_threshold consecutive failures, the circuit is open and
+    requests are rejected at once. After recovery_time seconds, it is half open:
+    one trial request is sent, which closes the circuit if it succeeds,
+    or opens it again if it fails. If the trial request does not end after
+    recovery_time seconds, another one is sent.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_sent_at: Optional[float] = None
+
+    def allow(self, now: float) -> bool:
+        """
+        Return True if a request can be sent
+        """
+        if self.state == self.OPEN:
+            if now - self.opened_at < self.recovery_time:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_sent_at = None
+
+        if self.state == self.HALF_OPEN:
+            if (self._trial_sent_at is not None
+                    and now - self._trial_sent_at < self.recovery_time):
+                return False
+            self._trial_sent_at = now
+
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = now
+
+
+class HTRetryPolicy:
+    """
+    Retry policy of CHPP requests
+
+    Failed requests (connection errors and retry_statuses responses) are retried
+    after a jittered exponential backoff, while the retry budget allows it: each
+    request adds budget_ratio to the budget, and each retry takes 1 from it, so that
+    retries stay a fraction of requests during outages. Each CHPP file has its own
+    circuit breaker, so that a failing file does not slow down requests to other ones.
+
+    A same policy can be shared by several CHPP instances.
+    """
+
+    def __init__(self,
+                 max_attempts: int = 4,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.,
+                 retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504),
+                 budget_ratio: float = 0.1,
+                 budget_max: float = 10.,
+                 failure_threshold: int = 5,
+                 recovery_time: float = 30.,
+                 ):
+        """
+        :param max_attempts: maximum number of attempts of a request (1 to never retry)
+        :param base_delay: maximum delay (in seconds) before the first retry,
+                           doubled at each retry
+        :param max_delay: maximum delay (in seconds) before a retry
+        :param retry_statuses: HTTP status codes of failed responses
+        :param budget_ratio: part of a retry added to the budget by each request
+        :param budget_max: maximum (and initial) budget, in retries
+        :param failure_threshold: consecutive failures of a file opening its circuit
+        :param recovery_time: time (in seconds) before a trial request is sent
+                              to a file whose circuit is open
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be greater than 0")
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+
+        self._lock = threading.Lock()
+        self._budget = budget_max
+        self._breakers: Dict[Optional[str], HTCircuitBreaker] = dict()
+        self.stats = {'retries': 0, 'budget_exhausted': 0, 'rejected': 0}
+
+    def _breaker(self, file: Optional[str]) -> HTCircuitBreaker:
+        breaker = self._breakers.get(file)
+        if breaker is None:
+            breaker = self._breakers[file] = HTCircuitBreaker(self.failure_threshold,
+                                                              self.recovery_time)
+        return breaker
+
+    @property
+    def budget(self) -> float:
+        """
+        Number of retries currently allowed by the budget
+        """
+        return self._budget
+
+    def states(self) -> Dict[Optional[str], str]:
+        """
+        Return circuit states ('closed', 'open' or 'half_open'), by CHPP file
+        """
+        with self._lock:
+            return {file: breaker.state for file, breaker in self._breakers.items()}
+
+    def reset(self, file: Optional[str] = None):
+        """
+        Close the circuit of a file (of all files if None)
+        """
+        with self._lock:
+            if file is None:
+                self._breakers.clear()
+            else:
+                self._breakers.pop(file, None)
+
+    def before_attempt(self, file: Optional[str], attempt: int):
+        """
+        Check that a request can be sent, before each attempt
+
+        :param file: CHPP file of the request
+        :param attempt: number of the attempt (0 for the first one)
+        :raise HTCircuitOpenError: if the circuit of the file is open
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            breaker = self._breaker(file)
+
+            if not breaker.allow(now):
+                self.stats['rejected'] += 1
+                since = (breaker.opened_at if breaker.state == breaker.OPEN
+                         else breaker._trial_sent_at)
+                remaining = max(0., since + breaker.recovery_time - now)
+                raise ht_error.HTCircuitOpenError(
+                    f"requests to '{file}' are failing, they are rejected for "
+                    f"{remaining:.0f}s")
+
+            if attempt == 0:
+                self._budget = min(self.budget_max, self._budget + self.budget_ratio)
+
+    def record_success(self, file: Optional[str]):
+        with self._lock:
+            self._breaker(file).record_success()
+
+    def record_failure(self, file: Optional[str], attempt: int, retry: bool = True,
+                       retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Record a failed attempt, and return the delay (in seconds) before retrying
+
+        :param file: CHPP file of the request
+        :param attempt: number of the failed attempt (0 for the first one)
+        :param retry: if False, the request can not be retried (only the failure is recorded)
+        :param retry_after: delay requested by Hattrick (Retry-After header), if any
+        :return: delay before the next attempt, or None if the request must not be retried
+        """
+        with self._lock:
+            breaker = self._breaker(file)
+            breaker.record_failure(time.monotonic())
+
+            if (not retry
+                    or attempt + 1 >= self.max_attempts
+                    or breaker.state == breaker.OPEN):
+                return None
+
+            if self._budget < 1:
+                self.stats['budget_exhausted'] += 1
+                return None
+
+            self._budget -= 1
+            self.stats['retries'] += 1
+
+        # full jitter, so that clients failing together do not retry together
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        Parse a Retry-After header given in seconds (HTTP dates are ignored)
+        """
+        try:
+            return max(0., float(value)) if value is not None else None
+        except ValueError:
+            return None
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class _HTCall:
+    """
+    Request in flight, shared by the threads waiting for it
+    """
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class HTSingleFlight:
+    """
+    Group of requests in flight, shared between threads
+
+    While a request is in flight, other threads calling do with the same key
+    wait for it and get its result (or its exception), instead of sending
+    the same request again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _HTCall] = dict()
+        self.stats = {'calls': 0, 'shared': 0}
+
+    def do(self, key: str, func: Callable, *args, **kwargs):
+        """
+        Call func, unless a call with the same key is already in flight
+
+        :param key: key identifying the request
+        :param func: function sending the request
+        :return: value returned by func, for this call or for the call in flight
+        """
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            in_flight = call is not None
+            if in_flight:
+                self.stats['shared'] += 1
+            else:
+                call = self._calls[key] = _HTCall()
+
+        if in_flight:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = func(*args, **kwargs)
+            return call.value
+
+        except BaseException as e:
+            call.error = e
+            raise
+
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class HTAsyncSingleFlight:
+    """
+    Group of requests in flight, shared between tasks of an event loop
+
+    Asynchronous counterpart of HTSingleFlight.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = dict()
+        self.stats = {'calls': 0, 'shared': 0}
+
+    async def do(self, key: str, func: Callable, *args, **kwargs):
+        """
+        Await func, unless a call with the same key is already in flight
+
+        :param key: key identifying the request
+        :param func: coroutine function sending the request
+        :return: value returned by func, for this call or for the call in flight
+        """
+        self.stats['calls'] += 1
+
+        while key in self._calls:
+            future = self._calls[key]
+            self.stats['shared'] += 1
+            try:
+                # cancelling a waiting task does not cancel the call in flight
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # the task sending the request was cancelled, the request is sent again
+                self.stats['shared'] -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+
+        try:
+            value = await func(*args, **kwargs)
+
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        except BaseException as e:
+            future.set_exception(e)
+            # avoid 'exception was never retrieved' warnings if no task is waiting
+            future.exception()
+            raise
+
+        else:
+            future.set_result(value)
+            return value
+
+        finally:
+            del self._calls[key]
@@ -0,0 +1,131 @@
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass(eq=False)
+class HTSpan:
+    """
+    Timed operation (a request or a model construction), with its nested operations
+    """
+    name: str
+    kind: str
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    parent: Optional['HTSpan'] = field(default=None, repr=False)
+    children: List['HTSpan'] = field(default_factory=list, repr=False)
+    start: float = 0.
+    end: Optional[float] = None
+    allocated: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """
+        Duration of the span (in seconds), None if it is not ended
+        """
+        return self.end - self.start if self.end is not None else None
+
+    def walk(self, depth: int = 0) -> Iterator[tuple]:
+        """
+        Iterate over this span and its descendants, as (depth, span) tuples
+        """
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+
+# span currently open in this thread or task
+_current_span: ContextVar[Optional[HTSpan]] = ContextVar('pychpp_current_span', default=None)
+
+
+class HTTracer:
+    """
+    Tracer opening spans for requests and model constructions
+
+    Spans opened while another span is open are its children, so that the
+    cost of a high-level call can be seen as a tree:
+
+    >>> tracer = HTTracer(trace_allocations=True)
+    >>> chpp = CHPP(consumer_key, consumer_secret, key, secret, tracer=tracer)
+    >>> with tracer.span('formations'):
+    ...     chpp.match_lineup(match_id=68599186, team_id=429399).team_lineup.formations
+    >>> print(tracer.format())
+    """
+
+    def __init__(self, trace_allocations: bool = False, max_roots: int = 1000):
+        """
+        :param trace_allocations: if True, memory allocated during each span is
+                                  recorded with tracemalloc (which is started if needed,
+                                  and slows down the program)
+        :param max_roots: maximum number of root spans kept (oldest ones are dropped)
+        """
+        self.trace_allocations = trace_allocations
+        self.roots: deque = deque(maxlen=max_roots)
+        self._lock = threading.Lock()
+
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def span(self, name: str, kind: str = 'custom', **attributes) -> Iterator[HTSpan]:
+        """
+        Open a span, child of the span currently open (if any)
+
+        :param name: name of the span
+        :param kind: kind of the span ('request', 'model' or 'custom')
+        :param attributes: attributes of the span
+        """
+        parent = _current_span.get()
+        span = HTSpan(name=name, kind=kind, attributes=attributes, parent=parent)
+
+        if parent is not None:
+            parent.children.append(span)
+        else:
+            with self._lock:
+                self.roots.append(span)
+
+        token = _current_span.set(span)
+        allocated = tracemalloc.get_traced_memory()[0] if self.trace_allocations else None
+        span.start = time.perf_counter()
+
+        try:
+            yield span
+
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+
+        finally:
+            span.end = time.perf_counter()
+            if allocated is not None:
+                span.allocated = tracemalloc.get_traced_memory()[0] - allocated
+            _current_span.reset(token)
+
+    def clear(self):
+        """
+        Remove all recorded spans
+        """
+        with self._lock:
+            self.roots.clear()
+
+    def format(self) -> str:
+        """
+        Return recorded spans as an indented tree, with their durations
+        (and allocated memory, if traced)
+        """
+        lines = list()
+        for root in list(self.roots):
+            for depth, span in root.walk():
+                line = f"{'  ' * depth}{span.name} {(span.duration or 0) * 1000:.3f} ms"
+                if span.allocated is not None:
+                    line += f" {span.allocated / 1024:+.1f} KiB"
+                if span.error is not None:
+                    line += f" ({span.error})"
+                lines.append(line)
+
+        return '\n'.join(lines)
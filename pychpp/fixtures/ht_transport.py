@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests_oauthlib import OAuth1
+from urllib3 import Retry
+
+
+@dataclass(frozen=True)
+class HTCredentials:
+    """
+    OAuth credentials of a CHPP application and of one of its users
+    """
+    consumer_key: str
+    consumer_secret: str
+    access_token_key: Optional[str] = None
+    access_token_secret: Optional[str] = None
+
+    def __repr__(self):
+        # secrets are not shown in logs and tracebacks
+        return f"<HTCredentials object - {self.consumer_key}:{self.access_token_key}>"
+
+    def auth(self) -> OAuth1:
+        """
+        Return the OAuth1 signer of requests sent with these credentials
+        """
+        return OAuth1(client_key=self.consumer_key,
+                      client_secret=self.consumer_secret,
+                      resource_owner_key=self.access_token_key,
+                      resource_owner_secret=self.access_token_secret,
+                      )
+
+
+class HTTransport:
+    """
+    Pool of HTTP connections to Hattrick, shared by CHPP instances
+
+    Requests of all instances using a same transport are sent through one
+    requests session, whose connections are kept alive and reused. Each instance
+    signs its own requests with its credentials.
+    """
+
+    def __init__(self,
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 pool_block: bool = False,
+                 max_retries: Union[int, Retry] = 0,
+                 ):
+        """
+        :param pool_connections: number of hosts whose connection pools are kept
+        :param pool_maxsize: maximum number of connections kept alive by host
+        :param pool_block: if True, wait for a free connection when pool_maxsize
+                           connections are in use, instead of opening a new one
+        :param max_retries: retry strategy of urllib3, requests being already retried
+                            by CHPP instances according to their retry policy
+        """
+        if pool_connections < 1 or pool_maxsize < 1:
+            raise ValueError("pool_connections and pool_maxsize must be greater than 0")
+
+        self.session = requests.Session()
+
+        # cookies set for a user must not be sent with requests of other users
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=max_retries,
+        ))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """
+        Close all connections of the pool
+        """
+        self.session.close()
@@ -32,7 +32,7 @@ class HTTransferHistory:
                     **kwargs,
                 )
 
-                self.transfers += xml_transfers.transfers.transfer_items
+                self.transfers = [*self.transfers, *xml_transfers.transfers.transfer_items]
 
                 self.start_date = (xml_transfers.transfers.start_date
                                    if xml_transfers.transfers.start_date < self.start_date
@@ -0,0 +1,106 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import xml.etree.ElementTree as ElementTree
+
+from pychpp.fixtures.ht_datetime import HTTimestamp
+from pychpp.models.ht_version import HTVersionConstraint
+from pychpp.models.ht_xml import HTXPath, _ht_datetime_snapshot
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency
+    np = None
+
+
+@dataclass(frozen=True)
+class HTColumnPlan:
+    """
+    Column of a HTModel class, compiled once per class and xml prefix
+
+    A column is a scalar field of the class, or of one of its nested models
+    (whose name is then dotted, e.g. 'details.age').
+    """
+    name: str
+    type: Any
+    xpaths: Tuple[HTXPath, ...]
+    attrib: Optional[str] = None
+    versions: Tuple[HTVersionConstraint, ...] = ()
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required to export columns, "
+                          "install it with 'pip install pychpp[numpy]'")
+
+
+def _find_value(node: ElementTree.Element, column: HTColumnPlan) -> Optional[str]:
+    for xpath in column.xpaths:
+        node = node.find(xpath.tag) if xpath.tag is not None else xpath.find(node)
+        if node is None:
+            return None
+
+    return node.attrib.get(column.attrib) if column.attrib is not None else node.text
+
+
+def _to_array(values: List[Optional[str]], type_) -> 'np.ndarray':
+    """
+    Convert xml values of a column to an array, according to the column type
+
+    int and bool columns with missing values are converted to float64 columns
+    (with NaN for missing values), as numpy integers and booleans cannot be missing.
+    """
+    if type_ is int:
+        values = [None if v == 'Not available' else v for v in values]
+        if None in values:
+            return np.array(['nan' if v is None else v for v in values]).astype(np.float64)
+        return np.array(values).astype(np.int64)
+
+    elif type_ is float:
+        return np.array(['nan' if v is None else v.replace(',', '.')
+                         for v in values]).astype(np.float64)
+
+    elif type_ is bool:
+        values = [None if v is None
+                  else (v == '1' if v in ('0', '1') else v.capitalize() == 'True')
+                  for v in values]
+        if None in values:
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return np.array(values, dtype=np.bool_)
+
+    elif type_ is datetime or type_ is HTTimestamp:
+        # values are kept as Hattrick wall time (CET/CEST), as in xml data, and
+        # values that models convert to None (as 0001-01-01 00:00:00) are missing
+        return np.array(['NaT' if v is None or _ht_datetime_snapshot(v) is None else v
+                         for v in values], dtype='datetime64[s]')
+
+    else:
+        return np.array(values, dtype=object)
+
+
+def to_columns(nodes: List[ElementTree.Element],
+               columns: List[HTColumnPlan],
+               structured: bool = False,
+               ) -> Any:
+    """
+    Build typed arrays from xml nodes of list items
+
+    :param nodes: xml nodes of items
+    :param columns: columns to export
+    :param structured: if True, return a numpy structured array instead of a dict of arrays
+    :return: a dict of numpy arrays (by column name), or a numpy structured array
+    """
+    _require_numpy()
+
+    arrays: Dict[str, 'np.ndarray'] = dict()
+    for column in columns:
+        arrays[column.name] = _to_array([_find_value(n, column) for n in nodes], column.type)
+
+    if not structured:
+        return arrays
+
+    array = np.empty(len(nodes), dtype=[(name, a.dtype) for name, a in arrays.items()])
+    for name, a in arrays.items():
+        array[name] = a
+
+    return array
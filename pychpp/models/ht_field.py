@@ -6,7 +6,17 @@ from pychpp.models import ht_model
 
 @dataclass
 class HTBaseField:
-    pass
+
+    def __set_name__(self, owner, name):
+        self._name = name
+
+    def __get__(self, instance, owner=None):
+        # On a lazy HTModel instance, the field is transformed on first access
+        # and then cached in the instance dict, which takes precedence over
+        # this (non-data) descriptor for further accesses
+        if instance is None or instance.__dict__.get('_data') is None:
+            return self
+        return instance._load_field(self._name)
 
 
 @dataclass
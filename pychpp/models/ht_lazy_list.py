@@ -0,0 +1,57 @@
+from collections.abc import Sequence
+from typing import Any, Callable, List, Optional
+import xml.etree.ElementTree as ElementTree
+
+
+class HTLazyList(Sequence):
+    """
+    Sequence of items built on demand from xml nodes
+
+    Items are only built when they are accessed, then cached.
+    len() and slicing do not build any item.
+    """
+
+    __slots__ = ('_nodes', '_factory', '_items')
+
+    def __init__(self,
+                 nodes: List[ElementTree.Element],
+                 factory: Callable[[ElementTree.Element], Any],
+                 ):
+        """
+        :param nodes: xml nodes of items
+        :param factory: callable building an item from its xml node
+        """
+        self._nodes = nodes
+        self._factory = factory
+        self._items: List[Optional[Any]] = [None] * len(nodes)
+
+    def _get_item(self, index: int):
+        item = self._items[index]
+        if item is None:
+            item = self._factory(self._nodes[index])
+            self._items[index] = item
+        return item
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            sliced = HTLazyList(self._nodes[index], self._factory)
+            sliced._items = self._items[index]
+            return sliced
+
+        # negative and out of range indexes are handled as for a list
+        return self._get_item(range(len(self._nodes))[index])
+
+    def __iter__(self):
+        for i in range(len(self._nodes)):
+            yield self._get_item(i)
+
+    def __eq__(self, other):
+        if isinstance(other, (HTLazyList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<HTLazyList object - {len(self)} items>"
@@ -1,21 +1,37 @@
+import importlib
+import io
 import pathlib
-from copy import copy
-from typing import Optional, Type, Dict, Any
+import pickle
+import time
+from dataclasses import dataclass, field as dataclass_field, replace
+from typing import Optional, Type, Dict, Any, Callable, Tuple, Iterator
 import xml.etree.ElementTree as ElementTree
 from datetime import datetime, date
 from typing import get_type_hints, get_origin, Union, get_args
 
 import pychpp.chpp as _chpp
+from pychpp.fixtures import ht_datetime
 from pychpp.models.ht_version import HTVersionConstraint, HTVersion
-from pychpp.models.ht_xml import HTXml
+from pychpp.models.ht_xml import HTXml, HTXPath
 from pychpp.models.ht_field import HTBaseField, HTField, HTAliasField, HTProxyField
 from pychpp.models.ht_init_var import HTInitVar
+from pychpp.models.ht_lazy_list import HTLazyList
+from pychpp.models import ht_columns
+from pychpp.models.ht_columns import HTColumnPlan
+
+
+# HTModel classes which can be referenced in snapshots, by module and qualified name
+_SNAPSHOT_CLASSES: Dict[Tuple[str, str], type] = dict()
+
+# Only modules of this package are imported to find classes referenced in snapshots
+_SNAPSHOT_MODULES_PREFIX = 'pychpp.models.'
 
 
 class MetaHTModel(type):
     """
     Metaclass used for registering ht_init_vars and ht_fields
-    declared in current class and its ancestors
+    declared in current class and its ancestors, and for registering
+    classes which can be restored from snapshots
     """
     def __new__(cls, name, bases, dict_):
 
@@ -38,7 +54,55 @@ class MetaHTModel(type):
                 dict_['_ht_init_vars'].pop(attr_name, None)
                 dict_['_ht_init_vars'][attr_name] = attr_value
 
-        return super().__new__(cls, name, bases, dict_)
+        new_cls = super().__new__(cls, name, bases, dict_)
+        _SNAPSHOT_CLASSES[(new_cls.__module__, new_cls.__qualname__)] = new_cls
+        return new_cls
+
+
+@dataclass(frozen=True)
+class HTFieldPlan:
+    """
+    Field of a HTModel class, compiled once per class
+
+    Gather everything needed to transform xml data into an attribute value,
+    so that type hints are not introspected again for each instance.
+    """
+    name: str
+    field: HTBaseField
+    type: Any = None
+    item_type: Any = None
+    is_optional: bool = False
+    converter: Optional[Callable] = None
+    # converter of datetime fields, when instances use HTTimestamp objects
+    timestamp_converter: Optional[Callable] = None
+    path: Optional[str] = None
+    version: Optional[HTVersionConstraint] = None
+    # compiled xml paths, by xml prefix of the instances using this field
+    xpaths: Dict[str, HTXPath] = dataclass_field(default_factory=dict, compare=False, repr=False)
+
+
+@dataclass(frozen=True)
+class HTInitVarPlan:
+    """
+    Request argument of a HTModel class, compiled once per class
+    """
+    name: str
+    init_var: HTInitVar
+    is_optional: bool = False
+    converter: Optional[Callable] = None
+
+
+_SNAPSHOT_PLAIN_TYPES = frozenset((type(None), bool, int, float, str, bytes))
+
+
+class HTSnapshotUnpickler(pickle.Unpickler):
+    """
+    Unpickler for HTModel snapshots, which only hold plain values:
+    no class is ever loaded, so that loading a snapshot cannot run any code
+    """
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"forbidden global '{module}.{name}' in snapshot")
 
 
 class HTModel(metaclass=MetaHTModel):
@@ -49,16 +113,34 @@ class HTModel(metaclass=MetaHTModel):
     URL_PATH: Optional[str] = None
     XML_PREFIX: str = ''
     XML_FILTER: str = ''
+    LAZY: bool = False
+    LAZY_LISTS: bool = False
+    TIMESTAMPS: bool = False
 
     _ht_fields: Dict[str, Union[HTField, HTAliasField]]
     _ht_init_vars: Dict[str, HTInitVar]
 
+    SNAPSHOT_FORMAT = ('pychpp', 1)
+    # instance attributes which are not stored in snapshots
+    _SNAPSHOT_EXCLUDED = frozenset(('_chpp', '_data', '_xml_contexts'))
+
+    @classmethod
+    def _get_type_hints(cls) -> Dict[str, Any]:
+        """
+        Return class type hints, resolved once and cached on the class
+        """
+        type_hints = cls.__dict__.get('_ht_type_hints')
+        if type_hints is None:
+            type_hints = get_type_hints(cls)
+            cls._ht_type_hints = type_hints
+        return type_hints
+
     @classmethod
     def is_optional_attrib(cls, attrib: str) -> bool:
         """
         Check if an attribute is optional according to its typehint
         """
-        typehint = get_type_hints(cls).get(attrib)
+        typehint = cls._get_type_hints().get(attrib)
         return get_origin(typehint) is Union and type(None) in get_args(typehint)
 
     @classmethod
@@ -66,7 +148,7 @@ class HTModel(metaclass=MetaHTModel):
         """
         Return attribute type from its typehint
         """
-        typehint = get_type_hints(cls).get(attrib)
+        typehint = cls._get_type_hints().get(attrib)
 
         _type = typehint
         if cls.is_optional_attrib(attrib):
@@ -85,7 +167,7 @@ class HTModel(metaclass=MetaHTModel):
             return None
 
         else:
-            typehint = get_type_hints(cls).get(attrib)
+            typehint = cls._get_type_hints().get(attrib)
 
             if cls.is_optional_attrib(attrib):
                 list_hint = list(*{get_args(typehint)}.difference({type(None)}))[0]
@@ -101,12 +183,229 @@ class HTModel(metaclass=MetaHTModel):
             else:
                 return list_arg[0]
 
+    @classmethod
+    def _get_converter(cls, type_: Any, is_optional: bool) -> Optional[Callable]:
+        """
+        Return the HTXml method used to convert a xml node according to its type
+        """
+        if type_ is int:
+            return HTXml.ht_int
+        elif type_ is str:
+            return HTXml.ht_str
+        elif type_ is float:
+            return HTXml.ht_float
+        elif type_ is bool:
+            return HTXml.ht_bool
+        elif type_ is datetime and is_optional:
+            return HTXml.ht_datetime_from_text
+        elif type_ is datetime:
+            return HTXml.opt_ht_datetime_from_text
+        elif type_ is ht_datetime.HTTimestamp and is_optional:
+            return HTXml.ht_timestamp_from_text
+        elif type_ is ht_datetime.HTTimestamp:
+            return HTXml.opt_ht_timestamp_from_text
+        else:
+            return None
+
+    @classmethod
+    def _compile_field(cls, name: str, field: HTBaseField) -> HTFieldPlan:
+        """
+        Compile a class field into a HTFieldPlan
+        """
+        if isinstance(field, HTAliasField):
+            return HTFieldPlan(name=name, field=field)
+
+        type_ = cls.get_type(name)
+        is_optional = cls.is_optional_attrib(name)
+
+        plan = dict(name=name,
+                    field=field,
+                    type=type_,
+                    item_type=cls.get_item_type(name),
+                    is_optional=is_optional,
+                    converter=cls._get_converter(type_, is_optional),
+                    )
+
+        if type_ is datetime:
+            plan['timestamp_converter'] = cls._get_converter(ht_datetime.HTTimestamp,
+                                                             is_optional)
+
+        # HTProxyField allow to reference a value according to another HTField attribute
+        # (instead of giving the actual xml path), it is resolved once for all here
+        if isinstance(field, HTProxyField):
+            field, plan['path'] = cls._resolve_proxy_field(name, field)
+            plan['field'] = field
+
+        elif isinstance(field, HTField):
+            plan['path'] = field.path
+
+        if isinstance(field, HTField) and field.version is not None:
+            plan['version'] = HTVersionConstraint(field.version)
+
+        return HTFieldPlan(**plan)
+
+    @classmethod
+    def _resolve_proxy_field(cls, name: str, field: HTProxyField):
+        """
+        Return the field referenced by a HTProxyField, and its xml path
+
+        Returned field is a copy of the referenced one (with suppl_attrs of the proxy),
+        so that neither the proxy nor the referenced field are modified.
+        """
+        proxy_path = field.xml_prefix
+        target_cls = field.cls
+        target_field = field
+        attr_name = field.attr_name if field.attr_name is not None else name
+
+        previous_xml_prefix = ''
+        for level in attr_name.split('.'):
+            type_ = target_cls.get_type(level)
+            target_field = getattr(target_cls, level)
+
+            # a proxy may reference another proxy, which is already resolved
+            # in the field plan of its own class
+            if isinstance(target_field, HTProxyField):
+                target_plan = target_cls._get_field_plan_index()[level]
+                target_field, target_path = target_plan.field, target_plan.path
+            else:
+                target_path = target_field.path
+
+            if proxy_path and proxy_path[-1] != '/':
+                proxy_path += '/'
+            proxy_path += previous_xml_prefix + target_path
+            previous_xml_prefix = (target_field.xml_prefix
+                                   if target_field.xml_prefix is not None
+                                   else '')
+
+            if isinstance(type_, type) and issubclass(type_, HTModel):
+                target_cls = type_
+
+        if isinstance(target_field, HTField):
+            target_field = replace(target_field, suppl_attrs=field.suppl_attrs)
+
+        return target_field, proxy_path
+
+    @classmethod
+    def _get_field_plan(cls) -> Tuple[HTFieldPlan, ...]:
+        """
+        Return the compiled fields of the class
+
+        The plan is compiled on first use, as forward references used in
+        type hints can only be resolved once their module is fully loaded,
+        and is then cached on the class.
+        """
+        field_plan = cls.__dict__.get('_ht_field_plan')
+        if field_plan is None:
+            field_plan = tuple(cls._compile_field(name, field)
+                               for name, field in cls._ht_fields.items()
+                               if isinstance(field, (HTField, HTAliasField, HTProxyField)))
+            cls._ht_field_plan = field_plan
+        return field_plan
+
+    @classmethod
+    def _get_field_plan_index(cls) -> Dict[str, HTFieldPlan]:
+        """
+        Return the compiled fields of the class, indexed by name
+        """
+        index = cls.__dict__.get('_ht_field_plan_index')
+        if index is None:
+            index = {p.name: p for p in cls._get_field_plan()}
+            cls._ht_field_plan_index = index
+        return index
+
+    @classmethod
+    def _get_column_plan(cls, xml_prefix: str) -> Tuple[HTColumnPlan, ...]:
+        """
+        Return the columns of the class for a xml prefix, cached on the class
+
+        Columns are scalar fields of the class and of its nested models (list fields,
+        alias fields, and nested models filtered by XML_FILTER are not exported).
+        """
+        column_plans = cls.__dict__.get('_ht_column_plans')
+        if column_plans is None:
+            column_plans = dict()
+            cls._ht_column_plans = column_plans
+
+        columns = column_plans.get(xml_prefix)
+        if columns is not None:
+            return columns
+
+        columns = list()
+        for field_plan in cls._get_field_plan():
+            if field_plan.path is None or field_plan.type is list:
+                continue
+
+            versions = (field_plan.version,) if field_plan.version is not None else ()
+            xpath = HTXPath.compile(xml_prefix, field_plan.path)
+
+            if field_plan.converter is not None:
+                columns.append(HTColumnPlan(name=field_plan.name,
+                                            type=field_plan.type,
+                                            xpaths=(xpath,),
+                                            attrib=field_plan.field.attrib,
+                                            versions=versions,
+                                            ))
+
+            elif (isinstance(field_plan.type, type)
+                  and issubclass(field_plan.type, HTModel)
+                  and not field_plan.type.XML_FILTER):
+                nested_prefix = (field_plan.field.xml_prefix
+                                 if field_plan.field.xml_prefix is not None
+                                 else field_plan.type.XML_PREFIX)
+                for column in field_plan.type._get_column_plan(nested_prefix):
+                    columns.append(replace(column,
+                                           name=f"{field_plan.name}.{column.name}",
+                                           xpaths=(xpath,) + column.xpaths,
+                                           versions=versions + column.versions,
+                                           ))
+
+        columns = tuple(columns)
+        column_plans[xml_prefix] = columns
+        return columns
+
+    @classmethod
+    def _get_init_var_plan(cls) -> Tuple[HTInitVarPlan, ...]:
+        """
+        Return the compiled request arguments of the class, cached on the class
+        """
+        init_var_plan = cls.__dict__.get('_ht_init_var_plan')
+
+        if init_var_plan is None:
+            compiled = list()
+
+            for name, init_var in cls._ht_init_vars.items():
+
+                # query parameters are converted according to their typehints
+                type_ = cls.get_type(name)
+                if type_ in (str, int):
+                    converter = str
+                elif type_ == date:
+                    converter = HTXml.ht_date_to_text
+                elif type_ == datetime:
+                    converter = HTXml.ht_datetime_to_text
+                else:
+                    converter = None
+
+                compiled.append(HTInitVarPlan(name=name,
+                                              init_var=init_var,
+                                              is_optional=cls.is_optional_attrib(name),
+                                              converter=converter,
+                                              ))
+
+            init_var_plan = tuple(compiled)
+            cls._ht_init_var_plan = init_var_plan
+
+        return init_var_plan
+
     def __init__(self,
                  chpp: Union['_chpp.CHPPBase', '_chpp.CHPPXml', '_chpp.CHPP'],
                  data: Optional[ElementTree.Element] = None,
                  version: Optional[str] = None,
                  xml_prefix: str = None,
                  suppl_attrs: dict = None,
+                 lazy: bool = None,
+                 lazy_lists: bool = None,
+                 timestamps: bool = None,
                  **kwargs,
                  ):
         """
@@ -117,6 +416,14 @@ class HTModel(metaclass=MetaHTModel):
         :param version: xml file version to fetch
         :param xml_prefix: default prefix added to tag names used to parse xml data
         :param suppl_attrs: attributes dynamically added to the instance
+        :param lazy: if True, fields (including nested models and lists) are only
+                     transformed on first access, defaults to LAZY class attribute
+        :param lazy_lists: if True, list fields of models are HTLazyList objects, whose
+                           items are only built on access, defaults to LAZY_LISTS class
+                           attribute
+        :param timestamps: if True, datetime fields of models are HTTimestamp objects
+                           instead of HTDatetime ones, defaults to TIMESTAMPS class
+                           attribute
         """
 
         if not isinstance(chpp, _chpp.CHPPBase):
@@ -132,6 +439,9 @@ class HTModel(metaclass=MetaHTModel):
         self._data = data
         self._url = ''
         self._requests_args = dict()
+        self._lazy = lazy if lazy is not None else self.LAZY
+        self._lazy_lists = lazy_lists if lazy_lists is not None else self.LAZY_LISTS
+        self._timestamps = timestamps if timestamps is not None else self.TIMESTAMPS
 
         self.version = (HTVersion(version)
                         if version is not None
@@ -143,40 +453,81 @@ class HTModel(metaclass=MetaHTModel):
             for attr_name, attr_value in suppl_attrs.items():
                 setattr(self, attr_name, attr_value)
 
+        if chpp.tracer is not None:
+            with chpp.tracer.span(type(self).__name__, kind='model'):
+                self._build(**kwargs)
+        else:
+            self._build(**kwargs)
+
+    def _build(self, **kwargs):
+        """
+        Fetch data if needed, then transform fields (unless in lazy mode)
+        """
+        fetched = self._data is None
+
         # if data is None, fetch data on Hattrick
-        if self._data is None:
+        if fetched:
             self._fetch(**kwargs)
 
         # Once data is obtained, transform HTField to actual values
-        self._transform_fields()
+        # (in lazy mode, each field is transformed on first access)
+        if not self._lazy:
+            if fetched and self._chpp.metrics is not None:
+                start = time.perf_counter()
+                self._transform_fields()
+                self._chpp.metrics.observe(self.SOURCE_FILE, 'transform',
+                                           time.perf_counter() - start)
+            else:
+                self._transform_fields()
 
-    def _fetch(self, **kwargs):
+    @classmethod
+    def _build_requests_args(cls, **kwargs) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Build request arguments from ht_init_vars of the class
 
-        # data is fetched using ht_init_vars attribute as query parameters
-        for attr, ht_init_var in self._ht_init_vars.items():
+        :return: values of the ht_init_vars attributes, and request arguments
+        """
+        values = dict()
+        requests_args = dict()
+
+        for init_var_plan in cls._get_init_var_plan():
+            ht_init_var = init_var_plan.init_var
 
-            ht_init_var.value = kwargs.get(ht_init_var.init_arg, None)
+            value = kwargs.get(ht_init_var.init_arg, None)
 
-            if ht_init_var.value is None and not self.is_optional_attrib(attr):
+            if value is None and not init_var_plan.is_optional:
                 raise ValueError(f"{ht_init_var.init_arg} argument has to be set "
-                                 f"as {attr} is not optional")
-            elif ht_init_var.value is None:
-                ht_init_var.value = ht_init_var.default
+                                 f"as {init_var_plan.name} is not optional")
+            elif value is None:
+                value = ht_init_var.default
 
             # query parameters are parsed according to their typehints before requesting
-            if ht_init_var.value is not None:
+            if value is not None:
+                if init_var_plan.converter is not None:
+                    value = init_var_plan.converter(value)
+                requests_args[ht_init_var.param] = value
 
-                type_ = self.get_type(attr)
-                if type_ in (str, int):
-                    ht_init_var.value = str(ht_init_var.value)
-                elif type_ == date:
-                    ht_init_var.value = HTXml.ht_date_to_text(ht_init_var.value)
-                elif type_ == datetime:
-                    ht_init_var.value = HTXml.ht_datetime_to_text(ht_init_var.value)
+            values[init_var_plan.name] = value
 
-                self._requests_args[ht_init_var.param] = ht_init_var.value
+        return values, requests_args
 
-            setattr(self, attr, ht_init_var.value)
+    def _set_requests_args(self, **kwargs):
+        """
+        Fill request arguments of the instance from its ht_init_vars
+
+        Values are only stored on the instance (as attributes and in _requests_args),
+        so that several instances of a same class can be built concurrently.
+        """
+        values, requests_args = self._build_requests_args(**kwargs)
+        self._requests_args.update(requests_args)
+
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    def _fetch(self, **kwargs):
+
+        # data is fetched using ht_init_vars attribute as query parameters
+        self._set_requests_args(**kwargs)
 
         # self._data is filled with the file returned by the API call
         self._data = self._chpp.request(file=self.SOURCE_FILE,
@@ -185,138 +536,437 @@ class HTModel(metaclass=MetaHTModel):
                                         **self._requests_args,
                                         )
 
+    @classmethod
+    def stream_items(cls,
+                     chpp: Union['_chpp.CHPPBase', '_chpp.CHPPXml', '_chpp.CHPP'],
+                     field_name: str,
+                     version: Optional[str] = None,
+                     **kwargs,
+                     ) -> Iterator[Any]:
+        """
+        Fetch data on Hattrick and yield items of a list field one by one
+
+        Instead of building the whole xml tree, the response is parsed incrementally,
+        and each item is transformed as soon as it is parsed, then cleared.
+        Memory usage is so bounded by one item, which is useful for large files.
+
+        >>> for match in MatchesArchive.stream_items(chpp, 'matches', team_id=1165592):
+        ...     print(match.id)
+        >>> for match in Matches.stream_items(chpp, 'team.matches', team_id=1165592):
+        ...     print(match.id)
+
+        :param chpp: a CHPPBase object instantiated with credentials to connect to CHPP API
+        :param field_name: name of the list field whose items are streamed
+                           (dotted names are used for fields of nested models)
+        :param version: xml file version to fetch
+        :param kwargs: request arguments, as for class instantiation
+        :return: iterator on items (HTModel instances are never lazy)
+        """
+        if not isinstance(chpp, _chpp.CHPPBase):
+            raise ValueError("chpp must be a CHPP instance")
+
+        elif cls.SOURCE_FILE is None:
+            raise ValueError("items cannot be streamed when class attribute "
+                             "'SOURCE_FILE' is unset")
+
+        version = HTVersion(version) if version is not None else HTVersion(cls.LAST_VERSION)
+
+        # nested fields are walked down to the list field, building its full xml path
+        xml_path = cls.XML_PREFIX + cls.XML_FILTER
+        model_cls = cls
+        levels = field_name.split('.')
+
+        for i, level in enumerate(levels):
+            field_plan = model_cls._get_field_plan_index().get(level)
+            is_last = i == len(levels) - 1
+
+            if (field_plan is None
+                    or field_plan.path is None
+                    or (is_last and field_plan.type is not list)
+                    or (not is_last and not (isinstance(field_plan.type, type)
+                                             and issubclass(field_plan.type, HTModel)))):
+                raise ValueError(f"{cls.__name__}.{field_name} is not a list field")
+
+            if field_plan.version is not None and not field_plan.version.is_valid(version):
+                raise ValueError(f"{cls.__name__}.{field_name} is not available "
+                                 f"in version {version.as_string}")
+
+            xml_path += field_plan.path
+            if not is_last:
+                model_cls = field_plan.type
+                xml_prefix = field_plan.field.xml_prefix
+                xml_path += '/' + (xml_prefix if xml_prefix is not None
+                                   else model_cls.XML_PREFIX) + model_cls.XML_FILTER
+
+        field = field_plan.field
+        item_type = field_plan.item_type
+        xml_path += '/' + field.items
+        item_path = HTXPath(xml_path).plain_tags()
+        if item_path is None:
+            raise ValueError(f"{cls.__name__}.{field_name} cannot be streamed "
+                             f"as its path '{xml_path}' is not only made of tags")
+
+        values, requests_args = cls._build_requests_args(**kwargs)
+
+        suppl_attrs = dict()
+        for k, v in field.suppl_attrs.items():
+            if v not in values:
+                raise ValueError(f"{cls.__name__}.{field_name} cannot be streamed as "
+                                 f"supplementary attribute '{v}' is not a request argument")
+            suppl_attrs[k] = values[v]
+
+        # arguments are checked above, before the first item is requested
+        def iter_items():
+            for data in chpp.stream_request(item_path=item_path,
+                                            file=cls.SOURCE_FILE,
+                                            method=cls.METHOD,
+                                            version=version.as_string,
+                                            **requests_args,
+                                            ):
+                if item_type is str:
+                    yield data.text
+                else:
+                    yield item_type(chpp=chpp,
+                                    data=data,
+                                    version=version.as_string,
+                                    xml_prefix=field.xml_prefix,
+                                    suppl_attrs=suppl_attrs,
+                                    lazy=False,
+                                    lazy_lists=False,
+                                    )
+
+        return iter_items()
+
+    def to_columns(self, field_name: str, structured: bool = False):
+        """
+        Export items of a list field as typed numpy arrays
+
+        Arrays are built straight from xml data, without building item objects.
+        Scalar fields of nested models are exported too, with dotted names
+        (e.g. 'details.age'). int, float, bool and str fields give int64, float64,
+        bool and object arrays (int and bool arrays with missing values are given
+        as float64 arrays, with NaN for missing values), and datetime fields give
+        datetime64[s] arrays, expressed in Hattrick time (CET/CEST).
+
+        >>> search = chpp.xml_transfer_search(age_min=17, age_max=18)
+        >>> columns = search.to_columns('transfer_results')
+        >>> columns['asking_price'][columns['details.keeper_skill'] >= 7]
+
+        numpy is an optional dependency (pip install pychpp[numpy]).
+
+        :param field_name: name of the list field to export
+        :param structured: if True, return a numpy structured array instead of a dict
+        :return: a dict of numpy arrays (by column name), or a numpy structured array
+        """
+        field_plan = self._get_field_plan_index().get(field_name)
+        if (field_plan is None
+                or field_plan.type is not list
+                or not (isinstance(field_plan.item_type, type)
+                        and issubclass(field_plan.item_type, HTModel))):
+            raise ValueError(f"{self.__class__.__name__}.{field_name} "
+                             f"is not a list field of HTModel items")
+
+        field = field_plan.field
+        item_type: Type[HTModel] = field_plan.item_type
+
+        nodes = list()
+        if field_plan.version is None or field_plan.version.is_valid(self.version):
+            xml_node = self._find_node(field_plan)
+            if xml_node is not None:
+                nodes = xml_node.findall(field.items)
+
+        item_prefix = field.xml_prefix if field.xml_prefix is not None else item_type.XML_PREFIX
+        columns = [c for c in item_type._get_column_plan(item_prefix)
+                   if all(v.is_valid(self.version) for v in c.versions)]
+
+        return ht_columns.to_columns(nodes, columns, structured=structured)
+
     def _transform_fields(self):
 
-        # Fill attributes according to class attributes referencing a HTBaseField instance
-
-        for field_name, field in self._ht_fields.items():
-
-            proxy_path = ''
-
-            # HTProxyField allow to reference a value according to another HTField attribute
-            # (instead of giving the actual xml path)
-            if isinstance(field, HTProxyField):
-                field: HTProxyField
-
-                proxy_path = field.xml_prefix
-                target_cls = field.cls
-                target_field = copy(field)
-                if field.attr_name is None:
-                    field.attr_name = field_name
-
-                previous_xml_prefix = ''
-                for level in field.attr_name.split('.'):
-                    type_ = target_cls.get_type(level)
-                    target_field = getattr(target_cls, level)
-                    if proxy_path and proxy_path[-1] != '/':
-                        proxy_path += '/'
-                    proxy_path += previous_xml_prefix + target_field.path
-                    previous_xml_prefix = (target_field.xml_prefix
-                                           if target_field.xml_prefix is not None
-                                           else '')
-
-                    if issubclass(type_, HTModel):
-                        target_cls = type_
-
-                target_field.suppl_attrs = field.suppl_attrs
-                field = target_field
-
-            if isinstance(field, HTField):
-
-                field: HTField
-
-                if (field.version is None
-                        or HTVersionConstraint(field.version).is_valid(self.version)):
-
-                    f_type = self.get_type(field_name)
-                    f_item_type = self.get_item_type(field_name)
-                    f_is_optional = True if self.is_optional_attrib(field_name) else False
-                    path = proxy_path if proxy_path else field.path
-                    xml_path = self.xml_prefix + self.XML_FILTER + path
-                    xml_node = self._data.find(xml_path)
-                    suppl_attrs = {k: getattr(self, v) for k, v in field.suppl_attrs.items()}
-
-                    # instance attribute set to transformed value
-                    # according to typehint
-                    if f_type is list:
-
-                        if xml_node is None:
-                            if not f_is_optional:
-                                raise ValueError(f"{self.__class__} : "
-                                                 f"non optional field {field} returned 'None'")
-                            else:
-                                setattr(self, field_name, list())
-                                continue
-
-                        if f_item_type is str:
-                            setattr(self, field_name, HTXml.ht_str_items(xml_node, field.items))
-                        elif issubclass(f_item_type, HTModel):
-                            f_item_type: Type[HTModel]
-                            setattr(self,
-                                    field_name,
-                                    [f_item_type(chpp=self._chpp,
-                                                 data=i,
-                                                 version=self.version.as_string,
-                                                 xml_prefix=field.xml_prefix,
-                                                 suppl_attrs=suppl_attrs,
-                                                 )
-                                     for i in HTXml.iter_data_items(xml_node, field.items)])
-                        else:
-                            raise ValueError(f"unsupported type '{f_item_type}' for list item")
-
-                    else:
-
-                        if xml_node is None:
-                            if not f_is_optional:
-                                raise ValueError(f"{self.__class__} : "
-                                                 f"non optional field {field} returned 'None'")
-                            else:
-                                setattr(self, field_name, None)
-                                continue
-
-                        if f_type is int:
-                            setattr(self, field_name, HTXml.ht_int(xml_node, attrib=field.attrib))
-
-                        elif f_type is str:
-                            setattr(self, field_name, HTXml.ht_str(xml_node, attrib=field.attrib))
-
-                        elif f_type is float:
-                            setattr(self,
-                                    field_name,
-                                    HTXml.ht_float(xml_node, attrib=field.attrib))
-
-                        elif f_type is bool:
-                            setattr(self, field_name, HTXml.ht_bool(xml_node, attrib=field.attrib))
-
-                        elif f_type is datetime and self.is_optional_attrib(field_name):
-                            setattr(self,
-                                    field_name,
-                                    HTXml.ht_datetime_from_text(xml_node, attrib=field.attrib))
-
-                        elif f_type is datetime:
-                            setattr(self,
-                                    field_name,
-                                    HTXml.opt_ht_datetime_from_text(xml_node, attrib=field.attrib))
-
-                        # if the type is HTModel class, attribute will refer
-                        # to another HTModel object
-                        elif issubclass(f_type, HTModel):
-                            setattr(self, field_name, f_type(chpp=self._chpp,
-                                                             data=xml_node,
-                                                             version=self.version.as_string,
-                                                             xml_prefix=field.xml_prefix,
-                                                             suppl_attrs=suppl_attrs,
-                                                             ))
-
-                        else:
-                            raise ValueError(f"type hint '{f_type}' no implemented")
+        # Fill attributes according to the compiled fields of the class
+        for field_plan in self._get_field_plan():
+            setattr(self, field_plan.name, self._transform_field(field_plan))
+
+    def _load_field(self, name: str):
+        """
+        Transform a field on first access, and cache its value on the instance
+        """
+        value = self._transform_field(self._get_field_plan_index()[name])
+        self.__dict__[name] = value
+        return value
 
+    def _get_xml_contexts(self):
+        """
+        Return the xml nodes selected by xml prefix and XML_FILTER, from which field paths
+        are searched, or None if they cannot be selected apart from field paths
+        """
+        if '_xml_contexts' not in self.__dict__:
+
+            prefix = HTXPath.compile_prefix(self.xml_prefix) if self.xml_prefix else None
+            # XML_FILTER may hold an id, so it is compiled for this instance only
+            xml_filter = HTXPath(self.XML_FILTER, implicit_star=False)
+
+            if ((prefix is not None and (prefix.steps is None or self.xml_prefix[-1] != '/'))
+                    or xml_filter.steps is None
+                    or self.XML_FILTER[-1] != '/'):
+                self._xml_contexts = None
+
+            else:
+                nodes = [(self._data, ())]
+                if prefix is not None:
+                    nodes = prefix.select(nodes)
+                self._xml_contexts = xml_filter.select(nodes)
+
+        return self._xml_contexts
+
+    def _find_node(self, field_plan: HTFieldPlan) -> Optional[ElementTree.Element]:
+        """
+        Return the xml node corresponding to a field
+        """
+        # field paths are compiled once for all (with the xml prefix they are used with)
+        if not self.XML_FILTER:
+            xpath = field_plan.xpaths.get(self.xml_prefix)
+            if xpath is None:
+                xpath = HTXPath.compile(self.xml_prefix, field_plan.path)
+                field_plan.xpaths[self.xml_prefix] = xpath
+            if xpath.tag is not None:
+                return self._data.find(xpath.tag)
+            return xpath.find(self._data)
+
+        # with a filter, prefix and filter are applied once per instance,
+        # then the compiled field path is applied to the selected nodes
+        contexts = self._get_xml_contexts()
+        xpath = HTXPath.compile(field_plan.path)
+
+        if contexts is None or xpath.steps is None:
+            return HTXPath(self.xml_prefix + self.XML_FILTER + field_plan.path).find(self._data)
+
+        return xpath.find_from(contexts)
+
+    def _transform_field(self, field_plan: HTFieldPlan):
+        """
+        Return the value of a field, transformed from xml data
+        """
+        field = field_plan.field
+
+        if isinstance(field, HTAliasField):
+            field: HTAliasField
+            return getattr(self, field.target)
+
+        field: HTField
+
+        if field_plan.version is not None and not field_plan.version.is_valid(self.version):
+            return None
+
+        f_type = field_plan.type
+        f_item_type = field_plan.item_type
+        xml_node = self._find_node(field_plan)
+
+        # value transformed according to typehint
+        if xml_node is None:
+            if not field_plan.is_optional:
+                raise ValueError(f"{self.__class__} : "
+                                 f"non optional field {field} returned 'None'")
+            else:
+                return list() if f_type is list else None
+
+        if self._timestamps and field_plan.timestamp_converter is not None:
+            return field_plan.timestamp_converter(xml_node, attrib=field.attrib)
+
+        elif field_plan.converter is not None:
+            return field_plan.converter(xml_node, attrib=field.attrib)
+
+        elif f_type is list:
+
+            if f_item_type is str:
+                return HTXml.ht_str_items(xml_node, field.items)
+            elif issubclass(f_item_type, HTModel):
+                f_item_type: Type[HTModel]
+                suppl_attrs = {k: getattr(self, v) for k, v in field.suppl_attrs.items()}
+
+                def build_item(data):
+                    return f_item_type(chpp=self._chpp,
+                                       data=data,
+                                       version=self.version.as_string,
+                                       xml_prefix=field.xml_prefix,
+                                       suppl_attrs=suppl_attrs,
+                                       lazy=self._lazy,
+                                       lazy_lists=self._lazy_lists,
+                                       timestamps=self._timestamps,
+                                       )
+
+                if self._lazy_lists:
+                    return HTLazyList(xml_node.findall(field.items), build_item)
                 else:
-                    setattr(self, field_name, None)
+                    return [build_item(i)
+                            for i in HTXml.iter_data_items(xml_node, field.items)]
+            else:
+                raise ValueError(f"unsupported type '{f_item_type}' for list item")
+
+        # if the type is HTModel class, attribute will refer
+        # to another HTModel object
+        elif issubclass(f_type, HTModel):
+            suppl_attrs = {k: getattr(self, v) for k, v in field.suppl_attrs.items()}
+            return f_type(chpp=self._chpp,
+                          data=xml_node,
+                          version=self.version.as_string,
+                          xml_prefix=field.xml_prefix,
+                          suppl_attrs=suppl_attrs,
+                          lazy=self._lazy,
+                          lazy_lists=self._lazy_lists,
+                          timestamps=self._timestamps,
+                          )
+
+        else:
+            raise ValueError(f"type hint '{f_type}' no implemented")
+
+    def to_snapshot(self) -> bytes:
+        """
+        Serialize the instance, with its converted field values, version and
+        request arguments, including nested models and list items
+
+        Snapshots can be restored with HTModel.from_snapshot, without parsing
+        xml data again nor computing datetimes.
+        """
+        return pickle.dumps((self.SNAPSHOT_FORMAT, self._snapshot_value(self)),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def from_snapshot(
+            snapshot: bytes,
+            chpp: Optional[Union['_chpp.CHPPBase', '_chpp.CHPPXml', '_chpp.CHPP']] = None,
+    ) -> 'HTModel':
+        """
+        Restore a HTModel instance serialized by to_snapshot
+
+        :param snapshot: snapshot returned by to_snapshot
+        :param chpp: CHPP instance used by methods sending requests (e.g. from custom
+                     models), which cannot be used if it is not set
+        :return: the restored instance, whose class is the one of the serialized instance
+        """
+        if chpp is not None and not isinstance(chpp, _chpp.CHPPBase):
+            raise ValueError("chpp must be a CHPP instance")
+
+        snapshot_format, value = HTSnapshotUnpickler(io.BytesIO(snapshot)).load()
+        if snapshot_format != HTModel.SNAPSHOT_FORMAT:
+            raise ValueError(f"unsupported snapshot format {snapshot_format}")
+
+        return HTModel._restore_value(value, chpp)
+
+    @staticmethod
+    def _snapshot_value(value):
+        """
+        Convert a value to plain values (lists for lists, and tagged tuples
+        for other types)
+        """
+        if value is None or isinstance(value, (bool, int, float, str, bytes)):
+            return value
 
-            elif isinstance(field, HTAliasField):
-                field: HTAliasField
-                setattr(self, field_name, getattr(self, field.target))
+        elif isinstance(value, (list, HTLazyList)):
+            return [HTModel._snapshot_value(v) for v in value]
+
+        elif isinstance(value, HTModel):
+            # lazy fields are transformed before being serialized
+            for field_plan in value._get_field_plan():
+                getattr(value, field_plan.name)
+
+            cls = type(value)
+            return ('model', cls.__module__, cls.__qualname__,
+                    {k: HTModel._snapshot_value(v) for k, v in vars(value).items()
+                     if k not in HTModel._SNAPSHOT_EXCLUDED})
+
+        elif isinstance(value, ht_datetime.HTDatetime):
+            return ('ht_datetime', value.to_snapshot())
+
+        elif isinstance(value, ht_datetime.HTTimestamp):
+            return ('ht_timestamp', value.epoch, value.league_id)
+
+        elif isinstance(value, HTVersion):
+            return ('version', value.as_string)
+
+        elif isinstance(value, datetime):
+            return ('datetime', value.isoformat())
+
+        elif isinstance(value, date):
+            return ('date', value.isoformat())
+
+        elif isinstance(value, tuple):
+            return ('tuple', [HTModel._snapshot_value(v) for v in value])
+
+        elif isinstance(value, dict):
+            return ('dict', [(HTModel._snapshot_value(k), HTModel._snapshot_value(v))
+                             for k, v in value.items()])
+
+        else:
+            raise ValueError(f"values of type '{type(value).__name__}' "
+                             f"cannot be stored in snapshots")
+
+    @staticmethod
+    def _get_snapshot_class(module_name: str, qualname: str) -> Type['HTModel']:
+        """
+        Return the HTModel class referenced in a snapshot
+
+        Classes are only taken from HTModel subclasses already defined,
+        and from modules of pychpp models (which are imported if needed),
+        so that loading a snapshot never runs code of any other module.
+        """
+        cls = _SNAPSHOT_CLASSES.get((module_name, qualname))
+
+        if cls is None and module_name.startswith(_SNAPSHOT_MODULES_PREFIX):
+            try:
+                importlib.import_module(module_name)
+            except ImportError:
+                pass
+            cls = _SNAPSHOT_CLASSES.get((module_name, qualname))
+
+        if cls is None:
+            raise ValueError(f"{module_name}.{qualname} is not a known HTModel class")
+
+        return cls
+
+    @staticmethod
+    def _restore_value(value, chpp):
+        """
+        Restore a value converted by _snapshot_value
+        """
+        if isinstance(value, list):
+            return [HTModel._restore_value(v, chpp) for v in value]
+
+        elif not isinstance(value, tuple):
+            return value
+
+        kind = value[0]
+
+        if kind == 'model':
+            _, module_name, qualname, state = value
+
+            cls = HTModel._get_snapshot_class(module_name, qualname)
+            instance = cls.__new__(cls)
+            # plain values, which are most of values, are not walked through
+            instance.__dict__.update({k: (v if v.__class__ in _SNAPSHOT_PLAIN_TYPES
+                                          else HTModel._restore_value(v, chpp))
+                                      for k, v in state.items()})
+            instance._chpp = chpp
+            instance._data = None
+            return instance
+
+        elif kind == 'ht_datetime':
+            return ht_datetime.HTDatetime.from_snapshot(value[1])
+        elif kind == 'ht_timestamp':
+            return ht_datetime.HTTimestamp(value[1], value[2])
+        elif kind == 'version':
+            return HTVersion(value[1])
+        elif kind == 'datetime':
+            return datetime.fromisoformat(value[1])
+        elif kind == 'date':
+            return date.fromisoformat(value[1])
+        elif kind == 'tuple':
+            return tuple(HTModel._restore_value(v, chpp) for v in value[1])
+        elif kind == 'dict':
+            return {HTModel._restore_value(k, chpp): HTModel._restore_value(v, chpp)
+                    for k, v in value[1]}
+        else:
+            raise ValueError(f"unknown snapshot value kind '{kind}'")
 
     def _save_as_xml(self, path: pathlib.Path = None, filename: str = None):
         """
@@ -1,9 +1,248 @@
 import datetime
+import functools
+import re
+from typing import Dict, List, Optional, Tuple
 from xml.etree import ElementTree
 
+import pytz
+
 from pychpp.fixtures import ht_datetime
 
 
+class HTXPath:
+    """
+    Xml path compiled once into a list of steps
+
+    ElementTree compiles paths containing anything else than a tag name
+    through ElementPath, whose cache is limited to 100 paths and cleared
+    when full. HTXPath handles the subset of the ElementPath syntax used
+    by models (tags, '*', '.', '..' and [@attr], [@attr='value'], [tag]
+    and [tag='value'] predicates), and falls back to ElementTree for
+    anything else.
+
+    Compiled paths are cached by HTXPath.compile, which must only be used
+    for static paths (values such as ids should be given to a HTXPath
+    instance instead, so that they do not fill the cache).
+    """
+
+    _CACHE: Dict[Tuple[str, ...], 'HTXPath'] = dict()
+
+    _SEGMENT_RE = re.compile(r"^(\.\.|\.|\*|[A-Za-z_][\w\-]*)((?:\[[^\]]*\])*)$")
+    _PREDICATE_RE = re.compile(r"\[(@?)([A-Za-z_][\w\-]*)(?:=(?:'([^']*)'|\"([^\"]*)\"))?\]")
+
+    _CHILD = 0
+    _SELF = 1
+    _PARENT = 2
+
+    def __init__(self, path: str, implicit_star: bool = True):
+        """
+        Compile a xml path
+
+        :param path: path to compile
+        :param implicit_star: as ElementPath does, a trailing '/' selects all children
+                              (if False, a trailing '/' is ignored, to compile prefixes)
+        """
+        self.path = path
+        self.steps: Optional[List[tuple]] = None
+        self.has_parent_step = False
+        # set if the path is a single tag, which ElementTree finds without ElementPath
+        self.tag: Optional[str] = None
+
+        if path and path[-1] == '/':
+            path = path + '*' if implicit_star else path[:-1]
+
+        if path:
+            self.steps = self._compile_steps(path)
+
+        if self.steps is not None:
+            self.has_parent_step = any(s[0] == self._PARENT for s in self.steps)
+            if (len(self.steps) == 1
+                    and self.steps[0][0] == self._CHILD
+                    and self.steps[0][1] != '*'
+                    and not self.steps[0][2]):
+                self.tag = self.steps[0][1]
+
+    @classmethod
+    def compile(cls, *parts: str) -> 'HTXPath':
+        """
+        Return the compiled path made of the concatenation of parts, from cache if possible
+        """
+        xpath = cls._CACHE.get(parts)
+        if xpath is None:
+            xpath = cls("".join(parts))
+            cls._CACHE[parts] = xpath
+        return xpath
+
+    @classmethod
+    def compile_prefix(cls, prefix: str) -> 'HTXPath':
+        """
+        Return a compiled path prefix (whose trailing '/' is ignored), from cache if possible
+        """
+        key = ('', prefix)
+        xpath = cls._CACHE.get(key)
+        if xpath is None:
+            xpath = cls(prefix, implicit_star=False)
+            cls._CACHE[key] = xpath
+        return xpath
+
+    def plain_tags(self) -> Optional[Tuple[str, ...]]:
+        """
+        Return the tags selected by the path if it is only made of tag names
+        (and '.' steps), else None
+        """
+        if self.steps is None:
+            return None
+
+        tags = list()
+        for kind, name, predicates in self.steps:
+            if predicates or kind == self._PARENT or name == '*':
+                return None
+            elif kind == self._CHILD:
+                tags.append(name)
+
+        return tuple(tags)
+
+    def _compile_steps(self, path: str) -> Optional[List[tuple]]:
+
+        steps = list()
+
+        for segment in path.split('/'):
+
+            match = self._SEGMENT_RE.match(segment)
+            if match is None:
+                return None
+
+            name, predicates_str = match.groups()
+
+            predicates = list()
+            position = 0
+            for predicate in self._PREDICATE_RE.finditer(predicates_str):
+                if predicate.start() != position:
+                    return None
+                position = predicate.end()
+                is_attrib, key, value_1, value_2 = predicate.groups()
+                value = value_1 if value_1 is not None else value_2
+                predicates.append((bool(is_attrib), key, value))
+
+            if position != len(predicates_str):
+                return None
+
+            if name == '..':
+                if predicates:
+                    return None
+                steps.append((self._PARENT, None, ()))
+            elif name == '.':
+                steps.append((self._SELF, None, tuple(predicates)))
+            else:
+                steps.append((self._CHILD, name, tuple(predicates)))
+
+        return steps
+
+    @staticmethod
+    def _match(elem: ElementTree.Element, predicates) -> bool:
+        for is_attrib, key, value in predicates:
+            if is_attrib:
+                attr_value = elem.get(key)
+                if attr_value is None or (value is not None and attr_value != value):
+                    return False
+            elif value is None:
+                if elem.find(key) is None:
+                    return False
+            elif not any("".join(e.itertext()) == value for e in elem.findall(key)):
+                return False
+        return True
+
+    def select(self, nodes: List[Tuple[ElementTree.Element, tuple]]):
+        """
+        Apply compiled steps to a list of (element, ancestors) tuples
+
+        :return: list of matching (element, ancestors) tuples, in document order
+        """
+        for kind, tag, predicates in self.steps:
+
+            selected = list()
+
+            if kind == self._CHILD:
+                for elem, ancestors in nodes:
+                    children = list(elem) if tag == '*' else elem.findall(tag)
+                    if children:
+                        child_ancestors = ancestors + (elem,)
+                        selected.extend((c, child_ancestors)
+                                        for c in children
+                                        if not predicates or self._match(c, predicates))
+
+            elif kind == self._SELF:
+                selected = [n for n in nodes if self._match(n[0], predicates)]
+
+            else:
+                seen = set()
+                for elem, ancestors in nodes:
+                    if ancestors and id(ancestors[-1]) not in seen:
+                        seen.add(id(ancestors[-1]))
+                        selected.append((ancestors[-1], ancestors[:-1]))
+
+            nodes = selected
+            if not nodes:
+                break
+
+        return nodes
+
+    def _find_first(self, elem: ElementTree.Element, index: int = 0):
+        """
+        Return the first element matching steps from index, walking depth first
+        (only for paths without '..' steps, which need ancestors)
+        """
+        kind, tag, predicates = self.steps[index]
+        is_last = index == len(self.steps) - 1
+
+        if kind == self._SELF:
+            if predicates and not self._match(elem, predicates):
+                return None
+            return elem if is_last else self._find_first(elem, index + 1)
+
+        elif is_last and not predicates and tag != '*':
+            return elem.find(tag)
+
+        for child in (elem if tag == '*' else elem.findall(tag)):
+            if predicates and not self._match(child, predicates):
+                continue
+            found = child if is_last else self._find_first(child, index + 1)
+            if found is not None:
+                return found
+
+        return None
+
+    def find(self, data: ElementTree.Element) -> Optional[ElementTree.Element]:
+        """
+        Return the first element matching the path, as ElementTree.Element.find does
+        """
+        if self.tag is not None:
+            return data.find(self.tag)
+        elif self.steps is None:
+            return data.find(self.path)
+        elif self.has_parent_step:
+            nodes = self.select([(data, ())])
+            return nodes[0][0] if nodes else None
+        else:
+            return self._find_first(data)
+
+    def find_from(self, nodes: List[Tuple[ElementTree.Element, tuple]]):
+        """
+        Return the first element matching the path from a list of (element, ancestors)
+        tuples, as returned by select
+        """
+        if self.has_parent_step:
+            nodes = self.select(nodes)
+            return nodes[0][0] if nodes else None
+
+        for elem, _ in nodes:
+            found = self._find_first(elem)
+            if found is not None:
+                return found
+
+        return None
+
+
 class HTXml:
     """
     Gather different method to parse xml files fetched on Hattrick
@@ -98,11 +337,8 @@ class HTXml:
         :return: a datetime object
         :rtype: ht_datetime.HTDatetime
         """
-        if attrib is not None:
-            _datetime = datetime.datetime.strptime(data.attrib.get(attrib), "%Y-%m-%d %H:%M:%S")
-        else:
-            _datetime = datetime.datetime.strptime(data.text, "%Y-%m-%d %H:%M:%S")
-        return ht_datetime.HTDatetime(datetime=_datetime)
+        text = data.attrib.get(attrib) if attrib is not None else data.text
+        return ht_datetime.HTDatetime.from_snapshot(_strict_ht_datetime_snapshot(text))
 
     @staticmethod
     def opt_ht_datetime_from_text(data: ElementTree.Element, attrib: str = None):
@@ -121,22 +357,36 @@ class HTXml:
 
         if data_ is None:
             return None
-        else:
-            if ':' in data_:
-                datetime_ = datetime.datetime.strptime(data_, "%Y-%m-%d %H:%M:%S")
-            else:
-                datetime_ = datetime.datetime.strptime(data_, "%Y-%m-%d")
 
-            # ValueError happens if text cannot be serialized
-            # OverflowError happens with special datetimes
-            # as 0001-01-01 9999-12-31 due to pytz limitations
-            # In these cases, return None
-            try:
-                ht_date_ = ht_datetime.HTDatetime(datetime=datetime_)
-            except (ValueError, OverflowError):
-                ht_date_ = None
+        snapshot = _ht_datetime_snapshot(data_)
+        return (ht_datetime.HTDatetime.from_snapshot(snapshot)
+                if snapshot is not None else None)
+
+    @staticmethod
+    def ht_timestamp_from_text(data: ElementTree.Element, attrib: str = None):
+        """
+        Converting strings from xml data to HTTimestamp objects
+
+        :param data: xml data representing a date and a time
+        :param attrib: attr to fetch
+        :return: a timestamp object
+        :rtype: ht_datetime.HTTimestamp
+        """
+        text = data.attrib.get(attrib) if attrib is not None else data.text
+        return ht_datetime.HTTimestamp(_strict_ht_datetime_snapshot(text)[0] // 1_000_000)
+
+    @staticmethod
+    def opt_ht_timestamp_from_text(data: ElementTree.Element, attrib: str = None):
+        """
+        Converting strings from xml data to HTTimestamp objects optionnaly
 
-            return ht_date_
+        :param data: xml data representing a date and a time
+        :param attrib: attr to fetch
+        :return: a timestamp object or None
+        :rtype: ht_datetime.HTTimestamp | None
+        """
+        text = data.attrib.get(attrib) if attrib is not None else data.text
+        return _ht_timestamp(text) if text is not None else None
 
     @staticmethod
     def ht_datetime_to_text(_datetime):
@@ -151,11 +401,11 @@ class HTXml:
 
         # if a datetime instance is given
         # convert it to HTDatetime in CET timezone
+        # (the given object is left unchanged, as it can be shared between threads)
         if isinstance(_datetime, datetime.datetime):
             _datetime = ht_datetime.HTDatetime(datetime=_datetime)
 
-        _datetime.timezone = "CET"
-        return _datetime.datetime.strftime("%Y-%m-%d %H:%M:%S")
+        return _datetime.datetime.astimezone(pytz.timezone("CET")).strftime("%Y-%m-%d %H:%M:%S")
 
     @staticmethod
     def ht_date_to_text(_datetime):
@@ -170,12 +420,77 @@ class HTXml:
 
         # if a datetime instance is given
         # convert it to HTDatetime in CET timezone
+        # (the given object is left unchanged, as it can be shared between threads)
         if isinstance(_datetime, datetime.datetime):
             _datetime = ht_datetime.HTDatetime(datetime=_datetime)
 
-        _datetime.timezone = "CET"
-        return _datetime.datetime.strftime("%Y-%m-%d")
+        return _datetime.datetime.astimezone(pytz.timezone("CET")).strftime("%Y-%m-%d")
 
     @staticmethod
     def to_string(data):
         return ElementTree.tostring(data, encoding='unicode')
+
+
+_TIMESTAMP_RE = re.compile(
+    r"([0-9]{4})-([0-9]{2})-([0-9]{2})(?: ([0-9]{2}):([0-9]{2}):([0-9]{2}))?")
+
+
+def _parse_timestamp(text: str, with_time: bool) -> datetime.datetime:
+    """
+    Parse a timestamp sent by Hattrick ("%Y-%m-%d %H:%M:%S", or "%Y-%m-%d"
+    if with_time is False)
+
+    Fixed-format timestamps are parsed without strptime, which is much slower.
+    Other ones are parsed by strptime, which accepts or rejects them as usual.
+    """
+    match = _TIMESTAMP_RE.fullmatch(text)
+    if match is None or (match.group(4) is not None) != with_time:
+        return datetime.datetime.strptime(text, "%Y-%m-%d %H:%M:%S" if with_time
+                                          else "%Y-%m-%d")
+
+    return datetime.datetime(*(int(v) for v in match.groups() if v is not None))
+
+
+@functools.lru_cache(maxsize=4096)
+def _strict_ht_datetime_snapshot(text: str) -> tuple:
+    """
+    Return the HTDatetime snapshot of a timestamp sent by Hattrick, with its time
+
+    Errors are raised as by strptime and HTDatetime (and are not cached).
+    """
+    return ht_datetime.HTDatetime(datetime=_parse_timestamp(text, with_time=True)).to_snapshot()
+
+
+@functools.lru_cache(maxsize=4096)
+def _ht_datetime_snapshot(text: str) -> Optional[tuple]:
+    """
+    Return the HTDatetime snapshot of a timestamp sent by Hattrick, with or
+    without its time, or None if it cannot be represented by a HTDatetime
+
+    Responses repeat the same timestamps (match dates, deadlines...),
+    so that they are localized and converted to Hattrick calendar once.
+    Snapshots are cached rather than HTDatetime instances, which are mutable.
+    """
+    _datetime = _parse_timestamp(text, with_time=':' in text)
+
+    # ValueError happens if datetime is before Hattrick origin date
+    # OverflowError happens with special datetimes
+    # as 0001-01-01 9999-12-31 due to pytz limitations
+    # In these cases, return None
+    try:
+        return ht_datetime.HTDatetime(datetime=_datetime).to_snapshot()
+    except (ValueError, OverflowError):
+        return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _ht_timestamp(text: str) -> Optional[ht_datetime.HTTimestamp]:
+    """
+    Return the HTTimestamp of a timestamp sent by Hattrick,
+    or None if it cannot be represented by a HTTimestamp
+
+    HTTimestamp instances are immutable, so that they are shared.
+    """
+    snapshot = _ht_datetime_snapshot(text)
+    return (ht_datetime.HTTimestamp(snapshot[0] // 1_000_000)
+            if snapshot is not None else None)
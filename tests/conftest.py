@@ -38,16 +38,75 @@ def chpp():
                 )
 
 
+def resource_path(kwargs):
+    args_dict = {'file': kwargs.pop('file'), 'version': kwargs.pop('version')}
+    kwargs.pop('method', None)
+    args_dict.update(sorted(kwargs.items()))
+    filename = '&'.join(f"{k}={v}" for k, v in args_dict.items()) + '.xml'
+
+    return pathlib.Path(__file__).parent / "test_resources" / filename
+
+
+class MockResponse:
+
+    def __init__(self, path):
+        self.url = str(path)
+        self.status_code = 200
+        self.content = path.read_bytes()
+        self.encoding = None
+        self.closed = False
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8')
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+def mock_send_request(self, url, method='GET', stream=False, token_taken=False, **kwargs):
+    self.sent_requests = getattr(self, 'sent_requests', 0) + 1
+    self.last_response = MockResponse(resource_path(kwargs))
+    return self.last_response
+
+
+@pytest.fixture
+def mocked_http_chpp(monkeypatch):
+    """
+    CHPP instance whose responses are read from test resources,
+    at http level (so that response processing is tested too)
+    """
+    monkeypatch.setattr(CHPP, '_send_request', mock_send_request)
+
+    return CHPP(consumer_key='', consumer_secret='')
+
+
+@pytest.fixture
+def mocked_async_chpp(monkeypatch):
+    """
+    AsyncCHPP instance whose responses are read from test resources
+    """
+    pytest.importorskip('aiohttp')
+    from pychpp.async_chpp import AsyncCHPP
+
+    async def mock_fetch_content(self, url, method='GET', **kwargs):
+        self.sent_requests = getattr(self, 'sent_requests', 0) + 1
+        return resource_path(kwargs).read_bytes()
+
+    monkeypatch.setattr(AsyncCHPP, '_fetch_content', mock_fetch_content)
+
+    return AsyncCHPP(consumer_key='', consumer_secret='')
+
+
 @pytest.fixture
 def mocked_chpp(monkeypatch):
 
     def mock_request(*args, **kwargs):
-        args_dict = {'file': kwargs.pop('file'), 'version': kwargs.pop('version')}
-        kwargs.pop('method')
-        args_dict.update(sorted(kwargs.items()))
-        filename = '&'.join(f"{k}={v}" for k, v in args_dict.items()) + '.xml'
-
-        path = pathlib.Path(__file__).parent / "test_resources" / filename
+        path = resource_path(kwargs)
 
         with open(path) as f:
             txt = f.read()
@@ -55,5 +114,6 @@ def mocked_chpp(monkeypatch):
         return EltTree.fromstring(txt)
 
     monkeypatch.setattr(CHPP, 'request', mock_request)
+    monkeypatch.setattr(CHPP, '_send_request', mock_send_request)
 
     return CHPP(consumer_key='', consumer_secret='')
@@ -0,0 +1,243 @@
+import asyncio
+
+import pytest
+
+from pychpp.async_chpp import AsyncCHPP, HTPendingRequest
+from pychpp.fixtures.ht_cache import HTMemoryCache
+from pychpp.fixtures.ht_error import HTUnknownTeamIdError
+from pychpp.models.xml.arena_details import ArenaDetailsDefault
+from pychpp.models.xml.matches import Matches
+
+from tests.conftest import resource_path
+
+
+class StreamedResponse:
+    """
+    aiohttp response whose content is read by chunks
+    """
+
+    def __init__(self, content: bytes):
+        self.content = self
+        self.data = content
+        self.closed = False
+
+    async def iter_chunked(self, n):
+        for i in range(0, len(self.data), n):
+            await asyncio.sleep(0)
+            yield self.data[i:i + n]
+
+    def close(self):
+        self.closed = True
+
+
+def test_async_xml_method(mocked_async_chpp, mocked_chpp):
+
+    arena = asyncio.run(mocked_async_chpp.xml_arena_details(arena_id=1420520))
+    expected = mocked_chpp.xml_arena_details(arena_id=1420520)
+
+    assert isinstance(arena, ArenaDetailsDefault)
+    assert arena.name == expected.name
+    assert arena._chpp is mocked_async_chpp.chpp
+    assert mocked_async_chpp.sent_requests == 1
+
+
+def test_async_concurrent_models(mocked_async_chpp, monkeypatch):
+
+    fetch_content = AsyncCHPP._fetch_content
+    in_flight = [0, 0]
+
+    async def slow_fetch_content(self, *args, **kwargs):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        await asyncio.sleep(0.05)
+        in_flight[0] -= 1
+        return await fetch_content(self, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncCHPP, '_fetch_content', slow_fetch_content)
+
+    # identical requests are all sent, instead of being shared
+    class Unshared:
+        async def do(self, key, func, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+    mocked_async_chpp.single_flight = Unshared()
+
+    async def main():
+        return await asyncio.gather(*(mocked_async_chpp.xml_arena_details(arena_id=1420520)
+                                      for _ in range(4)),
+                                    *(mocked_async_chpp.team(id_=1755350) for _ in range(60)))
+
+    # models are built on the event loop, without holding a thread per request
+    # (default thread pools are bounded by 32 workers)
+    models = asyncio.run(main())
+    assert in_flight[1] > 32
+    assert [m.id for m in models] == [1420520] * 4 + [1755350] * 60
+
+
+def test_async_custom_accessors(mocked_async_chpp, mocked_chpp):
+
+    async def main():
+        return await asyncio.gather(
+            mocked_async_chpp.team(id_=1755350),
+            mocked_async_chpp.match_lineup(match_id=660688698, team_id=86324),
+            mocked_async_chpp.xml_arena_details(arena_id=1751912),
+        )
+
+    team, lineup, arena = asyncio.run(main())
+
+    assert team.name == mocked_chpp.team(id_=1755350).name
+    assert lineup.url == mocked_chpp.match_lineup(match_id=660688698, team_id=86324).url
+    assert arena.id == 1751912
+
+
+def test_async_run_model_methods(mocked_async_chpp):
+
+    team = asyncio.run(mocked_async_chpp.team(id_=1755350))
+
+    # requests of models built through AsyncCHPP have to be awaited
+    with pytest.raises(HTPendingRequest):
+        team.arena.details()
+
+    arena = asyncio.run(mocked_async_chpp.run(team.arena.details))
+    assert arena.id == team.arena.id
+
+    async def main():
+        # the event loop is never blocked waiting for a response
+        with pytest.raises(HTPendingRequest):
+            team.arena.details()
+
+    asyncio.run(main())
+
+
+def test_async_run_once(mocked_async_chpp):
+
+    calls = list()
+
+    def func():
+        calls.append(1)
+        team = mocked_async_chpp.chpp.team(id_=1755350)
+        return team, team.arena.details()
+
+    team, arena = asyncio.run(mocked_async_chpp.run(func))
+
+    # func is not run again for each request
+    assert calls == [1]
+    assert arena.id == team.arena.id
+    assert mocked_async_chpp.sent_requests == 2
+
+
+def test_async_run_concurrent_requests(mocked_async_chpp, monkeypatch):
+
+    fetch_content = AsyncCHPP._fetch_content
+    in_flight = [0, 0]
+
+    async def slow_fetch_content(self, *args, **kwargs):
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight)
+        await asyncio.sleep(0.05)
+        in_flight[0] -= 1
+        return await fetch_content(self, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncCHPP, '_fetch_content', slow_fetch_content)
+
+    results = asyncio.run(mocked_async_chpp.run(mocked_async_chpp.chpp.fetch_many, [
+        ('xml_arena_details', {'arena_id': 1420520}),
+        ('xml_arena_details', {'arena_id': 1751912}),
+    ]))
+
+    assert [r.value.id for r in results] == [1420520, 1751912]
+    assert in_flight[1] == 2
+
+
+def test_async_cache(mocked_async_chpp):
+
+    mocked_async_chpp.chpp.cache = HTMemoryCache()
+
+    async def main():
+        for _ in range(3):
+            await mocked_async_chpp.xml_arena_details(arena_id=1420520)
+
+    asyncio.run(main())
+    assert mocked_async_chpp.sent_requests == 1
+
+
+def test_async_single_flight(mocked_async_chpp, monkeypatch):
+
+    fetch_content = AsyncCHPP._fetch_content
+
+    async def slow_fetch_content(self, *args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await fetch_content(self, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncCHPP, '_fetch_content', slow_fetch_content)
+
+    async def main():
+        return await asyncio.gather(
+            *[mocked_async_chpp.request(file='arenadetails', version='1.7', arenaID=1420520)
+              for _ in range(4)])
+
+    data = asyncio.run(main())
+    assert mocked_async_chpp.sent_requests == 1
+    assert all(d is data[0] for d in data)
+    assert mocked_async_chpp.single_flight.stats == {'calls': 4, 'shared': 3}
+
+
+def test_async_stream_request(mocked_async_chpp, mocked_chpp, monkeypatch):
+
+    responses = list()
+
+    async def mock_send_request(self, url, method='GET', stream=False, **kwargs):
+        responses.append(StreamedResponse(resource_path(kwargs).read_bytes()))
+        return responses[-1]
+
+    monkeypatch.setattr(AsyncCHPP, '_send_request', mock_send_request)
+    expected = [m.id for m in mocked_chpp.xml_matches().team.matches]
+
+    async def main():
+        return [int(m.find('MatchID').text) async for m in mocked_async_chpp.stream_request(
+            ('Team', 'MatchList', 'Match'), chunk_size=256, file='matches', version='2.9')]
+
+    assert asyncio.run(main()) == expected
+    assert responses[-1].closed
+
+    # models stream their items through the event loop too
+    matches = asyncio.run(mocked_async_chpp.run(
+        lambda: list(Matches.stream_items(mocked_async_chpp.chpp, 'team.matches'))))
+    assert [m.id for m in matches] == expected
+    assert responses[-1].closed
+
+
+def test_async_stream_request_error(mocked_async_chpp, monkeypatch):
+
+    async def mock_send_request(self, url, method='GET', stream=False, **kwargs):
+        return StreamedResponse(b"<HattrickData><FileName>chpperror.xml</FileName>"
+                                b"<ErrorCode>50</ErrorCode><Error>Unknown team id</Error>"
+                                b"</HattrickData>")
+
+    monkeypatch.setattr(AsyncCHPP, '_send_request', mock_send_request)
+
+    async def main():
+        async for _ in mocked_async_chpp.stream_request(
+                ('Team', 'MatchList', 'Match'), chunk_size=16, file='matches', version='2.9'):
+            pass
+
+    with pytest.raises(HTUnknownTeamIdError):
+        asyncio.run(main())
+
+
+def test_async_sign():
+
+    pytest.importorskip('aiohttp')
+
+    chpp = AsyncCHPP('key', 'secret', 'token', 'token_secret')
+    uri, headers, body = chpp._sign(chpp.chpp.base_url, file='teamdetails',
+                                    version='3.7', teamID=1, includeFlags=True)
+
+    assert uri.startswith(chpp.chpp.base_url + '?')
+    assert 'includeFlags=True' in uri
+    assert 'oauth_signature=' in headers['Authorization']
+    assert 'oauth_token="token"' in headers['Authorization']
+
+    uri, headers, body = chpp._sign(chpp.chpp.base_url, method='POST', file='matchorders')
+    assert uri == chpp.chpp.base_url
+    assert body == 'file=matchorders'
@@ -0,0 +1,275 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from pychpp import CHPP
+from pychpp.fixtures import ht_error
+from pychpp.fixtures.ht_rate_limit import (HTRateLimiter, HTBucketStore, HTMemoryBucketStore,
+                                           HTSQLiteBucketStore)
+from pychpp.fixtures.ht_single_flight import HTSingleFlight
+from pychpp.fixtures.ht_transport import HTCredentials, HTTransport
+from pychpp.models.custom.ht_arena import HTArena
+from tests.conftest import MockResponse, resource_path
+
+
+def test_fetch_many(mocked_chpp):
+
+    arena_ids = [1420520, 1751912, 295023, 1]
+    results = mocked_chpp.fetch_many([('arena', {'id_': i}) for i in arena_ids]
+                                     + [('xml_world_languages',)],
+                                     max_workers=3)
+
+    assert [r.method for r in results] == ['arena'] * 4 + ['xml_world_languages']
+    assert all(isinstance(r.value, HTArena) for r in results[:3])
+    assert [r.value.id for r in results[:3]] == arena_ids[:3]
+
+    # errors are captured by request
+    assert not results[3].ok
+    assert isinstance(results[3].error, FileNotFoundError)
+    assert results[4].ok
+
+    with pytest.raises(ValueError):
+        mocked_chpp.fetch_many([('_fetch', {})])
+    with pytest.raises(ValueError):
+        mocked_chpp.fetch_many([('unknown_method', {})])
+
+
+def test_session_is_opened_once(monkeypatch):
+
+    class Response:
+        url = ''
+        status_code = 200
+
+    class Session:
+        def get(self, url, params=None, stream=False, auth=None):
+            return Response()
+
+    opened = list()
+
+    def open_session(self):
+        time.sleep(0.01)
+        opened.append(1)
+        self.session = Session()
+
+    monkeypatch.setattr(CHPP, 'open_session', open_session)
+    chpp = CHPP(consumer_key='', consumer_secret='')
+    barrier = threading.Barrier(8)
+
+    def send(_):
+        barrier.wait()
+        return chpp._send_request(chpp.base_url, file='worlddetails')
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(send, range(8)))
+
+    assert len(opened) == 1
+
+
+def test_rate_limiter_buckets(monkeypatch):
+
+    now = [1000.]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    monkeypatch.setattr(time, 'sleep', lambda s: now.__setitem__(0, now[0] + s))
+
+    limiter = HTRateLimiter(token_rate=2, token_burst=3)
+    for _ in range(3):
+        limiter.acquire('consumer', 'token')
+    assert limiter.stats['waits'] == 0
+
+    # the 4th request has to wait for a token
+    limiter.acquire('consumer', 'token')
+    assert limiter.stats['waits'] == 1
+    assert now[0] == pytest.approx(1000.5)
+
+    # other tokens have their own bucket
+    limiter.acquire('consumer', 'other_token')
+    assert limiter.stats['waits'] == 1
+    assert limiter.stats['requests'] == 5
+
+
+@pytest.mark.parametrize('store_factory', [
+    lambda tmp_path: HTMemoryBucketStore(),
+    lambda tmp_path: HTSQLiteBucketStore(str(tmp_path / 'buckets.sqlite')),
+])
+def test_rate_limiter_consumer_limit(tmp_path, store_factory):
+
+    store = store_factory(tmp_path)
+    limiter = HTRateLimiter(consumer_rate=0.01, consumer_burst=2, store=store, blocking=False)
+
+    limiter.acquire('consumer', 'token_1')
+    limiter.acquire('consumer', 'token_2')
+    with pytest.raises(ht_error.HTRateLimitError):
+        limiter.acquire('consumer', 'token_3')
+    assert limiter.stats['throttles'] == 1
+
+    # limiter state is shared by limiters using the same store
+    other_limiter = HTRateLimiter(consumer_rate=0.01, consumer_burst=2, store=store,
+                                  max_wait=1)
+    with pytest.raises(ht_error.HTRateLimitError):
+        other_limiter.acquire('consumer', 'token_1')
+    other_limiter.acquire('other_consumer', 'token_1')
+
+
+def test_bucket_store_interface():
+
+    class IncompleteStore(HTBucketStore):
+        pass
+
+    # stores missing take method fail at instantiation
+    with pytest.raises(TypeError):
+        IncompleteStore()
+
+
+def test_rate_limiter_async_store(tmp_path):
+
+    path = str(tmp_path / 'buckets.sqlite')
+    limiter = HTRateLimiter(token_rate=10, store=HTSQLiteBucketStore(path))
+
+    # buckets are locked by another process
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def main():
+        acquired = asyncio.ensure_future(limiter.acquire_async('consumer', 'token'))
+
+        # event loop keeps running while the store waits for the lock
+        await asyncio.sleep(0.1)
+        assert not acquired.done()
+
+        other.execute("COMMIT")
+        await acquired
+
+    asyncio.run(main())
+    other.close()
+    assert limiter.stats['requests'] == 1
+
+
+def test_chpp_rate_limiter():
+
+    class Session:
+        def get(self, url, params=None, stream=False, auth=None):
+            return MockResponse(resource_path(dict(params)))
+
+    chpp = CHPP(consumer_key='', consumer_secret='',
+                rate_limiter=HTRateLimiter(token_rate=0.01, token_burst=1, blocking=False))
+    chpp.session = Session()
+    chpp.xml_arena_details(arena_id=1420520)
+
+    with pytest.raises(ht_error.HTRateLimitError):
+        chpp.xml_arena_details(arena_id=1420520)
+
+
+def test_single_flight():
+
+    flight = HTSingleFlight()
+    barrier = threading.Barrier(8)
+    calls = list()
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        if len(calls) > 1:
+            raise ValueError('error')
+        return object()
+
+    def send(key):
+        barrier.wait()
+        return flight.do(key, fetch)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(send, ['key'] * 8))
+
+    # concurrent calls share the same value
+    assert len(calls) == 1
+    assert all(v is values[0] for v in values)
+    assert flight.stats == {'calls': 8, 'shared': 7}
+
+    # errors are shared too, and keys are released once calls are done
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(send, 'key') for _ in range(8)]
+    assert len(calls) == 2
+    assert all(isinstance(f.exception(), ValueError) for f in futures)
+
+
+def test_chpp_single_flight(mocked_http_chpp, monkeypatch):
+
+    send_request = CHPP._send_request
+
+    def slow_send_request(self, *args, **kwargs):
+        time.sleep(0.05)
+        return send_request(self, *args, **kwargs)
+
+    monkeypatch.setattr(CHPP, '_send_request', slow_send_request)
+    barrier = threading.Barrier(4)
+
+    def send(kwargs):
+        barrier.wait()
+        return mocked_http_chpp.request(file='arenadetails', version='1.7', **kwargs)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        data = list(executor.map(send, [{'arenaID': 1420520}] * 3 + [{'arenaID': 295023}]))
+
+    assert mocked_http_chpp.sent_requests == 2
+    assert data[0] is data[1] is data[2]
+    assert data[3] is not data[0]
+
+    # requests which are not only reading data are never shared
+    assert not mocked_http_chpp._is_read_only(method='POST', file='matchorders')
+    assert not mocked_http_chpp._is_read_only(file='youthplayerlist', actionType='unlockskills')
+
+
+def test_shared_transport():
+
+    sent = list()
+
+    class Adapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            sent.append(request)
+            params = dict(p.split('=') for p in request.url.split('?')[1].split('&'))
+            response = requests.Response()
+            response.status_code = 200
+            response.url = request.url
+            response.request = request
+            response._content = resource_path(params).read_bytes()
+            return response
+
+    transport = HTTransport(pool_maxsize=32)
+    assert transport.session.get_adapter(CHPP(None, None).base_url)._pool_maxsize == 32
+    transport.session.mount('https://', Adapter())
+
+    credentials = [HTCredentials('key', 'secret', f'token_{i}', f'token_secret_{i}')
+                   for i in range(2)]
+    assert 'token_secret' not in repr(credentials[0])
+
+    chpps = [CHPP.from_credentials(c, transport=transport) for c in credentials]
+    assert chpps[0].credentials == credentials[0]
+
+    for chpp in chpps:
+        arena = chpp.xml_arena_details(arena_id=1420520)
+        assert arena.id == 1420520
+
+    # requests share the same session, but are signed with the credentials of each instance
+    assert chpps[0].session is chpps[1].session is transport.session
+    assert b'oauth_token="token_0"' in sent[0].headers['Authorization']
+    assert b'oauth_token="token_1"' in sent[1].headers['Authorization']
+
+
+def test_archive_responses(mocked_http_chpp, tmp_path):
+
+    mocked_http_chpp.archive_path = tmp_path
+    mocked_http_chpp.xml_arena_details(arena_id=1420520)
+
+    path = tmp_path / 'file=arenadetails&version=1.7&arenaID=1420520.xml'
+    assert path.read_bytes() == resource_path({'file': 'arenadetails', 'version': '1.7',
+                                               'arenaID': 1420520}).read_bytes()
+
+    # raw content is parsed as bytes
+    assert isinstance(mocked_http_chpp._base_request(mocked_http_chpp.base_url,
+                                                     parse_data=False, file='arenadetails',
+                                                     version='1.7', arenaID=1420520), bytes)
@@ -0,0 +1,73 @@
+import pytest
+
+from pychpp import CHPP, CHPPRouter
+from pychpp.fixtures import ht_error
+from pychpp.fixtures.ht_rate_limit import HTRateLimiter
+from tests.conftest import mock_send_request
+
+
+@pytest.fixture
+def mocked_router(monkeypatch):
+
+    monkeypatch.setattr(CHPP, '_send_request', mock_send_request)
+
+    return CHPPRouter(consumer_key='', consumer_secret='',
+                      tokens=[(f'token_{i}', f'secret_{i}') for i in range(3)])
+
+
+def test_router_spreads_requests(mocked_router):
+
+    assert mocked_router.access_token_key == 'token_0'
+
+    for team_id in (1755350, 295023, 2513478):
+        details = mocked_router.xml_team_details(team_id=team_id)
+        assert details.user is not None
+
+    assert [m.sent_requests for m in mocked_router._members.values()] == [1, 1, 1]
+    assert getattr(mocked_router, 'sent_requests', 0) == 0
+
+    # user-scoped requests are pinned to the token of the router
+    assert mocked_router._is_routed(file='teamdetails', version='3.6', teamID=1)
+    assert not mocked_router._is_routed(file='teamdetails', version='3.6')
+    assert not mocked_router._is_routed(file='challenges', version='1.6', actionType='view')
+    assert not mocked_router._is_routed(file='matchorders', version='3.1', matchID=1)
+    assert not mocked_router._is_routed(file='playerdetails', version='3.0', playerID=1,
+                                        actionType='placeBid')
+
+
+def test_router_revokes_unauthorized_tokens(mocked_router, monkeypatch):
+
+    def unauthorized(self, *args, **kwargs):
+        if self.access_token_key == 'token_1':
+            raise ht_error.HTUnauthorizedAction('401')
+        return mock_send_request(self, *args, **kwargs)
+
+    monkeypatch.setattr(CHPP, '_send_request', unauthorized)
+
+    for _ in range(4):
+        mocked_router.xml_region_details(region_id=149)
+
+    assert mocked_router.tokens == ['token_0', 'token_2']
+    assert mocked_router.revoked_tokens == ['token_1']
+
+    def always_unauthorized(self, *args, **kwargs):
+        raise ht_error.HTUnauthorizedAction('401')
+
+    monkeypatch.setattr(CHPP, '_send_request', always_unauthorized)
+
+    with pytest.raises(ht_error.HTUnauthorizedAction):
+        mocked_router.xml_region_details(region_id=149)
+    assert mocked_router.tokens == []
+
+
+def test_router_rate_limits(mocked_router):
+
+    mocked_router.rate_limiter = HTRateLimiter(token_rate=0.01, token_burst=1, blocking=False)
+
+    # each token of the pool has its own budget
+    for _ in range(3):
+        mocked_router.xml_region_details(region_id=149)
+    assert [m.sent_requests for m in mocked_router._members.values()] == [1, 1, 1]
+
+    with pytest.raises(ht_error.HTRateLimitError):
+        mocked_router.xml_region_details(region_id=149)
@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+from pychpp.fixtures import ht_error
+from pychpp.fixtures.ht_cache import HTCache, HTMemoryCache, HTSQLiteCache
+
+
+def test_make_key():
+
+    key = HTCache.make_key(version='1.7', arenaID=1420520, file='arenadetails')
+    assert key == 'file=arenadetails&version=1.7&arenaID=1420520'
+
+    scoped = HTCache.make_key(scope='token', file='arenadetails', version='1.7')
+    assert scoped.endswith(':file=arenadetails&version=1.7')
+    assert 'token' not in scoped
+    assert scoped != HTCache.make_key(scope='other', file='arenadetails', version='1.7')
+
+
+def test_cache_interface():
+
+    class IncompleteCache(HTCache):
+        def get(self, key):
+            return None
+
+    # caches missing set, delete or clear methods fail at instantiation
+    with pytest.raises(TypeError):
+        IncompleteCache()
+
+
+@pytest.mark.parametrize('cache_factory', [
+    lambda tmp_path: HTMemoryCache(),
+    lambda tmp_path: HTSQLiteCache(str(tmp_path / 'cache.sqlite')),
+])
+def test_cache_backends(tmp_path, cache_factory):
+
+    cache = cache_factory(tmp_path)
+    assert cache.get('a') is None
+
+    cache.set('a', '<xml/>', ttl=60)
+    cache.set('b', '<old/>', ttl=-1)
+    cache.set('c', b'<xml/>', ttl=60)
+    assert cache.get('a') == '<xml/>'
+    assert cache.get('b') is None
+    assert cache.get('c') == b'<xml/>'
+
+    cache.delete('a')
+    assert cache.get('a') is None
+
+    cache.set('a', '<xml/>', ttl=60)
+    cache.clear()
+    assert cache.get('a') is None
+
+
+def test_memory_cache_is_lru():
+
+    cache = HTMemoryCache(max_size=2)
+    cache.set('a', '1', ttl=60)
+    cache.set('b', '2', ttl=60)
+    cache.get('a')
+    cache.set('c', '3', ttl=60)
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == '1'
+
+
+def test_chpp_cache(mocked_http_chpp):
+
+    chpp = mocked_http_chpp
+    chpp.cache = HTMemoryCache()
+
+    arena = chpp.xml_arena_details(arena_id=1420520)
+    assert chpp.sent_requests == 1
+
+    cached_arena = chpp.xml_arena_details(arena_id=1420520)
+    assert chpp.sent_requests == 1
+    assert cached_arena.name == arena.name
+
+    # other params are not served from cache
+    chpp.xml_arena_details(arena_id=1751912)
+    assert chpp.sent_requests == 2
+
+    # files with a ttl set to 0 are never cached
+    chpp.cache_ttls['arenadetails'] = 0
+    chpp.xml_arena_details(arena_id=1420520)
+    assert chpp.sent_requests == 3
+
+
+def test_chpp_cache_ttl(mocked_http_chpp, monkeypatch):
+
+    chpp = mocked_http_chpp
+    chpp.cache = HTMemoryCache()
+    chpp.cache_ttls['arenadetails'] = 10
+
+    chpp.xml_arena_details(arena_id=1420520)
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    chpp.xml_arena_details(arena_id=1420520)
+
+    assert chpp.sent_requests == 2
+
+
+def test_chpp_cache_skips_live_and_actions(mocked_http_chpp):
+
+    chpp = mocked_http_chpp
+    chpp.cache = HTMemoryCache()
+
+    assert chpp._get_cache_ttl(file='live', version='2.3') == 0
+    assert chpp._get_cache_ttl(file='worlddetails', version='1.9') == 3 * 3600
+    assert chpp._get_cache_ttl(file='teamdetails', version='3.7') > 0
+    assert chpp._get_cache_ttl(file='teamdetails', version='3.7', method='POST') == 0
+    assert chpp._get_cache_ttl(file='youthplayerdetails', version='1.2',
+                               actionType='unlockSkills') == 0
+
+
+def test_chpp_cache_does_not_store_errors(mocked_http_chpp, monkeypatch):
+
+    chpp = mocked_http_chpp
+    chpp.cache = HTMemoryCache()
+
+    def raise_error(data):
+        raise ht_error.HTUnknownTeamIdError()
+
+    monkeypatch.setattr(chpp, '_analyze_error', raise_error)
+    monkeypatch.setattr(chpp, '_send_request', lambda *args, **kwargs: ErrorResponse())
+
+    with pytest.raises(ht_error.HTUnknownTeamIdError):
+        chpp.request(file='teamdetails', version='3.7', teamID=1)
+    assert len(chpp.cache) == 0
+
+
+class ErrorResponse:
+    url = ''
+    status_code = 200
+    content = b"<HattrickData><FileName>chpperror.xml</FileName></HattrickData>"
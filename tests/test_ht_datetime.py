@@ -1,7 +1,11 @@
 import datetime as dt
+import pickle
+
+import pytest
 import pytz
 
-from pychpp.fixtures.ht_datetime import HTDatetime
+from pychpp.fixtures.ht_datetime import (HTDatetime, HTTimestamp,
+                                         to_ht_calendar_array, from_ht_calendar_array)
 
 
 def test_use_ht_datetime():
@@ -30,3 +34,147 @@ def test_use_ht_datetime():
     assert (ht_d.season, ht_d.week, ht_d.weekday) == (76, 1, 1)
     ht_d.timezone = "America/Bahia"
     assert (ht_d.season, ht_d.week, ht_d.weekday) == (75, 16, 7)
+
+
+def test_ht_datetime_league_lookup():
+
+    ht_d = HTDatetime.from_calendar(2020, 9, 7, league=16)
+    assert ht_d.league == "Brazil"
+    assert ht_d.season == 63
+
+    ht_d.league = 1000
+    assert ht_d.league == "Hattrick International"
+    assert ht_d.season == 12
+
+    # unknown leagues have no season offset
+    ht_d.league = 10
+    assert ht_d.league == ""
+    assert ht_d.season == 75
+
+    assert HTDatetime.from_calendar(2020, 9, 7, league="Atlantis").league == ""
+
+
+def test_ht_timestamp():
+
+    ts = HTTimestamp.from_datetime(dt.datetime(2023, 3, 26, 12, 30), league="Brazil")
+    ht_d = HTDatetime(datetime=dt.datetime(2023, 3, 26, 12, 30), league="Brazil")
+    assert ts.league_id == 16
+    assert ts.league == "Brazil"
+    assert ts.datetime == ht_d.datetime
+    assert (ts.season, ts.week, ts.weekday) == (ht_d.season, ht_d.week, ht_d.weekday)
+    assert HTTimestamp.from_ht_datetime(ht_d) == ts
+    assert ts.to_ht_datetime() == ht_d
+
+    # aware datetimes are converted to Hattrick time
+    utc = HTTimestamp.from_datetime(pytz.utc.localize(dt.datetime(2020, 9, 20, 23, 30)))
+    assert utc.datetime.hour == 1
+    assert (utc.season, utc.week, utc.weekday) == (76, 1, 1)
+
+    # timestamps are immutable and hashable, and compared by instant, as HTDatetime
+    with pytest.raises(AttributeError):
+        ts.season = 80
+    other = ts.with_league(1000)
+    assert other.season == ts.season + (-63 + 12)
+    assert other == ts and hash(other) == hash(ts) and other.league_id != ts.league_id
+    assert not other < ts and not other > ts and other <= ts and other >= ts
+    assert {ts: 1, other: 2} == {ts: 2}
+    assert sorted([ts, utc]) == [utc, ts]
+    assert pickle.loads(pickle.dumps(ts)) == ts
+
+    with pytest.raises(ValueError):
+        HTTimestamp.from_datetime(dt.datetime(1997, 9, 21))
+
+
+def test_ht_calendar_arrays():
+
+    np = pytest.importorskip('numpy')
+
+    # datetime64 values are given in Hattrick time
+    datetimes = np.array(['1997-09-22T00:00', '2020-09-07T12:00', '2023-03-26T23:59'],
+                         dtype='datetime64[s]')
+    seasons, weeks, weekdays = to_ht_calendar_array(datetimes, leagues=[1, 16, 1000])
+    for i, value in enumerate(datetimes.astype(object)):
+        ht_d = HTDatetime(datetime=value, league=[1, 16, 1000][i])
+        assert (seasons[i], weeks[i], weekdays[i]) == (ht_d.season, ht_d.week, ht_d.weekday)
+
+    # epoch seconds are converted to Hattrick time, around summer time changes
+    # (2023-03-26 and 2023-10-29 at 01:00 UTC)
+    epochs = np.array([1679792399, 1679792400, 1679788800 - 1, 1698541199, 1698541200,
+                       1698537600 + 82800, 1600642800], dtype=np.int64)
+    seasons, weeks, weekdays = to_ht_calendar_array(epochs, leagues=16)
+    for i, epoch in enumerate(epochs.tolist()):
+        ts = HTTimestamp(epoch, 16)
+        assert (seasons[i], weeks[i], weekdays[i]) == (ts.season, ts.week, ts.weekday)
+
+    dates = from_ht_calendar_array(seasons, weeks, weekdays, leagues=16)
+    assert dates.tolist() == [HTTimestamp(e).datetime.date() for e in epochs.tolist()]
+
+    # unknown leagues have no season offset
+    assert to_ht_calendar_array(datetimes, leagues=10)[0].tolist() == [1, 75, 84]
+
+    with pytest.raises(ValueError):
+        to_ht_calendar_array(np.array(['1997-09-21'], dtype='datetime64[D]'))
+    with pytest.raises(ValueError):
+        from_ht_calendar_array([80], [17], [1])
+
+    # seasons are checked before applying season offsets, as with HTDatetime
+    with pytest.raises(ValueError):
+        HTDatetime.from_ht_calendar(0, 1, 1, league="Brazil")
+    with pytest.raises(ValueError):
+        from_ht_calendar_array([0], [1], [1], leagues=16)
+
+    # missing datetimes are masked, and converted back to NaT
+    seasons, weeks, weekdays = to_ht_calendar_array(
+        np.array(['2020-09-07T12:00', 'NaT'], dtype='datetime64[s]'), leagues=16)
+    assert seasons.tolist() == [63, None]
+    assert weeks.tolist() == [15, None]
+    assert weekdays.tolist() == [1, None]
+    dates = from_ht_calendar_array(seasons, weeks, weekdays, leagues=16)
+    assert dates[0] == np.datetime64('2020-09-07') and np.isnat(dates[1])
+
+
+def test_ht_datetime_setters():
+
+    ht_d = HTDatetime.from_ht_calendar(75, 15, 1, 20, 30, league="Brazil",
+                                       timezone="Europe/London")
+
+    ht_d.week = 16
+    assert (ht_d.season, ht_d.week, ht_d.weekday) == (75, 16, 1)
+    assert ht_d == HTDatetime.from_ht_calendar(75, 16, 1, 20, 30, league="Brazil",
+                                               timezone="Europe/London")
+
+    # changing the time does not change Hattrick calendar
+    ht_d.hour = 23
+    ht_d.minute = 59
+    assert (ht_d.season, ht_d.week, ht_d.weekday) == (75, 16, 1)
+    assert (ht_d.hour, ht_d.minute, ht_d.second) == (23, 59, 0)
+
+    ht_d.day = ht_d.day + 1
+    assert (ht_d.season, ht_d.week, ht_d.weekday) == (75, 16, 2)
+
+    ht_d.datetime = pytz.utc.localize(dt.datetime(2020, 9, 7, 12))
+    assert ht_d.timezone_name == "Europe/London"
+    assert ht_d.hour == 13
+
+    with pytest.raises(ValueError):
+        ht_d.week = 17
+    assert ht_d.week == 15
+
+
+def test_ht_datetime_time_setters_match_fresh_instances():
+
+    def calendar(ht_d):
+        return ht_d.season, ht_d.week, ht_d.weekday
+
+    # in timezones far from CET, Hattrick calendar computed from a date
+    # can differ from the one the date was computed from
+    ht_d = HTDatetime.from_ht_calendar(90, 15, 1, league=34, timezone="Australia/Sydney")
+    ht_d.second = 59
+    assert calendar(ht_d) == calendar(HTDatetime.from_calendar(
+        2028, 12, 18, 0, 0, 59, league=34, timezone="Australia/Sydney"))
+
+    ht_d = HTDatetime(datetime=pytz.utc.localize(dt.datetime(2020, 9, 9, 20)),
+                      timezone="Asia/Tokyo")
+    ht_d.minute = 17
+    assert calendar(ht_d) == calendar(HTDatetime.from_calendar(
+        2020, 9, 10, 5, 17, timezone="Asia/Tokyo"))
@@ -0,0 +1,55 @@
+import pytest
+
+from pychpp.fixtures.ht_cache import HTMemoryCache
+from pychpp.fixtures.ht_metrics import HTHistogram, HTMetrics
+
+
+def test_histogram():
+
+    histogram = HTHistogram(buckets=(1, 10))
+    for value in (0.5, 1, 5, 50):
+        histogram.observe(value)
+
+    assert histogram.as_dict() == {'count': 4, 'sum': 56.5,
+                                   'buckets': [(1, 2), (10, 3), (float('inf'), 4)]}
+
+
+def test_metrics_registry():
+
+    metrics = HTMetrics()
+    events = list()
+    metrics.add_callback(events.append)
+
+    metrics.observe('teamdetails', 'network', 0.2)
+    metrics.observe('teamdetails', 'cache_hit')
+    metrics.observe('teamdetails', 'cache_hit')
+
+    assert metrics.histogram('teamdetails', 'network')['count'] == 1
+    assert metrics.histogram('teamdetails', 'parse') is None
+    assert metrics.counter('teamdetails', 'cache_hit') == 2
+    assert [e.name for e in events] == ['network', 'cache_hit', 'cache_hit']
+
+    with pytest.raises(ValueError):
+        metrics.observe('teamdetails', 'unknown', 1)
+
+    metrics.reset()
+    assert metrics.snapshot() == dict()
+
+
+def test_chpp_metrics(mocked_http_chpp):
+
+    chpp = mocked_http_chpp
+    chpp.metrics = HTMetrics()
+    chpp.cache = HTMemoryCache()
+
+    for _ in range(2):
+        chpp.xml_arena_details(arena_id=1420520)
+
+    snapshot = chpp.metrics.snapshot()['arenadetails']
+    assert snapshot['network']['count'] == 1
+    assert snapshot['size']['sum'] == len(chpp.last_response.content)
+    assert snapshot['parse']['count'] == 2
+    assert snapshot['transform']['count'] == 2
+    assert snapshot['cache_miss'] == 1
+    assert snapshot['cache_hit'] == 1
+    assert 'retry' not in snapshot
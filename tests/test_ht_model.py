@@ -0,0 +1,349 @@
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from pychpp.fixtures.ht_datetime import HTDatetime, HTTimestamp
+from pychpp.fixtures.ht_error import HTUnknownTeamIdError
+from pychpp.models.ht_field import HTField
+from pychpp.models.ht_lazy_list import HTLazyList
+from pychpp.models.ht_model import HTFieldPlan, HTModel
+from pychpp.models.ht_xml import HTXml
+from pychpp.models.xml.arena_details import ArenaDetailsDefault
+from pychpp.models.xml.matches import Matches, MatchItem as MatchesItem
+from pychpp.models.xml.matches_archive import MatchesArchive, MatchItem
+from pychpp.models.custom.ht_matches_archive import HTMAItem
+from pychpp.models.custom.ht_match_lineup import HTMatchLineup, HTMatchLineupMatch
+from pychpp.models.xml.match_lineup import MatchLineup
+from tests.conftest import MockResponse
+
+
+def test_field_plan_is_compiled_once_per_class():
+
+    plan = MatchesArchive._get_field_plan()
+    assert plan is MatchesArchive._get_field_plan()
+    assert all(isinstance(p, HTFieldPlan) for p in plan)
+
+    plan_by_name = {p.name: p for p in plan}
+    assert plan_by_name['matches'].type is list
+    assert plan_by_name['matches'].item_type is MatchItem
+    assert plan_by_name['first_match_date'].is_optional is True
+    assert plan_by_name['team'].path == '.'
+
+    item_plan = {p.name: p for p in MatchItem._get_field_plan()}
+    assert item_plan['id'].converter == HTXml.ht_int
+    assert item_plan['id'].path == 'MatchID'
+
+    # subclasses compile their own plan
+    assert HTMAItem._get_field_plan() is not MatchItem._get_field_plan()
+
+
+def test_field_plan_version_constraint():
+
+    class VersionedModel(MatchItem):
+        rule_id: int = HTField('MatchRuleId', version='>=1.5')
+        tags: List[str] = HTField('Tags', items='Tag')
+
+    plan_by_name = {p.name: p for p in VersionedModel._get_field_plan()}
+    assert plan_by_name['rule_id'].version is not None
+    assert plan_by_name['tags'].item_type is str
+
+
+def test_models_share_class_plan(mocked_chpp):
+
+    m1 = mocked_chpp.xml_matches()
+    m2 = mocked_chpp.xml_matches()
+
+    assert m1.team.id == m2.team.id
+    assert [m.id for m in m1.team.matches] == [m.id for m in m2.team.matches]
+    assert '_ht_field_plan' in type(m1).__dict__
+
+
+def test_lazy_model(mocked_chpp):
+
+    eager = mocked_chpp.xml_team_details(team_id=1755350)
+    lazy = mocked_chpp.xml_team_details(team_id=1755350, lazy=True)
+
+    # fields are not transformed until they are accessed
+    assert 'user' not in vars(lazy)
+    assert 'teams' not in vars(lazy)
+
+    assert lazy.user.name == eager.user.name
+    assert 'user' in vars(lazy)
+    assert 'teams' not in vars(lazy)
+    assert lazy.user is lazy.user
+
+    # nested models are lazy too
+    team = lazy.teams[0]
+    assert 'arena' not in vars(team)
+    assert team.arena.name == eager.teams[0].arena.name
+    assert team.founded_date == eager.teams[0].founded_date
+    assert [t.id for t in lazy.teams] == [t.id for t in eager.teams]
+
+
+def test_lazy_custom_model(mocked_chpp):
+
+    team = mocked_chpp.team(id_=1755350, lazy=True)
+    assert 'user' not in vars(team)
+    assert team.name == "Projet NUL Bot Breton"
+    assert team.user.username == "Conteur_Merlin"
+    assert team.is_primary_club is False
+
+
+def test_proxy_fields_are_resolved_once_per_class():
+
+    plan_by_name = HTMAItem._get_field_plan_index()
+    assert plan_by_name['id'].path == 'MatchID'
+    assert plan_by_name['id'].field is not MatchItem._ht_fields['id']
+    assert plan_by_name['cup'].path == '.'
+
+    # HTProxyField attributes are not altered by resolution
+    assert HTMAItem._ht_fields['id'].attr_name is None
+
+    lineup_plan = HTMatchLineup._get_field_plan_index()
+    assert lineup_plan['team_lineup'].path == 'Team'
+    assert lineup_plan['team_lineup'].field.suppl_attrs == {'_match_id': '_match_id',
+                                                            'source_system': 'source_system'}
+    # referenced fields keep their own suppl_attrs
+    assert MatchLineup._ht_fields['team'].suppl_attrs == {}
+
+    match_plan = HTMatchLineupMatch._get_field_plan_index()
+    assert match_plan['home_team_name'].path == 'HomeTeam/HomeTeamName'
+
+
+def test_custom_model_items_share_proxy_resolution(mocked_chpp):
+
+    lineup = mocked_chpp.match_lineup(match_id=660688698, team_id=86324)
+    assert lineup.match.home_team_name == lineup.home_team.name
+    assert lineup.team_lineup.source_system == lineup.source_system
+    assert all(p.source_system == lineup.source_system
+               for p in lineup.team_lineup.starting_lineup_players)
+
+
+def test_concurrent_models_build_their_own_request_args(mocked_chpp):
+
+    arena_ids = [1420520, 1751912, 295023]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    def build(i):
+        arena_id = arena_ids[i % len(arena_ids)]
+        arena = mocked_chpp.xml_arena_details(arena_id=arena_id)
+        return arena_id, arena._requests_args['arenaID'], arena._r_arena_id, arena.id
+
+    try:
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(executor.map(build, range(600)))
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    for arena_id, request_arg, init_var_value, fetched_id in results:
+        assert request_arg == str(arena_id)
+        assert init_var_value == str(arena_id)
+        assert fetched_id == arena_id
+
+    # class-level HTInitVar objects do not hold any request value
+    assert not hasattr(ArenaDetailsDefault._r_arena_id, 'value')
+
+
+def test_stream_request(mocked_chpp):
+
+    items = mocked_chpp.stream_request(item_path=('Team', 'MatchList', 'Match'),
+                                       chunk_size=256, file='matches', version='2.9')
+    first = next(items)
+    assert first.find('MatchID').text is not None
+
+    ids = [first.find('MatchID').text] + [i.find('MatchID').text for i in items]
+    assert ids == [str(m.id) for m in mocked_chpp.xml_matches().team.matches]
+
+    # consumed items are cleared, and response is closed once read
+    assert len(first) == 0
+    assert mocked_chpp.last_response.closed
+
+
+def test_stream_request_error(mocked_chpp, monkeypatch, tmp_path):
+
+    path = tmp_path / 'chpperror.xml'
+    path.write_text("<HattrickData><FileName>chpperror.xml</FileName>"
+                    "<ErrorCode>50</ErrorCode><Error>Unknown team id</Error></HattrickData>")
+    monkeypatch.setattr(mocked_chpp, '_send_request', lambda **kwargs: MockResponse(path))
+
+    items = mocked_chpp.stream_request(item_path=('Team', 'MatchList', 'Match'),
+                                       chunk_size=16, file='matches', version='2.9')
+    with pytest.raises(HTUnknownTeamIdError):
+        list(items)
+
+
+def test_stream_items(mocked_chpp):
+
+    archive = mocked_chpp.xml_matches()
+    streamed = list(Matches.stream_items(mocked_chpp, 'team.matches'))
+
+    assert [type(m) for m in streamed] == [MatchesItem] * len(archive.team.matches)
+    assert [(m.id, m.home_team.name, m.date) for m in streamed] == \
+        [(m.id, m.home_team.name, m.date) for m in archive.team.matches]
+
+    with pytest.raises(ValueError):
+        Matches.stream_items(mocked_chpp, 'team')
+    with pytest.raises(ValueError):
+        Matches.stream_items(mocked_chpp, 'team.unknown')
+    with pytest.raises(ValueError):
+        ArenaDetailsDefault.stream_items(mocked_chpp, 'arena', arena_id=1420520)
+
+
+def test_lazy_lists(mocked_chpp):
+
+    search_args = dict(age_min=20, age_max=22, skill_type_1=8,
+                       min_skill_value_1=7, max_skill_value_1=9)
+    eager = mocked_chpp.xml_transfer_search(**search_args)
+    ts = mocked_chpp.xml_transfer_search(**search_args, lazy_lists=True)
+
+    results = ts.transfer_results
+    assert isinstance(results, HTLazyList)
+    assert len(results) == len(eager.transfer_results)
+
+    # items are only built on access, then cached
+    assert results._items == [None] * len(results)
+    first = results[0]
+    assert first is results[0]
+    assert results._items[1] is None
+    assert first.details.age == eager.transfer_results[0].details.age
+
+    # slicing does not build items, but keeps already built ones
+    head = results[:3]
+    assert isinstance(head, HTLazyList)
+    assert head._items == [first, None, None]
+    assert [p.id for p in head] == [p.id for p in eager.transfer_results[:3]]
+    assert [p.id for p in results[-2:]] == [p.id for p in eager.transfer_results[-2:]]
+    assert [p.id for p in results] == [p.id for p in eager.transfer_results]
+
+    with pytest.raises(IndexError):
+        results[len(results)]
+
+
+def test_lazy_lists_are_propagated(mocked_chpp):
+
+    details = mocked_chpp.xml_team_details(team_id=1755350, lazy_lists=True)
+    assert isinstance(details.teams, HTLazyList)
+    assert isinstance(details.teams[0].trophies, HTLazyList)
+
+
+def test_timestamps(mocked_chpp):
+
+    details = mocked_chpp.xml_team_details(team_id=1755350)
+    ts_details = mocked_chpp.xml_team_details(team_id=1755350, timestamps=True)
+
+    # timestamps mode is propagated to nested models and list items
+    founded, ts_founded = details.teams[0].founded_date, ts_details.teams[0].founded_date
+    assert isinstance(founded, HTDatetime)
+    assert isinstance(ts_founded, HTTimestamp)
+    assert ts_founded.datetime == founded.datetime
+    assert (ts_founded.season, ts_founded.week, ts_founded.weekday) == \
+        (founded.season, founded.week, founded.weekday)
+
+    # timestamps are immutable, thus shared between instances
+    other = mocked_chpp.xml_team_details(team_id=1755350, timestamps=True)
+    assert other.teams[0].founded_date is ts_founded
+
+    restored = HTModel.from_snapshot(ts_details.to_snapshot())
+    assert restored.teams[0].founded_date == ts_founded
+
+
+def test_to_columns(mocked_chpp):
+
+    np = pytest.importorskip('numpy')
+
+    ts = mocked_chpp.xml_transfer_search(age_min=20, age_max=22, skill_type_1=8,
+                                         min_skill_value_1=7, max_skill_value_1=9)
+    items = ts.transfer_results
+    columns = ts.to_columns('transfer_results')
+
+    assert columns['id'].dtype == np.int64
+    assert columns['id'].tolist() == [i.id for i in items]
+    assert columns['first_name'].tolist() == [i.first_name for i in items]
+    assert columns['details.age'].tolist() == [i.details.age for i in items]
+    assert (columns['details.seller_team.id'].tolist()
+            == [i.details.seller_team.id for i in items])
+    assert columns['deadline'].dtype == np.dtype('datetime64[s]')
+    assert (columns['deadline'].astype(object).tolist()
+            == [i.deadline.datetime.replace(tzinfo=None) for i in items])
+
+    # missing int values give a float column with NaN
+    bidder_ids = columns['bidder_team.id']
+    assert bidder_ids.dtype == np.float64
+    assert [None if np.isnan(v) else int(v) for v in bidder_ids] == \
+        [i.bidder_team.id for i in items]
+
+    records = ts.to_columns('transfer_results', structured=True)
+    assert len(records) == len(items)
+    assert records['details.keeper_skill'].tolist() == columns['details.keeper_skill'].tolist()
+
+    with pytest.raises(ValueError):
+        ts.to_columns('page_size')
+
+    # dates that models convert to None (as 0001-01-01) are missing too
+    supporters = mocked_chpp.xml_supporters(user_id=13481763)
+    send_dates = supporters.to_columns('supported_teams')['press_announcement.send_date']
+    expected = [None if t.press_announcement is None else t.press_announcement.send_date
+                for t in supporters.supported_teams]
+    assert any(t.press_announcement is not None and d is None
+               for t, d in zip(supporters.supported_teams, expected))
+    assert [None if np.isnat(v) else v.astype(object) for v in send_dates] == \
+        [None if d is None else d.datetime.replace(tzinfo=None) for d in expected]
+
+
+def test_snapshot(mocked_chpp):
+
+    details = mocked_chpp.xml_team_details(team_id=1755350)
+    snapshot = details.to_snapshot()
+    restored = HTModel.from_snapshot(snapshot)
+
+    assert type(restored) is type(details)
+    assert restored.version.as_string == details.version.as_string
+    assert restored._requests_args == details._requests_args
+    assert restored.user.name == details.user.name
+    assert [t.id for t in restored.teams] == [t.id for t in details.teams]
+
+    founded, restored_founded = details.teams[0].founded_date, restored.teams[0].founded_date
+    assert restored_founded == founded
+    assert restored_founded.timezone_name == founded.timezone_name
+    assert ((restored_founded.season, restored_founded.week, restored_founded.weekday)
+            == (founded.season, founded.week, founded.weekday))
+
+    # restored instances do not need a chpp instance, but can be given one
+    assert restored._chpp is None
+    assert HTModel.from_snapshot(snapshot, chpp=mocked_chpp).teams[0]._chpp is mocked_chpp
+
+
+def test_snapshot_custom_and_lazy_models(mocked_chpp):
+
+    lineup = mocked_chpp.match_lineup(match_id=660688698, team_id=86324, lazy=True)
+    restored = HTModel.from_snapshot(lineup.to_snapshot(), chpp=mocked_chpp)
+
+    assert restored.url == lineup.url
+    assert restored.team_lineup.source_system == lineup.team_lineup.source_system
+    assert ([p.id for p in restored.team_lineup.starting_lineup_players]
+            == [p.id for p in lineup.team_lineup.starting_lineup_players])
+
+
+def test_snapshot_does_not_load_globals():
+
+    with pytest.raises(pickle.UnpicklingError):
+        HTModel.from_snapshot(pickle.dumps((HTModel.SNAPSHOT_FORMAT, HTField('a'))))
+
+
+def test_snapshot_does_not_import_modules(monkeypatch):
+
+    monkeypatch.delitem(sys.modules, 'this', raising=False)
+    snapshot = pickle.dumps((HTModel.SNAPSHOT_FORMAT, ('model', 'this', 's', {})))
+
+    with pytest.raises(ValueError):
+        HTModel.from_snapshot(snapshot)
+    assert 'this' not in sys.modules
+
+    # classes of pychpp models are found (their module being imported if needed)
+    snapshot = pickle.dumps((HTModel.SNAPSHOT_FORMAT,
+                             ('model', 'pychpp.models.xml.fans', 'Fans', {})))
+    assert type(HTModel.from_snapshot(snapshot)).__name__ == 'Fans'
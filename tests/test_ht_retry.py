@@ -0,0 +1,237 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from pychpp import CHPP
+from pychpp.fixtures import ht_error
+from pychpp.fixtures.ht_rate_limit import HTRateLimiter
+from pychpp.fixtures.ht_retry import HTCircuitBreaker, HTRetryPolicy
+from tests.conftest import resource_path
+
+
+ARENA_PARAMS = {'file': 'arenadetails', 'version': '1.7', 'arenaID': 1420520}
+
+
+class Response:
+
+    def __init__(self, status_code, content=b'', headers=None):
+        self.url = ''
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or dict()
+
+    def close(self):
+        pass
+
+
+class Session:
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = list()
+
+    def send(self, params):
+        self.sent.append(params)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def get(self, url, params=None, stream=False, auth=None):
+        return self.send(params)
+
+    def post(self, url, data=None, stream=False, auth=None):
+        return self.send(data)
+
+
+@pytest.fixture
+def now(monkeypatch):
+    now = [1000.]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(time, 'sleep', lambda s: None)
+    return now
+
+
+def test_circuit_breaker():
+
+    breaker = HTCircuitBreaker(failure_threshold=2, recovery_time=30)
+
+    breaker.record_failure(0)
+    assert breaker.state == 'closed'
+    breaker.record_failure(1)
+    assert breaker.state == 'open'
+    assert not breaker.allow(10)
+
+    # after recovery time, only one trial request is sent
+    assert breaker.allow(31)
+    assert breaker.state == 'half_open'
+    assert not breaker.allow(32)
+
+    breaker.record_failure(33)
+    assert breaker.state == 'open'
+    assert breaker.allow(63)
+
+    # a trial request which never ends does not keep the circuit half open
+    assert not breaker.allow(92)
+    assert breaker.allow(93)
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow(64) and breaker.allow(64)
+
+
+def test_retry_budget(now):
+
+    policy = HTRetryPolicy(max_attempts=10, base_delay=1, budget_max=2, budget_ratio=0.5,
+                           failure_threshold=100)
+
+    delays = [policy.record_failure('live', attempt) for attempt in range(3)]
+    assert 0 <= delays[0] <= 1 and 0 <= delays[1] <= 2
+    assert delays[2] is None
+    assert policy.stats == {'retries': 2, 'budget_exhausted': 1, 'rejected': 0}
+
+    # each request adds budget_ratio to the budget
+    policy.before_attempt('live', 0)
+    policy.before_attempt('live', 0)
+    assert policy.budget == 1
+
+    assert policy.record_failure('live', 0, retry_after=5) == 5
+    assert policy.record_failure('live', 0, retry=False) is None
+
+
+def test_chpp_retries(now):
+
+    chpp = CHPP(consumer_key='', consumer_secret='',
+                retry_policy=HTRetryPolicy(max_attempts=3))
+    content = resource_path(dict(ARENA_PARAMS)).read_bytes()
+    chpp.session = Session(requests.ConnectionError(), Response(503, headers={'Retry-After': '1'}),
+                           Response(200, content))
+
+    arena = chpp.xml_arena_details(arena_id=1420520)
+    assert arena.id == 1420520
+    assert len(chpp.session.sent) == 3
+    assert chpp.retry_policy.stats['retries'] == 2
+
+    # requests which are not only reading data are never retried
+    chpp.session = Session(requests.ConnectionError())
+    with pytest.raises(requests.ConnectionError):
+        chpp._send_request(chpp.base_url, method='POST', file='matchorders',
+                           actionType='setmatchorder')
+    assert len(chpp.session.sent) == 1
+
+
+def test_chpp_circuit_breaker(now):
+
+    chpp = CHPP(consumer_key='', consumer_secret='',
+                retry_policy=HTRetryPolicy(max_attempts=1, failure_threshold=2,
+                                           recovery_time=30))
+    chpp.session = Session(requests.ConnectionError())
+
+    for _ in range(2):
+        with pytest.raises(requests.ConnectionError):
+            chpp._send_request(chpp.base_url, file='live', version='2.3')
+
+    # requests to a failing file are rejected at once, other files are not concerned
+    with pytest.raises(ht_error.HTCircuitOpenError):
+        chpp._send_request(chpp.base_url, file='live', version='2.3')
+    assert len(chpp.session.sent) == 2
+    assert chpp.circuit_states == {'live': 'open'}
+
+    chpp.session = Session(Response(200, resource_path(dict(ARENA_PARAMS)).read_bytes()))
+    chpp.xml_arena_details(arena_id=1420520)
+
+    now[0] += 30
+    chpp._send_request(chpp.base_url, file='live', version='2.3')
+    assert chpp.circuit_states == {'live': 'closed', 'arenadetails': 'closed'}
+
+
+def test_retries_are_rate_limited(now):
+
+    limiter = HTRateLimiter(token_rate=100)
+    chpp = CHPP('', '', rate_limiter=limiter,
+                retry_policy=HTRetryPolicy(max_attempts=3, failure_threshold=10))
+    chpp.session = Session(Response(503, headers={'Retry-After': '1'}), Response(503),
+                           Response(200, resource_path(dict(ARENA_PARAMS)).read_bytes()))
+
+    chpp.xml_arena_details(arena_id=1420520)
+
+    # each attempt takes a token
+    assert len(chpp.session.sent) == 3
+    assert limiter.stats['requests'] == 3
+
+
+def test_async_retries_are_rate_limited(now):
+
+    pytest.importorskip('aiohttp')
+    from pychpp.async_chpp import AsyncCHPP
+
+    class AsyncResponse:
+
+        def __init__(self, status, content=b''):
+            self.url = ''
+            self.status = status
+            self.headers = dict()
+            self.content = content
+
+        async def read(self):
+            return self.content
+
+        def release(self):
+            pass
+
+        def close(self):
+            pass
+
+    class AsyncSession:
+
+        def __init__(self, *responses):
+            self.responses = list(responses)
+
+        async def request(self, *args, **kwargs):
+            return self.responses.pop(0)
+
+    limiter = HTRateLimiter(token_rate=100)
+    chpp = AsyncCHPP('', '', rate_limiter=limiter,
+                     retry_policy=HTRetryPolicy(max_attempts=3, failure_threshold=10,
+                                                base_delay=0),
+                     session=AsyncSession(AsyncResponse(503), AsyncResponse(
+                         200, resource_path(dict(ARENA_PARAMS)).read_bytes())))
+
+    arena = asyncio.run(chpp.xml_arena_details(arena_id=1420520))
+    assert arena.id == 1420520
+    assert limiter.stats['requests'] == 2
+
+
+def test_cancelled_trial_request(now):
+
+    pytest.importorskip('aiohttp')
+    from pychpp.async_chpp import AsyncCHPP
+
+    class PendingSession:
+
+        async def request(self, *args, **kwargs):
+            await asyncio.sleep(3600)
+
+    policy = HTRetryPolicy(max_attempts=1, failure_threshold=1, recovery_time=30)
+    chpp = AsyncCHPP('', '', retry_policy=policy, session=PendingSession())
+
+    policy.record_failure('live', 0)
+    now[0] += 30
+
+    async def main():
+        trial = asyncio.ensure_future(
+            chpp._fetch_content(chpp.chpp.base_url, file='live', version='2.3'))
+        await asyncio.sleep(0)
+        assert policy.states() == {'live': 'half_open'}
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+    asyncio.run(main())
+
+    # the cancelled trial is recorded as a failure, another one is sent later
+    assert policy.states() == {'live': 'open'}
+    now[0] += 30
+    policy.before_attempt('live', 0)
+    assert policy.states() == {'live': 'half_open'}
@@ -0,0 +1,49 @@
+import tracemalloc
+
+import pytest
+
+from pychpp.fixtures.ht_trace import HTTracer
+
+
+def test_tracer_spans():
+
+    tracer = HTTracer()
+
+    with tracer.span('root') as root:
+        with tracer.span('child', kind='request', file='teamdetails'):
+            pass
+        with pytest.raises(ValueError):
+            with tracer.span('failing'):
+                raise ValueError()
+
+    assert list(tracer.roots) == [root]
+    assert [(d, s.name) for d, s in root.walk()] == [(0, 'root'), (1, 'child'), (1, 'failing')]
+    assert root.children[0].parent is root
+    assert root.children[0].attributes == {'file': 'teamdetails'}
+    assert root.children[1].error == 'ValueError'
+    assert root.duration >= root.children[0].duration
+
+
+def test_chpp_tracer(mocked_http_chpp):
+
+    was_tracing = tracemalloc.is_tracing()
+    tracer = HTTracer(trace_allocations=True)
+    mocked_http_chpp.tracer = tracer
+
+    try:
+        with tracer.span('arena') as root:
+            mocked_http_chpp.xml_arena_details(arena_id=1420520)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    model = root.children[0]
+    assert (model.name, model.kind) == ('ArenaDetailsDefault', 'model')
+
+    # the request, then nested models, are children of the model span
+    assert (model.children[0].name, model.children[0].kind) == ('request arenadetails', 'request')
+    assert model.children[0].attributes['arenaID'] == '1420520'
+    assert any(c.kind == 'model' for c in model.children[1:])
+    assert root.allocated is not None
+
+    assert tracer.format().splitlines()[1].startswith('  ArenaDetailsDefault ')
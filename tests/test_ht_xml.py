@@ -0,0 +1,137 @@
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from pychpp.fixtures.ht_datetime import HTDatetime
+from pychpp.models.ht_xml import HTXml, HTXPath
+
+
+XML_DATA = """
+<HattrickData>
+  <FileName>teamdetails.xml</FileName>
+  <Teams>
+    <Team>
+      <TeamID>1</TeamID>
+      <IsPrimaryClub>True</IsPrimaryClub>
+      <TeamName>First team</TeamName>
+      <Arena><ArenaID>10</ArenaID></Arena>
+    </Team>
+    <Team>
+      <TeamID>2</TeamID>
+      <IsPrimaryClub>False</IsPrimaryClub>
+      <TeamName>Second team</TeamName>
+      <Trophies/>
+    </Team>
+  </Teams>
+  <User><Name>Manager</Name></User>
+  <BidItems TrackingTypeID="9"><Value>9</Value></BidItems>
+  <BidItems TrackingTypeID="8"><Value>8</Value></BidItems>
+</HattrickData>
+"""
+
+
+@pytest.mark.parametrize('path', [
+    'FileName',
+    'Teams/Team/TeamName',
+    'Teams/Team/Trophies',
+    'Teams/Team/.',
+    'Teams/Team/',
+    "Teams/Team/.[TeamID='2']/TeamName",
+    "Teams/Team/.[IsPrimaryClub='True']/Arena/ArenaID",
+    "Teams/Team/.[TeamID='2']/../../User/Name",
+    'Teams/Team/../../User',
+    '..',
+    '.',
+    'Teams/*/TeamName',
+    'BidItems[@TrackingTypeID="8"]/Value',
+    'BidItems[@TrackingTypeID]',
+    'Teams/Team[Trophies]/TeamName',
+    "Teams/Team[TeamID='2']",
+    'Unknown',
+    'Teams/Unknown/TeamName',
+    # unsupported syntax, handled by ElementTree
+    'Teams//TeamName',
+    'Teams/Team[2]/TeamName',
+])
+def test_xpath_find_as_element_tree(path):
+    data = ElementTree.fromstring(XML_DATA)
+    assert HTXPath(path).find(data) is data.find(path)
+
+
+def test_xpath_compile_cache():
+    assert HTXPath.compile('Teams/Team/', 'TeamName') is HTXPath.compile('Teams/Team/', 'TeamName')
+    assert HTXPath.compile('TeamName').tag == 'TeamName'
+    assert HTXPath.compile('Teams/Team/', 'TeamName').tag is None
+
+    # prefixes are compiled without ElementPath implicit '*'
+    data = ElementTree.fromstring(XML_DATA)
+    nodes = HTXPath.compile_prefix('Teams/Team/').select([(data, ())])
+    assert [n[0].find('TeamID').text for n in nodes] == ['1', '2']
+
+    # filters are applied on selected nodes, from which paths are searched
+    nodes = HTXPath(".[TeamID='2']/", implicit_star=False).select(nodes)
+    assert HTXPath.compile('TeamName').find_from(nodes).text == 'Second team'
+    assert HTXPath.compile('../../User/Name').find_from(nodes).text == 'Manager'
+
+
+def test_team_filter_does_not_fill_xpath_cache(mocked_chpp):
+    cache_size = len(HTXPath._CACHE)
+    mocked_chpp.team(id_=1755350)
+    cache_size_after_first_team = len(HTXPath._CACHE)
+    mocked_chpp.team(id_=295023)
+
+    assert cache_size_after_first_team >= cache_size
+    assert len(HTXPath._CACHE) == cache_size_after_first_team
+    assert not any("TeamID=" in ''.join(k) for k in HTXPath._CACHE)
+
+
+def test_ht_datetime_from_text_memo():
+    data = ElementTree.fromstring('<Match Date="2023-03-26 12:30:15">2023-03-26</Match>')
+
+    first = HTXml.ht_datetime_from_text(data, attrib='Date')
+    second = HTXml.ht_datetime_from_text(data, attrib='Date')
+    assert first == second
+    assert (first.season, first.week, first.weekday) == (84, 3, 7)
+    assert first.datetime.utcoffset().total_seconds() == 7200
+    assert (first.hour, first.minute, first.second) == (12, 30, 15)
+
+    # memoized timestamps are returned as new instances, which can be modified
+    assert first is not second
+    first.week = 4
+    assert second.week == 3
+    assert HTXml.ht_datetime_from_text(data, attrib='Date').week == 3
+
+    date = HTXml.opt_ht_datetime_from_text(data)
+    assert (date.year, date.month, date.day, date.hour) == (2023, 3, 26, 0)
+
+    assert HTXml.opt_ht_datetime_from_text(ElementTree.fromstring(
+        '<Date>0001-01-01 00:00:00</Date>')) is None
+    with pytest.raises(ValueError):
+        HTXml.ht_datetime_from_text(ElementTree.fromstring('<Date>0001-01-01 00:00:00</Date>'))
+    with pytest.raises(ValueError):
+        HTXml.opt_ht_datetime_from_text(ElementTree.fromstring('<Date>26/03/2023</Date>'))
+
+
+def test_ht_datetime_from_text_formats(monkeypatch):
+
+    # date-only timestamps are only accepted by the optional converter
+    date = ElementTree.fromstring('<Date>2023-03-26</Date>')
+    with pytest.raises(ValueError):
+        HTXml.ht_datetime_from_text(date)
+    with pytest.raises(ValueError):
+        HTXml.ht_timestamp_from_text(date)
+    assert HTXml.opt_ht_datetime_from_text(date).day == 26
+
+    # timestamps which are not zero-padded are parsed by strptime
+    assert HTXml.opt_ht_datetime_from_text(ElementTree.fromstring(
+        '<Date>2023-3-5</Date>')).day == 5
+    assert HTXml.ht_datetime_from_text(ElementTree.fromstring(
+        '<Date>2023-3-5 1:2:3</Date>')).hour == 1
+
+    # errors of HTDatetime are raised as is by the strict converter
+    def overflow(self, *args, **kwargs):
+        raise OverflowError
+
+    monkeypatch.setattr(HTDatetime, '__init__', overflow)
+    with pytest.raises(OverflowError):
+        HTXml.ht_datetime_from_text(ElementTree.fromstring('<Date>2031-02-03 04:05:06</Date>'))